@@ -0,0 +1,206 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              AgentManager class used to make requests for hostnames handed out by a coordinator
+
+import socket
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+from ConnectionManager import ConnectionManager
+from ThreadManager import ThreadManager
+from RateLimiter import RateLimiter
+from StatisticsManager import StatisticsManager
+from CoordinatorManager import CoordinatorManager
+from CheckpointManager import ItemStatistics
+
+
+class AgentManager:
+    """
+    AgentManager Class. Connects to a coordinator (see CoordinatorManager), builds its
+    ConnectionManager from the coordinator's settings and runs the hostnames it is handed
+    through a ThreadManager in stream mode.
+
+    The ThreadManager's bounded queue pulls hostnames from the coordinator only when there
+    is room for them, so an agent never holds more than a queue of work. The statistics
+    collected since the last message are sent back every stats_interval seconds, with the
+    hostnames they are for.
+
+    The agent is the ThreadManager's checkpoint_manager. The statistics of a hostname are held
+    back until it is done (see ItemStatistics), so the statistics sent always match the
+    hostnames reported done, and the coordinator can give the rest to another agent.
+    """
+    def __init__(self,
+                coordinator_host: str,
+                coordinator_port: int,
+                num_workers: int,
+                statistics_manager,
+                message_manager,
+                name: Optional[str] = None,
+                connect_timeout: float = 30.0
+                ) -> None:
+        """
+        Initialize the AgentManager.
+
+        :param coordinator_host: the address of the coordinator.
+        :param coordinator_port: the port of the coordinator.
+        :param num_workers: the number of worker threads.
+        :param statistics_manager: collects the statistics of this agent.
+        :param message_manager: used for this agent's output.
+        :param name: the name shown by the coordinator. Defaults to the hostname of this machine.
+        :param connect_timeout: seconds to keep trying to connect, so agents can be started before the coordinator.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        if num_workers < 1:
+            raise ValueError("Number of workers must be at least 1")
+
+        self.coordinator_host = coordinator_host
+        self.coordinator_port = coordinator_port
+        self.num_workers = num_workers
+        self.statistics_manager = statistics_manager
+        self.message_manager = message_manager
+        self.name = name or socket.gethostname()
+        self.connect_timeout = connect_timeout
+
+        # Ask for a batch of num_workers hostnames at a time, and queue at most two batches.
+        self.batch_size = num_workers
+        self.queue_size = num_workers * 2
+
+        self.connection = None
+        self.rfile = None
+        self._send_lock = threading.Lock()
+
+        # Guards the statistics and the hostnames done since the last statistics message.
+        self._lock = threading.Lock()
+        self.done_items: List[Any] = []
+        self._stop_event = threading.Event()
+        self.thread_manager = None
+        self.connection_manager = None
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        print(f"Agent Name = {self.name}, Coordinator = {self.coordinator_host}:{self.coordinator_port}, "
+              f"Number of workers = {self.num_workers}")
+
+    def connect(self) -> None:
+        """
+        Connect to the coordinator, retrying until connect_timeout has passed.
+        """
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                self.connection = socket.create_connection((self.coordinator_host, self.coordinator_port), timeout=10)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+        # Reads wait as long as the coordinator needs, for example while it waits for other agents.
+        self.connection.settimeout(None)
+        self.rfile = self.connection.makefile("rb")
+
+    def send(self, message: dict) -> None:
+        """
+        Send a message to the coordinator.
+        """
+        CoordinatorManager.send_message(self.connection, message, self._send_lock)
+
+    def iter_hostnames(self) -> Iterator[str]:
+        """
+        Yield the hostnames handed out by the coordinator, asking for a new batch when the last one has been taken.
+        """
+        while True:
+            self.send({"type": "request", "count": self.batch_size})
+            message = CoordinatorManager.read_message(self.rfile)
+            if message is None or message.get("type") != "batch" or not message.get("hostnames"):
+                return
+            yield from message["hostnames"]
+
+    def completed_items(self) -> int:
+        """
+        Get the number of hostnames this agent has finished.
+        """
+        thread_manager = self.thread_manager
+        return thread_manager.items_to_test - thread_manager.outstanding_items
+
+    def item_statistics(self) -> ItemStatistics:
+        """
+        Get the statistics to test one hostname with, to pass to mark_done once it is done.
+        """
+        return ItemStatistics(self)
+
+    def mark_done(self, item: Any, item_statistics: Optional[ItemStatistics] = None) -> None:
+        """
+        Record that a hostname has been tested, adding the statistics held back by item_statistics.
+        """
+        with self._lock:
+            if item_statistics is not None:
+                item_statistics.commit()
+            self.done_items.append(item)
+
+    def stats_worker(self, stats_interval: float) -> None:
+        """
+        Statistics thread. Sends the statistics collected since the last message every stats_interval seconds,
+        and once more when the agent stops.
+        """
+        previous_state = self.statistics_manager.get_state()
+        stopping = False
+        while not stopping:
+            stopping = self._stop_event.wait(stats_interval)
+            # The statistics and the hostnames done are read together, so they always match.
+            with self._lock:
+                state = self.statistics_manager.get_state()
+                done, self.done_items = self.done_items, []
+            if not done and state["total_requests"] == previous_state["total_requests"] and not stopping:
+                continue
+            difference = StatisticsManager.difference(state, previous_state)
+            try:
+                self.send({"type": "stats", "state": difference.get_state(), "done": done, "completed": self.completed_items()})
+            except OSError:
+                return
+            previous_state = state
+
+    def run(self) -> None:
+        """
+        Connect to the coordinator and make requests until it has no more hostnames.
+        """
+        self.print_variables()
+        self.connect()
+        try:
+            self.send({"type": "hello", "name": self.name, "workers": self.num_workers})
+            settings = CoordinatorManager.read_message(self.rfile)
+            if not settings or settings.get("type") != "settings":
+                raise ConnectionError("The coordinator closed the connection before sending its settings")
+
+            self.connection_manager = ConnectionManager(**settings["connection_settings"])
+
+            # The coordinator paces the hostnames it hands out, only the delay before each request is applied here.
+            rate_limiter = None
+            if self.connection_manager.delay is not None or self.connection_manager.random_delay_max is not None:
+                rate_limiter = RateLimiter(delay=self.connection_manager.delay, random_delay_max=self.connection_manager.random_delay_max)
+
+            self.thread_manager = ThreadManager(self.num_workers, self.connection_manager.make_request,
+                                                self.statistics_manager, self.message_manager, rate_limiter,
+                                                checkpoint_manager=self,
+                                                destination_manager=self.connection_manager.destination_manager)
+
+            stats_thread = threading.Thread(target=self.stats_worker, args=(settings.get("stats_interval", 1.0),), daemon=True)
+            stats_thread.start()
+
+            self.thread_manager.start_stream(self.iter_hostnames(), "hostnames_queue", "hostnames_thread_list",
+                                             max_queue_size=self.queue_size)
+            self.thread_manager.join_threads("hostnames_thread_list")
+
+            # Send the last statistics before telling the coordinator this agent has finished.
+            self._stop_event.set()
+            stats_thread.join()
+            self.send({"type": "finished"})
+        finally:
+            if self.connection_manager is not None:
+                self.connection_manager.close()
+            self.rfile.close()
+            self.connection.close()
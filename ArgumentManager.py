@@ -0,0 +1,371 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              ArgumentManager class used to parse and validate the arguments of the generate-requests scripts
+
+import argparse
+import sys
+
+from SamplingManager import SamplingManager
+from ConnectionManager import ConnectionManager
+from AsyncManager import AsyncManager
+from RateLimiter import RateLimiter
+from ResultManager import ResultManager
+from ProfileManager import ProfileManager
+from OutcomeCacheManager import OutcomeCacheManager
+from DestinationManager import DestinationManager
+
+
+class ArgumentManager:
+    """
+    ArgumentManager Class. Holds the command line arguments shared by generate-requests.py and
+    generate-requests-proxy.py, so both scripts accept and check the same arguments.
+
+    Invalid arguments print an error and exit. validate_arguments also adds the values worked
+    out from the arguments: soak_mode, coordinator_host and coordinator_port (for --agent) and
+    outcome_ttls (from --outcome-ttl).
+    """
+    @staticmethod
+    def create_parser() -> argparse.ArgumentParser:
+        """
+        Create the argument parser.
+        """
+        parser = argparse.ArgumentParser(description='Connect to random hostnames with multiple threads.')
+        parser.add_argument('--cleanup', action='store_true', help='Remove the cached lists and hostname indexes, and exit.')
+        parser.add_argument('num_connections', type=int, nargs='?', default=100, help='Number of connections to establish. Default 100.')
+        parser.add_argument('num_workers', type=int, nargs='?', default=3, help='Number of worker threads. Default 3.')
+        parser.add_argument('--insecure', action='store_true', help='Allow insecure connections.')
+        parser.add_argument('--cache-dir', default='cache', help='Directory used to cache the Umbrella top 1m lists. Default cache.')
+        parser.add_argument('--top', type=int, help='Only sample from the top N ranked hostnames.')
+        parser.add_argument('--sampling', choices=SamplingManager.STRATEGIES, default='uniform',
+                            help='How hostnames are sampled by rank. "uniform" picks every hostname with equal chance, "zipf" picks popular '
+                                 'hostnames more often (with repeats), "stratified" splits the sample evenly across rank bands. Default uniform.')
+        parser.add_argument('--zipf-exponent', type=float, default=1.0,
+                            help='With --sampling zipf, the exponent s of the weights 1/rank^s. Larger values favour the top ranks more. Default 1.')
+        parser.add_argument('--strata', default=','.join(str(rank) for rank in SamplingManager.DEFAULT_STRATA),
+                            help='With --sampling stratified, comma separated upper ranks of the bands. Default 1000,10000,100000.')
+        parser.add_argument('--seed', type=int, help='Seed for sampling the hostnames, so the same sample is drawn every run.')
+        parser.add_argument('--offline', action='store_true', help='Do not download or revalidate the list, only use the cache.')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Number of processes to split the sample across. Each process runs num_workers workers. Default 1.')
+        parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                            help='Request engine. "thread" uses one OS thread per worker, "async" keeps num_workers requests in flight on an asyncio event loop. Default thread.')
+
+        # Connection pool arguments
+        parser.add_argument('--pool-size', type=int, default=10, help='Connection pool size for each worker session. Default 10.')
+        parser.add_argument('--retries', type=int, default=0, help='Number of times to retry a failed connection. Default 0.')
+        parser.add_argument('--retry-backoff', type=float, default=0.0, help='Backoff factor (in seconds) between connection retries. Default 0.')
+        parser.add_argument('--no-keep-alive', action='store_true', help='Close connections after every request instead of reusing them.')
+        parser.add_argument('--phase-timing', action='store_true',
+                            help='Add the DNS, connect, TLS, time to first byte and body timings to every output line.')
+        parser.add_argument('--request-mode', choices=ConnectionManager.REQUEST_MODES, default='get',
+                            help='How to handle the response body. "get" downloads it all, "head" sends HEAD requests, '
+                                 '"stream" closes the connection once the headers arrive, "capped" reads at most --max-bytes. Default get.')
+        parser.add_argument('--max-bytes', type=int, default=65536, help='With --request-mode capped, the most body bytes to read. Default 65536.')
+
+        # Destination arguments
+        parser.add_argument('--max-per-destination', type=int,
+                            help='The most requests in flight to one destination at once. Hostnames for a busy destination are put aside '
+                                 'and retried, so the workers move on to other destinations.')
+        parser.add_argument('--destination-key', choices=DestinationManager.DESTINATION_KEYS, default='domain',
+                            help='What counts as one destination. "domain" is the registrable domain (example.co.uk for www.example.co.uk), '
+                                 '"ip" the first resolved address, "proxy" the proxy every request goes through. Default domain.')
+        parser.add_argument('--breaker-threshold', type=int,
+                            help='Open the circuit breaker of a destination after this many timeouts in a row. Its hostnames then fail at once, '
+                                 'until a probe request is let through after --breaker-cooldown seconds.')
+        parser.add_argument('--breaker-cooldown', type=float, default=30.0,
+                            help='With --breaker-threshold, seconds before an open circuit breaker lets a probe request through. Default 30.')
+
+        # Timeout arguments
+        parser.add_argument('--connect-timeout', type=float, default=5.0, help='Seconds to wait for a connection to be established. Default 5.')
+        parser.add_argument('--read-timeout', type=float, default=5.0, help='Seconds to wait for the server to send data. Default 5.')
+        parser.add_argument('--adaptive-timeout', action='store_true',
+                            help='Set the timeouts from the latency observed so far (a multiple of the running p99), '
+                                 'capped at --connect-timeout and --read-timeout.')
+        parser.add_argument('--adaptive-multiplier', type=float, default=3.0, help='With --adaptive-timeout, the multiple of the running p99 to use. Default 3.')
+        parser.add_argument('--adaptive-min-timeout', type=float, default=0.5, help='With --adaptive-timeout, the smallest timeout to use. Default 0.5.')
+        parser.add_argument('--adaptive-warmup', type=int, default=100,
+                            help='With --adaptive-timeout, the number of successful requests before the timeouts adapt. Default 100.')
+
+        # Protocol racing arguments
+        parser.add_argument('--race', action='store_true',
+                            help='Race HTTPS and HTTP (happy eyeballs style) instead of only trying HTTP after HTTPS has failed.')
+        parser.add_argument('--race-stagger', type=float, default=0.25,
+                            help='Seconds to wait before starting the next raced attempt, if the previous one has not failed. Default 0.25.')
+        parser.add_argument('--race-families', action='store_true', help='With --race, also race IPv6 and IPv4 for hostnames that have both.')
+
+        # DNS cache arguments
+        parser.add_argument('--dns-ttl', type=float, default=300, help='Seconds to cache a resolved hostname (0 disables the DNS cache). Default 300.')
+        parser.add_argument('--dns-negative-ttl', type=float, default=60,
+                            help='Seconds to cache a hostname that failed to resolve (0 disables negative caching). Default 60.')
+        parser.add_argument('--pre-resolve', action='store_true',
+                            help='Resolve every sampled hostname concurrently before making requests, and skip the ones that do not resolve.')
+        parser.add_argument('--dns-workers', type=int, default=50, help='Number of concurrent lookups used by --pre-resolve, and by the async engine for hostnames that are not cached. Default 50.')
+
+        # Autoscale arguments
+        parser.add_argument('--autoscale', action='store_true',
+                            help='Grow and shrink the number of workers from the observed latency and throughput, starting at num_workers (thread engine only).')
+        parser.add_argument('--min-workers', type=int, default=1, help='With --autoscale, the smallest number of workers. Default 1.')
+        parser.add_argument('--max-workers', type=int, help='With --autoscale, the largest number of workers. Default 4 times num_workers.')
+        parser.add_argument('--autoscale-interval', type=float, default=2.0, help='With --autoscale, seconds between resizing the pool. Default 2.')
+
+        # Add delay argument group (mutually exclusive)
+        delay_group = parser.add_mutually_exclusive_group()
+        delay_group.add_argument('--delay', type=int, help='Constant delay in seconds (0-10) before each request.')
+        delay_group.add_argument('--random-delay', type=int, dest='random_delay_max',
+                               help='Random delay between 0 and specified seconds (max 10) before each request.')
+
+        # Add rate limit arguments
+        parser.add_argument('--rate', type=float, help='Target number of requests per second across all workers.')
+        parser.add_argument('--burst', type=int, default=1, help='Number of requests that may be sent at once when using --rate. Default 1.')
+        parser.add_argument('--arrival', choices=RateLimiter.ARRIVAL_MODES, default='uniform',
+                            help='Spacing of requests when using --rate. "uniform" spaces them evenly, "poisson" uses random (Poisson) arrivals. Default uniform.')
+
+        # Soak test arguments
+        parser.add_argument('--duration', type=float,
+                            help='Soak mode: keep drawing random hostnames and making requests for this many seconds (num_connections is ignored).')
+        parser.add_argument('--total-requests', type=int,
+                            help='Soak mode: keep drawing random hostnames until this many have been requested (num_connections is ignored).')
+        parser.add_argument('--queue-size', type=int, default=1000, help='Soak mode: the most hostnames queued for the thread workers at once. Default 1000.')
+        parser.add_argument('--rotate-interval', type=float, help='Print the full statistics of the last window every N seconds.')
+
+        # Add live metrics arguments
+        parser.add_argument('--report-interval', type=float, help='Print requests/s, error rate and latency percentiles every N seconds.')
+        parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics at http://127.0.0.1:PORT/metrics during the run.')
+        parser.add_argument('--metrics-host', default='127.0.0.1', help='Address to serve Prometheus metrics on. Default 127.0.0.1.')
+
+        # Result file arguments
+        parser.add_argument('--output-file', help='Write the result of every request to this file. With --processes, process N writes to FILE-N.')
+        parser.add_argument('--output-format', choices=ResultManager.OUTPUT_FORMATS,
+                            help='Format of --output-file. Worked out from the file extension if not given, otherwise jsonl.')
+
+        # Profiling arguments
+        parser.add_argument('--profile', nargs='?', const='cprofile', choices=ProfileManager.PROFILE_MODES,
+                            help='Profile the run and print where the time went. "cprofile" (the default) profiles every thread, '
+                                 '"sample" samples the stack of every thread, which costs far less.')
+        parser.add_argument('--profile-output', help='With --profile cprofile, also save the merged profile to this file (for pstats or snakeviz).')
+        parser.add_argument('--profile-interval', type=float, default=0.005, help='With --profile sample, seconds between samples. Default 0.005.')
+
+        # Distributed arguments
+        parser.add_argument('--listen', type=int, metavar='PORT',
+                            help='Coordinator mode: hand the sample out to agents connecting on this port and merge their statistics, '
+                                 'instead of making the requests here.')
+        parser.add_argument('--listen-host', default='127.0.0.1', help='With --listen, the address to listen on for agents. Default 127.0.0.1.')
+        parser.add_argument('--agents', type=int, default=1, help='With --listen, wait for this many agents before handing out hostnames. Default 1.')
+        parser.add_argument('--agent', metavar='HOST:PORT',
+                            help='Agent mode: make requests with num_workers workers for the coordinator at HOST:PORT, using its settings.')
+        parser.add_argument('--agent-name', help='With --agent, the name shown by the coordinator. Default the hostname of this machine.')
+
+        # Checkpoint arguments
+        parser.add_argument('--checkpoint', metavar='FILE',
+                            help='Save the progress of the run to FILE every --checkpoint-interval seconds and when it is interrupted. '
+                                 'The file is removed once the run is complete.')
+        parser.add_argument('--checkpoint-interval', type=float, default=30.0, help='With --checkpoint, seconds between checkpoints. Default 30.')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue the run saved in --checkpoint, skipping the hostnames already tested, instead of drawing a new sample.')
+
+        # Outcome cache arguments
+        parser.add_argument('--outcome-cache', metavar='FILE',
+                            help='Remember the outcome of every hostname and protocol in this sqlite database across runs. Hostnames known to be '
+                                 'dead are left out of the sample, and a protocol known to fail is skipped for hostnames that answer on the other one.')
+        parser.add_argument('--outcome-ttl', action='append', default=[], metavar='OUTCOME=SECONDS',
+                            help='With --outcome-cache, seconds to remember an outcome (success, dns, refused, timeout or error). May be given more than once. '
+                                 'Defaults success=21600, dns=604800, refused=259200, timeout=86400, error=86400.')
+        parser.add_argument('--outcome-cache-size', type=int, default=1000000, help='With --outcome-cache, the most entries to keep. Default 1000000.')
+        parser.add_argument('--dead-weight', type=float, default=0.0,
+                            help='With --outcome-cache, the chance (0-1) of keeping a known-dead hostname that is drawn into the sample. '
+                                 '0 leaves them all out, 1 keeps them all. Default 0.')
+
+        return parser
+
+    @staticmethod
+    def validate_arguments(args: argparse.Namespace) -> None:
+        """
+        Check the arguments, printing an error and exiting if any are invalid, and fill in the values worked out from them.
+        """
+        # Validate the delay arguments
+        if args.delay is not None and (args.delay < 0 or args.delay > 10):
+            print("Error: Delay must be between 0 and 10 seconds")
+            sys.exit(1)
+        if args.random_delay_max is not None and (args.random_delay_max < 0 or args.random_delay_max > 10):
+            print("Error: Random delay maximum must be between 0 and 10 seconds")
+            sys.exit(1)
+        if args.pool_size < 1:
+            print("Error: Pool size must be at least 1")
+            sys.exit(1)
+        if args.retries < 0 or args.retry_backoff < 0:
+            print("Error: Retries and retry backoff must be 0 or greater")
+            sys.exit(1)
+        if args.max_bytes < 1:
+            print("Error: Maximum bytes must be at least 1")
+            sys.exit(1)
+        if args.max_per_destination is not None and args.max_per_destination < 1:
+            print("Error: Maximum requests per destination must be at least 1")
+            sys.exit(1)
+        if args.max_per_destination is not None and args.max_per_destination < args.processes:
+            print("Error: Maximum requests per destination must be at least the number of processes, as it is split across them")
+            sys.exit(1)
+        if args.breaker_threshold is not None and args.breaker_threshold < 1:
+            print("Error: Circuit breaker threshold must be at least 1")
+            sys.exit(1)
+        if args.breaker_cooldown <= 0:
+            print("Error: Circuit breaker cooldown must be greater than 0 seconds")
+            sys.exit(1)
+        if args.connect_timeout <= 0 or args.read_timeout <= 0:
+            print("Error: Connect and read timeouts must be greater than 0 seconds")
+            sys.exit(1)
+        if args.adaptive_multiplier <= 0 or args.adaptive_min_timeout <= 0:
+            print("Error: Adaptive multiplier and minimum timeout must be greater than 0")
+            sys.exit(1)
+        if args.adaptive_warmup < 1:
+            print("Error: Adaptive warm up must be at least 1 request")
+            sys.exit(1)
+        if args.race_stagger < 0:
+            print("Error: Race stagger must be 0 or greater")
+            sys.exit(1)
+        if args.dns_ttl < 0 or args.dns_negative_ttl < 0:
+            print("Error: DNS TTLs must be 0 or greater")
+            sys.exit(1)
+        if args.dns_workers < 1:
+            print("Error: Number of DNS workers must be at least 1")
+            sys.exit(1)
+        if args.top is not None and args.top < 1:
+            print("Error: Top must be at least 1")
+            sys.exit(1)
+        if args.zipf_exponent <= 0:
+            print("Error: Zipf exponent must be greater than 0")
+            sys.exit(1)
+        try:
+            args.strata = [int(rank) for rank in args.strata.split(',')]
+        except ValueError:
+            print("Error: Strata must be comma separated ranks, for example 1000,10000,100000")
+            sys.exit(1)
+        if min(args.strata) < 1:
+            print("Error: Strata ranks must be at least 1")
+            sys.exit(1)
+        if args.rate is not None and args.rate <= 0:
+            print("Error: Rate must be greater than 0 requests per second")
+            sys.exit(1)
+        if args.burst < 1:
+            print("Error: Burst must be at least 1")
+            sys.exit(1)
+        if args.report_interval is not None and args.report_interval <= 0:
+            print("Error: Report interval must be greater than 0 seconds")
+            sys.exit(1)
+        if args.metrics_port is not None and not 0 <= args.metrics_port <= 65535:
+            print("Error: Metrics port must be between 0 and 65535")
+            sys.exit(1)
+        if args.duration is not None and args.duration <= 0:
+            print("Error: Duration must be greater than 0 seconds")
+            sys.exit(1)
+        if args.total_requests is not None and args.total_requests < 1:
+            print("Error: Total requests must be at least 1")
+            sys.exit(1)
+        if args.queue_size < 1:
+            print("Error: Queue size must be at least 1")
+            sys.exit(1)
+        if args.rotate_interval is not None and args.rotate_interval <= 0:
+            print("Error: Rotate interval must be greater than 0 seconds")
+            sys.exit(1)
+        args.soak_mode = args.duration is not None or args.total_requests is not None
+        if args.soak_mode and (args.processes > 1 or args.pre_resolve):
+            print("Error: --duration and --total-requests do not support --processes or --pre-resolve")
+            sys.exit(1)
+        if args.processes < 1:
+            print("Error: Number of processes must be at least 1")
+            sys.exit(1)
+        if args.max_workers is None:
+            args.max_workers = max(args.num_workers * 4, args.min_workers)
+        if args.min_workers < 1 or args.max_workers < args.min_workers:
+            print("Error: Minimum workers must be at least 1 and no more than maximum workers")
+            sys.exit(1)
+        if args.autoscale_interval <= 0:
+            print("Error: Autoscale interval must be greater than 0 seconds")
+            sys.exit(1)
+        if args.autoscale and args.engine != 'thread':
+            print("Error: --autoscale is only supported by the thread engine")
+            sys.exit(1)
+        if args.output_format is not None and args.output_file is None:
+            print("Error: --output-format requires --output-file")
+            sys.exit(1)
+        if args.output_file is not None:
+            args.output_format = args.output_format or ResultManager.format_from_path(args.output_file)
+        if args.output_format == 'parquet' and not ResultManager.is_parquet_available():
+            print("Error: The parquet output format requires the pyarrow package. Install it with: pip install pyarrow")
+            sys.exit(1)
+        if args.profile_interval <= 0:
+            print("Error: Profile interval must be greater than 0 seconds")
+            sys.exit(1)
+        if args.profile and args.processes > 1:
+            print("Error: --profile does not support --processes")
+            sys.exit(1)
+        if args.listen is not None and args.agent is not None:
+            print("Error: --listen and --agent can not be used together")
+            sys.exit(1)
+        if args.listen is not None and not 0 <= args.listen <= 65535:
+            print("Error: Listen port must be between 0 and 65535")
+            sys.exit(1)
+        if args.agents < 1:
+            print("Error: Number of agents must be at least 1")
+            sys.exit(1)
+        if args.listen is not None and (args.processes > 1 or args.pre_resolve or args.autoscale or args.profile or args.output_file):
+            print("Error: --listen does not support --processes, --pre-resolve, --autoscale, --profile or --output-file")
+            sys.exit(1)
+        if args.agent is not None and (args.engine != 'thread' or args.processes > 1 or args.pre_resolve or args.autoscale
+                                       or args.rate is not None or args.profile or args.metrics_port is not None or args.output_file):
+            # An agent only uses num_workers, the coordinator sends it everything else.
+            print("Error: --agent does not support --engine async, --processes, --pre-resolve, --autoscale, --rate, --profile, "
+                  "--metrics-port or --output-file")
+            sys.exit(1)
+        args.coordinator_host = args.coordinator_port = None
+        if args.agent is not None:
+            coordinator_host, _, coordinator_port = args.agent.rpartition(':')
+            if not coordinator_host or not coordinator_port.isdigit() or not 0 < int(coordinator_port) <= 65535:
+                print("Error: --agent must be given as HOST:PORT")
+                sys.exit(1)
+            args.coordinator_host = coordinator_host.strip('[]')
+            args.coordinator_port = int(coordinator_port)
+        if args.num_workers < 1:
+            print("Error: Number of workers must be at least 1")
+            sys.exit(1)
+        if args.checkpoint_interval <= 0:
+            print("Error: Checkpoint interval must be greater than 0 seconds")
+            sys.exit(1)
+        if args.resume and args.checkpoint is None:
+            print("Error: --resume requires --checkpoint")
+            sys.exit(1)
+        if args.checkpoint is not None and (args.soak_mode or args.processes > 1 or args.listen is not None or args.agent is not None):
+            print("Error: --checkpoint does not support --duration, --total-requests, --processes, --listen or --agent")
+            sys.exit(1)
+        args.outcome_ttls = outcome_ttls = {}
+        for outcome_ttl in args.outcome_ttl:
+            outcome, _, seconds = outcome_ttl.partition('=')
+            try:
+                outcome_ttls[outcome] = float(seconds)
+            except ValueError:
+                print("Error: --outcome-ttl must be given as OUTCOME=SECONDS, for example dns=604800")
+                sys.exit(1)
+            if outcome not in OutcomeCacheManager.OUTCOMES or outcome_ttls[outcome] < 0:
+                print(f"Error: Outcome TTLs must be 0 or greater, for one of {', '.join(OutcomeCacheManager.OUTCOMES)}")
+                sys.exit(1)
+        if args.outcome_cache_size < 1:
+            print("Error: Outcome cache size must be at least 1")
+            sys.exit(1)
+        if not 0 <= args.dead_weight <= 1:
+            print("Error: Dead weight must be between 0 and 1")
+            sys.exit(1)
+        if args.outcome_cache is not None and (args.listen is not None or args.agent is not None):
+            print("Error: --outcome-cache does not support --listen or --agent")
+            sys.exit(1)
+        if args.engine == 'async' and not AsyncManager.is_available():
+            print("Error: The async engine requires the aiohttp package. Install it with: pip install aiohttp")
+            sys.exit(1)
+
+    @classmethod
+    def parse_arguments(cls) -> argparse.Namespace:
+        """
+        Parse and validate the command line arguments.
+        """
+        args = cls.create_parser().parse_args()
+        cls.validate_arguments(args)
+        return args
@@ -0,0 +1,512 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              AsyncManager class used to drive requests through an asyncio event loop
+
+import asyncio
+import socket
+from collections import deque
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from PhaseTimer import PhaseTimer
+from ResultManager import ResultRecord
+from ProfileManager import ProfileManager
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncManager:
+    """
+    AsyncManager Class. An alternative to ThreadManager that keeps many requests in flight
+    from a single thread. The number of workers is the number of concurrent requests.
+    """
+    # Returned by the shared iterator once every item has been taken.
+    _NO_MORE_ITEMS = object()
+
+    def __init__(self,
+                num_workers: int,
+                connection_manager,
+                statistics_manager,
+                message_manager,
+                rate_limiter=None,
+                checkpoint_manager=None,
+                dns_workers: int = 50
+                ) -> None:
+        """
+        Initialize the AsyncManager with the number of concurrent requests and the managers
+        used to format requests, collect statistics and display output.
+        An optional rate_limiter paces how quickly requests are started, and applies the delay before each one.
+        An optional checkpoint_manager (a CheckpointManager) is told about every item that is done.
+        Hostnames that miss the DNS cache are looked up on a pool of dns_workers threads of its own.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        if aiohttp is None:
+            raise ImportError("The async engine requires the aiohttp package. Install it with: pip install aiohttp")
+        if dns_workers < 1:
+            raise ValueError("Number of DNS workers must be at least 1")
+
+        self.num_workers = num_workers
+        self.connection_manager = connection_manager
+        self.statistics_manager = statistics_manager
+        self.message_manager = message_manager
+        self.rate_limiter = rate_limiter
+        self.checkpoint_manager = checkpoint_manager
+        self.dns_workers = dns_workers
+        self.items_to_test = 0
+
+        # Hostnames put aside because their destination was busy, as (time to retry, hostname).
+        self.deferred_items = deque()
+        self.message_thread = None
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Return True if the optional aiohttp dependency is installed.
+        """
+        return aiohttp is not None
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        self.message_manager.add_to_queue(f"Number of concurrent requests = {self.num_workers}")
+        self.message_manager.add_to_queue(f"Number of items to test = {self.items_to_test}")
+        self.message_manager.add_to_queue(f"Number of DNS workers = {self.dns_workers}")
+        if self.rate_limiter is not None:
+            self.message_manager.add_to_queue(self.rate_limiter.format_settings())
+        self.message_manager.add_to_queue("-" * 30)
+
+    def create_session(self, dns_executor: ThreadPoolExecutor) -> "aiohttp.ClientSession":
+        """
+        Create the client session shared by every worker, resolving hostnames on dns_executor.
+        """
+        session_manager = self.connection_manager.session_manager
+        connector_settings = {}
+        if self.connection_manager.race_families:
+            # The connector races the address families itself (happy eyeballs).
+            connector_settings["happy_eyeballs_delay"] = self.connection_manager.race_stagger
+        connector = aiohttp.TCPConnector(
+            limit=self.num_workers * (len(self.connection_manager.protocols) if self.connection_manager.race else 1),
+            ssl=None if self.connection_manager.secure else False,
+            force_close=not session_manager.keep_alive,
+            resolver=self.create_resolver(dns_executor),
+            use_dns_cache=False,
+            **connector_settings
+        )
+        timeout_manager = self.connection_manager.timeout_manager
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout_manager.connect_timeout, sock_read=timeout_manager.read_timeout)
+        # Bodies are counted as received, before any content encoding is undone (like ConnectionManager.read_body).
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            auto_decompress=False,
+            headers=self.connection_manager.http_headers,
+            trace_configs=[self.create_trace_config()]
+        )
+
+    def create_resolver(self, dns_executor: ThreadPoolExecutor) -> "aiohttp.abc.AbstractResolver":
+        """
+        Create a resolver that looks hostnames up through the shared DNS cache, so the async
+        engine uses the same TTLs (and pre-resolved hostnames) as the thread engine.
+        Lookups run on dns_executor rather than the event loop's default executor, which is
+        sized from the number of CPUs and would let a slow resolver hold up every request.
+        """
+        dns_manager = self.connection_manager.dns_manager
+
+        class CachedResolver(aiohttp.abc.AbstractResolver):
+            async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list:
+                addresses = await asyncio.get_running_loop().run_in_executor(dns_executor, dns_manager.resolve, host)
+                results = []
+                for address in addresses:
+                    address_family = socket.AF_INET6 if ":" in address else socket.AF_INET
+                    if family not in (socket.AF_UNSPEC, address_family):
+                        continue
+                    results.append({"hostname": host, "host": address, "port": port, "family": address_family,
+                                    "proto": socket.IPPROTO_TCP, "flags": socket.AI_NUMERICHOST})
+                if not results:
+                    raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+                return results
+
+            async def close(self) -> None:
+                pass
+
+        return CachedResolver()
+
+    @staticmethod
+    def create_trace_config() -> "aiohttp.TraceConfig":
+        """
+        Create a trace config that records the DNS and connect phases of new connections into
+        the "phases" dict passed as trace_request_ctx. aiohttp does not report the TLS handshake
+        separately, so it is included in the connect phase.
+        """
+        async def on_dns_resolvehost_start(session, context, params) -> None:
+            context.dns_start = asyncio.get_running_loop().time()
+
+        async def on_dns_resolvehost_end(session, context, params) -> None:
+            dns_time = asyncio.get_running_loop().time() - context.dns_start
+            phases = context.trace_request_ctx["phases"]
+            phases["dns"] = phases.get("dns", 0.0) + dns_time
+
+        async def on_connection_create_start(session, context, params) -> None:
+            context.connect_start = asyncio.get_running_loop().time()
+            context.connect_dns = context.trace_request_ctx["phases"].get("dns", 0.0)
+
+        async def on_connection_create_end(session, context, params) -> None:
+            phases = context.trace_request_ctx["phases"]
+            # Connection creation includes name resolution, so take the DNS time back out.
+            connect_time = asyncio.get_running_loop().time() - context.connect_start
+            connect_time -= phases.get("dns", 0.0) - context.connect_dns
+            phases["connect"] = phases.get("connect", 0.0) + max(0.0, connect_time)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+
+    def error_detail(self, error: BaseException) -> str:
+        """
+        Map an aiohttp exception to the same short description used by ConnectionManager.
+        """
+        connection_timeout_error = getattr(aiohttp, "ConnectionTimeoutError", None)
+        if connection_timeout_error is not None and isinstance(error, connection_timeout_error):
+            return "Connection Timeout"
+        if isinstance(error, (aiohttp.ServerTimeoutError, asyncio.TimeoutError)):
+            return "Read timeout"
+        if isinstance(error, aiohttp.ClientProxyConnectionError):
+            return "Proxy Connection Error"
+        if isinstance(error, (aiohttp.ClientConnectorCertificateError, aiohttp.ClientSSLError)):
+            return "SSL Error"
+        if isinstance(error, aiohttp.ClientConnectorError):
+            if isinstance(error.os_error, socket.gaierror):
+                return "DNS resolution issue"
+            if isinstance(error.os_error, ConnectionRefusedError):
+                return "Connection refused"
+            return self.connection_manager.connection_error_detail(str(error))
+        if isinstance(error, aiohttp.TooManyRedirects):
+            return "Too many redirects"
+        if isinstance(error, aiohttp.InvalidURL):
+            return "Location Parse Error"
+        if isinstance(error, aiohttp.ClientPayloadError):
+            return "Content Decode Error"
+        if isinstance(error, aiohttp.ClientResponseError):
+            return "Protocol Error"
+        if isinstance(error, aiohttp.ClientConnectionError):
+            return "Connection error"
+        return ""
+
+    async def make_request(self, session: "aiohttp.ClientSession", hostname: str, worker_id: int, statistics_manager,
+                           applied_delay: int = 0, destination: Optional[str] = None) -> str:
+        """
+        Attempt to connect to a hostname using HTTPS and then HTTP, logging the results in statistics_manager.
+        Produces the same output lines and statistics as ConnectionManager.make_request.
+        If racing is enabled, the attempts are raced instead (see race_request).
+        The delay before the request is applied by the rate limiter, applied_delay is only shown in the output.
+        destination is the hostname's destination if the worker has already worked it out.
+        """
+        connection_manager = self.connection_manager
+
+        thread_info = connection_manager.format_thread_info(worker_id, applied_delay)
+
+        # Fail at once if the circuit breaker of the hostname's destination is open.
+        destination_manager = connection_manager.destination_manager
+        if destination_manager is not None:
+            if destination is None:
+                destination = destination_manager.get_destination(hostname)
+            if not destination_manager.allow(destination):
+                return connection_manager.reject_request(hostname, thread_info, statistics_manager)
+
+        # Record the hostname as skipped if every protocol is known to fail, so it still has a result.
+        protocols = connection_manager.request_protocols(hostname)
+        if not protocols:
+            return connection_manager.reject_request(hostname, thread_info, statistics_manager, "Skipped")
+
+        if connection_manager.race:
+            return await self.race_request(session, hostname, thread_info, statistics_manager, protocols, destination)
+
+        final_output = ""
+        for protocol in protocols:
+            output, error_output = await self.attempt_request(session, protocol, hostname, thread_info, statistics_manager, destination)
+
+            final_output = output or error_output
+
+            # If it is a successful HTTPS request, no need to try HTTP
+            if output:
+                break
+
+        return final_output
+
+    async def attempt_request(self, session: "aiohttp.ClientSession", protocol: str, hostname: str, thread_info: str,
+                              statistics_manager, destination: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """
+        Make a single request to protocol://hostname and record the result in statistics_manager,
+        and for the circuit breaker of destination (None if destinations are not tracked).
+        A cancelled attempt records nothing.
+
+        :return: the output line if a response was received (otherwise an empty string), and the error output line
+        """
+        connection_manager = self.connection_manager
+        proxy_settings = connection_manager.proxy_settings or {}
+        profile_manager = connection_manager.profile_manager
+
+        output = ""
+        error_output = None
+        error_detail = None
+
+        phase_times = {}
+        loop = asyncio.get_running_loop()
+        start_time = datetime.now()  # Start the timer
+        request_start = loop.time()
+
+        # Adaptive timeouts follow the latency observed so far.
+        connect_timeout, read_timeout = connection_manager.timeout_manager.get_timeouts(statistics_manager)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+
+        try:
+            # HEAD requests follow redirects like a GET would, aiohttp does not by default.
+            method = "HEAD" if connection_manager.request_mode == "head" else "GET"
+            # The network time also includes waiting for the event loop to get back to this request.
+            with ProfileManager.measure(profile_manager, "network"):
+                async with session.request(method, f"{protocol}://{hostname}", proxy=proxy_settings.get(protocol), timeout=timeout,
+                                           allow_redirects=True, trace_request_ctx={"phases": phase_times}) as response:
+                    headers_received = loop.time()
+                    num_bytes = await self.read_body(response)
+                    status_code = response.status
+                    reason = response.reason or ""
+
+            # Whatever is left after connecting is the time to first byte, the rest is the body.
+            connection_time = phase_times.get("dns", 0.0) + phase_times.get("connect", 0.0)
+            phase_times["ttfb"] = max(0.0, headers_received - request_start - connection_time)
+            phase_times["body"] = max(0.0, loop.time() - headers_received)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error_detail = self.error_detail(e)
+            if not error_detail:
+                error_output = f"{thread_info}, An error occurred while connecting to {protocol}://{hostname}: {e}"
+        except Exception as e:
+            # Anything else (such as an IDNA error for a hostname that cannot be encoded) fails only this
+            # attempt, like the RequestException catch-all of ConnectionManager.attempt_request.
+            error_detail = ""
+            error_output = f"{thread_info}, An error occurred while connecting to {protocol}://{hostname}: {e}"
+
+        end_time = datetime.now()  # Stop the timer
+
+        if connection_manager.outcome_cache is not None:
+            connection_manager.outcome_cache.record(hostname, protocol, error_detail)
+        if destination is not None:
+            connection_manager.destination_manager.record(destination, error_detail)
+
+        result_manager = connection_manager.result_manager
+        if error_detail is None:
+            with ProfileManager.measure(profile_manager, "statistics"):
+                statistics_manager.add_data(hostname, status_code, reason, end_time - start_time, phase_times, num_bytes)
+                if result_manager is not None:
+                    result_manager.add(ResultRecord(hostname, protocol, status_code, reason,
+                                                    response_time=(end_time - start_time).total_seconds(),
+                                                    phase_times=phase_times, num_bytes=num_bytes))
+            with ProfileManager.measure(profile_manager, "formatting"):
+                output = connection_manager.format_response_output(thread_info, protocol, hostname, status_code, reason)
+                if connection_manager.phase_timing:
+                    output = f"{output}, {PhaseTimer.format_phases(phase_times)}"
+        else:
+            with ProfileManager.measure(profile_manager, "statistics"):
+                statistics_manager.add_data(hostname, 0, error_detail, 0)
+                if result_manager is not None:
+                    result_manager.add(ResultRecord(hostname, protocol, 0, "", error=error_detail or "Request Error"))
+            with ProfileManager.measure(profile_manager, "formatting"):
+                error_output = error_output or connection_manager.format_error_output(thread_info, protocol, hostname, error_detail)
+
+        return output, error_output
+
+    async def read_body(self, response: "aiohttp.ClientResponse") -> int:
+        """
+        Read the response body in the request mode of the connection_manager.
+
+        :return: the number of body bytes received
+        """
+        request_mode = self.connection_manager.request_mode
+        if request_mode == "get":
+            return len(await response.read())
+        if request_mode != "capped":
+            # A response that is released before its body has been read closes its connection.
+            response.close()
+            return 0
+
+        max_bytes = self.connection_manager.max_bytes
+        num_bytes = 0
+        while num_bytes < max_bytes:
+            chunk = await response.content.read(max_bytes - num_bytes)
+            if not chunk:
+                break
+            num_bytes += len(chunk)
+        response.close()
+        return num_bytes
+
+    async def race_request(self, session: "aiohttp.ClientSession", hostname: str, thread_info: str, statistics_manager,
+                           protocols: List[str], destination: Optional[str] = None) -> str:
+        """
+        Race protocols (HTTPS and HTTP) for a hostname. The HTTP attempt is started when the HTTPS attempt fails,
+        or after race_stagger seconds, and the first response received wins. The other attempt is cancelled.
+        Address families are raced by the connector itself (see create_session).
+
+        :return: the output line of the winner, or the error output line of the last attempt if every attempt failed
+        """
+        stagger = self.connection_manager.race_stagger
+        if not protocols:
+            return self.connection_manager.reject_request(hostname, thread_info, statistics_manager, "Skipped")
+
+        positions = {}
+        results = {}
+        pending = set()
+        winner = None
+        next_attempt = 0
+        while winner is None and (next_attempt < len(protocols) or pending):
+            timeout = None
+            if next_attempt < len(protocols):
+                task = asyncio.ensure_future(self.attempt_request(session, protocols[next_attempt], hostname, thread_info, statistics_manager, destination))
+                positions[task] = next_attempt
+                pending.add(task)
+                next_attempt += 1
+                if next_attempt < len(protocols):
+                    timeout = stagger
+
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                output, error_output = task.result()
+                results[positions[task]] = output or error_output
+                if output and winner is None:
+                    winner = output
+
+        # Cancel the attempts that are still running, they do not record a result.
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return winner or results[len(protocols) - 1]
+
+    async def worker(self, session: "aiohttp.ClientSession", items: Iterator[Any], worker_id: int) -> None:
+        """
+        Worker coroutine that keeps taking hostnames until there are none left.
+        The shared iterator keeps only num_workers requests in flight at any time.
+        """
+        while True:
+            item = self.next_item(items)
+            if item is self._NO_MORE_ITEMS:
+                break
+
+            # Put the hostname aside if its destination already has the most requests in flight, and let other workers run.
+            # The destination is worked out once (with the ip key it is a DNS lookup) and passed on to make_request.
+            destination_manager = self.connection_manager.destination_manager
+            destination = None
+            if destination_manager is not None:
+                destination = destination_manager.get_destination(item)
+                if not destination_manager.try_acquire(destination):
+                    self.deferred_items.append((time.monotonic() + destination_manager.DEFER_INTERVAL, item))
+                    await asyncio.sleep(destination_manager.DEFER_INTERVAL)
+                    continue
+
+            # With checkpoints, the item's statistics are added when it is marked done, so a checkpoint never holds part of them.
+            statistics_manager = self.statistics_manager
+            if self.checkpoint_manager is not None:
+                statistics_manager = self.checkpoint_manager.item_statistics()
+
+            try:
+                # Wait for the rate limiter (and the delay before each request) once the item can start, so no slot is spent without one.
+                applied_delay = 0
+                if self.rate_limiter is not None:
+                    applied_delay = await self.rate_limiter.acquire_async()
+
+                result = await self.make_request(session, item, worker_id, statistics_manager, applied_delay, destination)
+            finally:
+                if destination is not None:
+                    destination_manager.release(destination)
+            if self.checkpoint_manager is not None:
+                self.checkpoint_manager.mark_done(item, statistics_manager)
+            self.message_manager.add_to_queue(result)
+
+    def next_item(self, items: Iterator[Any]) -> Any:
+        """
+        Take the next item. Items put aside because their destination was busy are taken once they are
+        due to be retried, or once items has run out.
+        """
+        deferred_items = self.deferred_items
+        if deferred_items and deferred_items[0][0] <= time.monotonic():
+            return deferred_items.popleft()[1]
+        item = next(items, self._NO_MORE_ITEMS)
+        if item is self._NO_MORE_ITEMS and deferred_items:
+            return deferred_items.popleft()[1]
+        return item
+
+    async def run(self, item_list: Iterable[Any]) -> None:
+        """
+        Run every item in item_list through the event loop with bounded concurrency.
+        Items are taken one at a time, so item_list may also be an endless iterator.
+        """
+        items = iter(item_list)
+        dns_executor = ThreadPoolExecutor(max_workers=self.dns_workers, thread_name_prefix="dns")
+        try:
+            async with self.create_session(dns_executor) as session:
+                workers = [self.worker(session, items, worker_id) for worker_id in range(self.num_workers)]
+                await asyncio.gather(*workers)
+        finally:
+            # Lookups still waiting on the resolver are not waited for.
+            dns_executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def limit_items(item_source: Iterable[Any], total_items: Optional[int] = None, duration: Optional[float] = None) -> Iterator[Any]:
+        """
+        Yield items from item_source until total_items have been yielded or duration seconds have passed.
+        """
+        deadline = time.monotonic() + duration if duration else None
+        for produced, item in enumerate(item_source):
+            if total_items is not None and produced >= total_items:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            yield item
+
+    def start_stream(self, item_source: Iterable[Any], total_items: Optional[int] = None, duration: Optional[float] = None) -> None:
+        """
+        Starts the AsyncManager in stream (soak) mode. Items are drawn from item_source as workers
+        become free, so only num_workers items are held at once however long the run is. Stops after
+        total_items items or duration seconds (whichever comes first), or once item_source runs out.
+        """
+        items_to_test = (f"{total_items or 'unlimited'}, "
+                         f"Duration = {f'{duration}s' if duration else 'unlimited'}")
+        self.start(self.limit_items(item_source, total_items, duration), items_to_test)
+
+    def start(self, item_list: Iterable[Any], items_to_test: Optional[Any] = None) -> None:
+        """
+        Starts the AsyncManager, starting the messages thread and running the event loop until
+        every item has been processed.
+        """
+        self.items_to_test = len(item_list) if items_to_test is None else items_to_test
+
+        # The event loop and messages thread are profiled if a profile_manager is set.
+        profile_manager = self.connection_manager.profile_manager
+        monitor_queue, run_event_loop = self.message_manager.monitor_queue, asyncio.run
+        if profile_manager is not None:
+            monitor_queue, run_event_loop = profile_manager.wrap(monitor_queue), profile_manager.wrap(run_event_loop)
+
+        # Given that we're only displaying to one stdout, only one messages thread is required.
+        self.message_thread = threading.Thread(target=monitor_queue)
+        self.message_thread.start()
+
+        self.print_variables()
+
+        try:
+            run_event_loop(self.run(item_list))
+        except KeyboardInterrupt:
+            print("Exiting due to Ctrl+C")
+        finally:
+            self.message_manager.shutdown(wait=False)
+            self.message_thread.join()
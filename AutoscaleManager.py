@@ -0,0 +1,100 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              AutoscaleManager class used to size the worker pool from the observed latency and throughput
+
+from typing import Optional
+
+
+class AutoscaleManager:
+    """
+    An AIMD (additive increase, multiplicative decrease) controller for the number of workers.
+
+    Every `interval` seconds the worker pool reports how many items were completed in the last
+    window and how long they took. While the mean latency stays within `latency_tolerance` times
+    the best mean latency seen so far (the baseline) and there is still work waiting, the pool
+    grows by `increase_step` workers. Once latency rises past that point (the target, or the proxy
+    in front of it, is saturated), the pool shrinks to `decrease_factor` of its size.
+    """
+    # How much the baseline latency may rise each window.
+    BASELINE_DRIFT = 1.05
+
+    def __init__(self,
+                min_workers: int = 1,
+                max_workers: int = 100,
+                interval: float = 2.0,
+                increase_step: int = 1,
+                decrease_factor: float = 0.7,
+                latency_tolerance: float = 2.0
+                ) -> None:
+        """
+        Initialize the AutoscaleManager.
+
+        :param min_workers: the smallest number of workers.
+        :param max_workers: the largest number of workers.
+        :param interval: seconds between scaling decisions.
+        :param increase_step: the number of workers added when there is no sign of saturation.
+        :param decrease_factor: the pool is multiplied by this when latency rises (between 0 and 1).
+        :param latency_tolerance: latency above this multiple of the baseline is treated as saturation.
+        """
+        self.CLASS_VERSION = "0.01"
+
+        if min_workers < 1:
+            raise ValueError("Minimum workers must be at least 1")
+        if max_workers < min_workers:
+            raise ValueError("Maximum workers must be at least the minimum workers")
+        if interval <= 0:
+            raise ValueError("Autoscale interval must be greater than 0 seconds")
+        if increase_step < 1:
+            raise ValueError("Increase step must be at least 1")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("Decrease factor must be between 0 and 1")
+        if latency_tolerance <= 1:
+            raise ValueError("Latency tolerance must be greater than 1")
+
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.interval = interval
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+
+        # The best mean latency (in seconds) seen in any window.
+        self.baseline_latency: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return (f"AutoscaleManager(min_workers={self.min_workers}, max_workers={self.max_workers}, "
+                f"interval={self.interval}, increase_step={self.increase_step}, decrease_factor={self.decrease_factor})")
+
+    def clamp(self, num_workers: int) -> int:
+        """
+        Keep a number of workers between min_workers and max_workers.
+        """
+        return max(self.min_workers, min(self.max_workers, num_workers))
+
+    def next_workers(self, num_workers: int, completed: int, total_latency: float, backlog: int) -> int:
+        """
+        Work out the number of workers for the next window.
+
+        :param num_workers: the current number of workers.
+        :param completed: the number of items completed in the last window.
+        :param total_latency: the total time (in seconds) spent processing those items.
+        :param backlog: the number of items waiting in the queue.
+        :return: the number of workers to use.
+        """
+        if not completed:
+            # Nothing finished in this window, so there is nothing to learn from it.
+            return self.clamp(num_workers)
+
+        mean_latency = total_latency / completed
+        if self.baseline_latency is None:
+            self.baseline_latency = mean_latency
+        else:
+            # The baseline slowly drifts up, so one unusually fast window is not remembered forever.
+            self.baseline_latency = min(mean_latency, self.baseline_latency * self.BASELINE_DRIFT)
+
+        if mean_latency > self.latency_tolerance * self.baseline_latency:
+            return self.clamp(int(num_workers * self.decrease_factor))
+        if backlog > num_workers:
+            return self.clamp(num_workers + self.increase_step)
+        return self.clamp(num_workers)
@@ -0,0 +1,291 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              BenchmarkManager class used to benchmark the request engines against a local MockServer
+
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from ConnectionManager import ConnectionManager
+from ThreadManager import ThreadManager
+from AsyncManager import AsyncManager
+from StatisticsManager import StatisticsManager
+from MessageManager import MessageManager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def get_usage() -> Dict[str, Optional[float]]:
+    """
+    Return the CPU time (in seconds) used by this process so far, and its peak memory use (in MB).
+    """
+    if resource is None:
+        return {"cpu_seconds": None, "max_rss_mb": None}
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else.
+    max_rss_mb = usage.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else usage.ru_maxrss / 1024
+    return {"cpu_seconds": usage.ru_utime + usage.ru_stime, "max_rss_mb": max_rss_mb}
+
+
+def run_case(engine: str, num_workers: int, items: List[str], settings: Dict[str, Any], result_queue: multiprocessing.Queue) -> None:
+    """
+    Run one benchmark case in its own process, so its CPU time and memory use are measured on their own,
+    and send the result back to the parent through result_queue.
+    """
+    result = None
+    error = None
+    try:
+        # The output lines are still formatted and written, so their cost is measured, but not shown.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            statistics_manager = StatisticsManager()
+            message_manager = MessageManager()
+            connection_manager = ConnectionManager(**settings["connection_settings"])
+
+            # The synthetic hostnames all resolve to the mock server (when a proxy is used, the proxy resolves them).
+            if not settings["connection_settings"].get("use_proxy"):
+                connection_manager.dns_manager.add_hosts(items, [settings["server_host"]])
+
+            usage_start = get_usage()
+            start_time = time.perf_counter()
+            if engine == "async":
+                AsyncManager(num_workers, connection_manager, statistics_manager, message_manager).start(items)
+            else:
+                thread_manager = ThreadManager(num_workers, connection_manager.make_request, statistics_manager, message_manager)
+                thread_manager.start(items, "hostnames_queue", "hostnames_thread_list")
+                thread_manager.join_threads("hostnames_thread_list")
+            duration = time.perf_counter() - start_time
+            usage_end = get_usage()
+            connection_manager.close()
+
+        result = BenchmarkManager.summarize(engine, num_workers, duration, statistics_manager, usage_start, usage_end)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        result_queue.put((result, error))
+
+
+class BenchmarkManager:
+    """
+    BenchmarkManager Class. Runs every engine with every worker count against a MockServer,
+    using synthetic hostnames, and reports the throughput, latency percentiles, CPU time and
+    peak memory of each case. Every case runs in a new process.
+    """
+    # The latency percentiles in the report.
+    PERCENTILES = (50, 90, 99, 99.9)
+
+    # The report format, increased if the fields change.
+    REPORT_VERSION = 1
+
+    def __init__(self,
+                mock_server,
+                engines: List[str],
+                worker_counts: List[int],
+                num_requests: int,
+                num_hostnames: int = 1000,
+                connection_settings: Optional[Dict[str, Any]] = None
+                ) -> None:
+        """
+        Initialize the BenchmarkManager.
+
+        :param mock_server: the MockServer the requests are made to. It must already be started.
+        :param engines: the engines to benchmark (thread and/or async).
+        :param worker_counts: the numbers of workers to benchmark each engine with.
+        :param num_requests: the number of hostnames requested in each case.
+        :param num_hostnames: the number of unique synthetic hostnames.
+        :param connection_settings: settings used to build the ConnectionManager of each case.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        if num_requests < 1 or num_hostnames < 1:
+            raise ValueError("Number of requests and number of hostnames must be at least 1")
+        if not worker_counts or min(worker_counts) < 1:
+            raise ValueError("Number of workers must be at least 1")
+
+        self.mock_server = mock_server
+        self.engines = engines
+        self.worker_counts = worker_counts
+        self.num_requests = num_requests
+        self.num_hostnames = num_hostnames
+
+        connection_settings = dict(connection_settings or {})
+        if mock_server.proxy:
+            connection_settings.update(use_proxy=True, proxy_settings={"https": mock_server.url, "http": mock_server.url})
+        # The mock server uses a self-signed certificate.
+        connection_settings["secure"] = False
+        # Without TLS every HTTPS attempt would fail, and the failures would be half of the results.
+        if not mock_server.tls:
+            connection_settings.setdefault("protocols", ["http"])
+        self.connection_settings = connection_settings
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        print(f"Engines = {self.engines}, Worker Counts = {self.worker_counts}, "
+              f"Requests per case = {self.num_requests}, Unique hostnames = {self.num_hostnames}")
+        self.mock_server.print_variables()
+
+    def create_items(self) -> List[str]:
+        """
+        Create the list of synthetic hostnames to request, cycling through num_hostnames unique names.
+        """
+        hostnames = [f"bench{number}.test:{self.mock_server.port}" for number in range(self.num_hostnames)]
+        return [hostnames[number % len(hostnames)] for number in range(self.num_requests)]
+
+    @classmethod
+    def summarize(cls, engine: str, num_workers: int, duration: float, statistics_manager, usage_start: dict, usage_end: dict) -> dict:
+        """
+        Summarize one case as plain types for the report.
+        """
+        state = statistics_manager.get_state()
+        latency = statistics_manager.latency
+
+        cpu_seconds = None
+        if usage_start["cpu_seconds"] is not None:
+            cpu_seconds = usage_end["cpu_seconds"] - usage_start["cpu_seconds"]
+
+        summary = {
+            "engine": engine,
+            "num_workers": num_workers,
+            "requests": state["total_requests"],
+            "failed_requests": state["failed_requests"],
+            "bytes_received": state["bytes_received"],
+            "duration": duration,
+            "requests_per_second": state["total_requests"] / duration if duration else None,
+            "latency_mean": latency.mean() / 1_000_000 if latency.count else None,
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": 100 * cpu_seconds / duration if cpu_seconds is not None and duration else None,
+            "max_rss_mb": usage_end["max_rss_mb"],
+            "response_codes": {str(code): count for code, _, count in state["response_codes"]}
+        }
+        for percentile in cls.PERCENTILES:
+            value = latency.percentile(percentile)
+            summary[f"latency_p{percentile}"] = None if value is None else value / 1_000_000
+        return summary
+
+    def run_case(self, engine: str, num_workers: int) -> dict:
+        """
+        Run one engine with one worker count in a new process and return its summary.
+        """
+        settings = {"connection_settings": self.connection_settings, "server_host": self.mock_server.host}
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_case, args=(engine, num_workers, self.create_items(), settings, result_queue))
+        process.start()
+
+        # The result must be read before joining, otherwise a full queue could block the child.
+        result, error = None, None
+        while result is None and error is None:
+            try:
+                result, error = result_queue.get(timeout=1)
+            except queue.Empty:
+                if not process.is_alive() and result_queue.empty():
+                    error = f"Process exited with code {process.exitcode} without reporting a result"
+        process.join()
+
+        if error:
+            raise RuntimeError(f"Benchmark of the {engine} engine with {num_workers} workers failed: {error}")
+        return result
+
+    def run(self) -> dict:
+        """
+        Run every case and return the report.
+        """
+        self.print_variables()
+        results = []
+        for engine in self.engines:
+            for num_workers in self.worker_counts:
+                print(f"Running the {engine} engine with {num_workers} workers...")
+                results.append(self.run_case(engine, num_workers))
+                print(self.format_result(results[-1]))
+
+        return {
+            "report_version": self.REPORT_VERSION,
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count()
+            },
+            "settings": {
+                "num_requests": self.num_requests,
+                "num_hostnames": self.num_hostnames,
+                "latency": self.mock_server.latency,
+                "jitter": self.mock_server.jitter,
+                "error_rate": self.mock_server.error_rate,
+                "reset_rate": self.mock_server.reset_rate,
+                "body_size": len(self.mock_server.body),
+                "tls": self.mock_server.tls,
+                "proxy": self.mock_server.proxy,
+                "connection_settings": {key: value for key, value in self.connection_settings.items() if key != "proxy_settings"}
+            },
+            "results": results
+        }
+
+    @staticmethod
+    def format_value(value: Optional[float], unit: str = "", precision: int = 1) -> str:
+        """
+        Format a number for the console, or n/a if there is no value.
+        """
+        return "n/a" if value is None else f"{value:.{precision}f}{unit}"
+
+    @classmethod
+    def format_result(cls, result: dict) -> str:
+        """
+        Format the summary of one case for the console.
+        """
+        return (f"[{result['engine']} x {result['num_workers']}] Requests: {result['requests']} "
+                f"({result['failed_requests']} failed), Rate: {cls.format_value(result['requests_per_second'])} req/s, "
+                f"p50: {cls.format_value(result['latency_p50'], 's', 4)}, p99: {cls.format_value(result['latency_p99'], 's', 4)}, "
+                f"CPU: {cls.format_value(result['cpu_percent'], '%')}, Max RSS: {cls.format_value(result['max_rss_mb'], ' MB')}")
+
+    @staticmethod
+    def write_report(report: dict, output_file: str) -> None:
+        """
+        Write the report as JSON.
+        """
+        with open(output_file, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+            report_file.write("\n")
+
+    @staticmethod
+    def load_report(report_file: str) -> dict:
+        """
+        Load a report written by write_report.
+        """
+        with open(report_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    @staticmethod
+    def compare(report: dict, baseline: dict, tolerance: float = 0.1) -> List[str]:
+        """
+        Compare a report with a baseline report. A case has regressed if its throughput is more than
+        tolerance (a fraction) below the baseline, or its p99 latency more than tolerance above it.
+
+        :return: a description of every regression, empty if there are none.
+        """
+        baseline_results = {(result["engine"], result["num_workers"]): result for result in baseline.get("results", [])}
+        regressions = []
+        for result in report["results"]:
+            previous = baseline_results.get((result["engine"], result["num_workers"]))
+            if previous is None:
+                continue
+            case = f"{result['engine']} x {result['num_workers']}"
+            if previous["requests_per_second"] and result["requests_per_second"] is not None \
+                    and result["requests_per_second"] < previous["requests_per_second"] * (1 - tolerance):
+                regressions.append(f"{case}: throughput fell from {previous['requests_per_second']:.1f} "
+                                   f"to {result['requests_per_second']:.1f} req/s")
+            if previous["latency_p99"] and result["latency_p99"] is not None \
+                    and result["latency_p99"] > previous["latency_p99"] * (1 + tolerance):
+                regressions.append(f"{case}: p99 latency rose from {previous['latency_p99']:.4f}s "
+                                   f"to {result['latency_p99']:.4f}s")
+        return regressions
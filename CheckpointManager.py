@@ -0,0 +1,220 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              CheckpointManager class used to save the progress of a run so it can be resumed
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class ItemStatistics:
+    """
+    The statistics of one hostname while it is being tested. add_data is held back until the
+    hostname is marked done (see CheckpointManager.mark_done), so a checkpoint never holds part
+    of the statistics of a hostname that is still remaining. Everything else, such as the
+    percentiles read for adaptive timeouts, comes from the shared statistics_manager.
+    """
+    __slots__ = ("checkpoint_manager", "statistics_manager", "pending", "done")
+
+    def __init__(self, checkpoint_manager: "CheckpointManager") -> None:
+        self.checkpoint_manager = checkpoint_manager
+        self.statistics_manager = checkpoint_manager.statistics_manager
+        self.pending: List[Tuple[tuple, dict]] = []
+        self.done = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.statistics_manager, name)
+
+    def add_data(self, *args, **kwargs) -> None:
+        """
+        Hold the data back until the hostname is done. Data added after that, by a raced attempt
+        that finishes late, goes straight to the statistics.
+        """
+        with self.checkpoint_manager._lock:
+            if not self.done:
+                self.pending.append((args, kwargs))
+                return
+        self.statistics_manager.add_data(*args, **kwargs)
+
+    def commit(self) -> None:
+        """
+        Add the data held back to the statistics. Must be called with the checkpoint lock held.
+        """
+        for args, kwargs in self.pending:
+            self.statistics_manager.add_data(*args, **kwargs)
+        self.pending = []
+        self.done = True
+
+
+class CheckpointManager:
+    """
+    CheckpointManager Class. Saves the progress of a run every interval seconds, so a run that is
+    interrupted can be resumed without testing the hostnames that are already done again.
+
+    A checkpoint is a JSON file holding the hostnames still to be tested, the number completed
+    and the statistics so far (StatisticsManager.get_state). It is written to a temporary file
+    which then replaces the checkpoint, so a crash while saving never leaves a broken checkpoint.
+
+    The engines call mark_done once a hostname is done. Hostnames are kept in a Counter, so a
+    sample with repeats (such as a zipf sample) is resumed with the right number of each.
+
+    A hostname is tested with an ItemStatistics (see item_statistics), and its statistics are
+    added by mark_done under the same lock as the checkpoint is taken. A checkpoint therefore
+    counts a hostname in its statistics exactly when it is no longer remaining.
+    """
+    CHECKPOINT_VERSION = 1
+
+    def __init__(self, checkpoint_file: str, statistics_manager, interval: float = 30.0) -> None:
+        """
+        Initialize the CheckpointManager.
+
+        :param checkpoint_file: the file the checkpoint is saved to.
+        :param statistics_manager: the statistics saved with every checkpoint.
+        :param interval: seconds between checkpoints.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        if interval <= 0:
+            raise ValueError("Checkpoint interval must be greater than 0 seconds")
+
+        self.checkpoint_file = checkpoint_file
+        self.statistics_manager = statistics_manager
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.checkpoint_thread = None
+
+        # The hostnames still to be tested, hostname -> count.
+        self.remaining: Counter = Counter()
+        self.completed = 0
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        print(f"Checkpoint File = {self.checkpoint_file}, Checkpoint Interval = {self.interval}s")
+
+    @classmethod
+    def load(cls, checkpoint_file: str) -> Dict[str, Any]:
+        """
+        Load a checkpoint saved by save.
+
+        :return: the remaining hostnames, the number completed and the statistics state.
+        """
+        try:
+            with open(checkpoint_file, "r", encoding="utf-8") as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Could not read checkpoint {checkpoint_file}: {e}")
+
+        if not isinstance(checkpoint, dict) or checkpoint.get("version") != cls.CHECKPOINT_VERSION:
+            raise ValueError(f"{checkpoint_file} is not a checkpoint of version {cls.CHECKPOINT_VERSION}")
+        for key in ("remaining", "completed", "statistics"):
+            if key not in checkpoint:
+                raise ValueError(f"Checkpoint {checkpoint_file} has no {key}")
+        return checkpoint
+
+    def item_statistics(self) -> ItemStatistics:
+        """
+        Get the statistics to test one hostname with, to pass to mark_done once it is done.
+        """
+        return ItemStatistics(self)
+
+    def mark_done(self, item: Any, item_statistics: Optional[ItemStatistics] = None) -> None:
+        """
+        Record that a hostname has been tested, adding the statistics held back by item_statistics.
+        """
+        with self._lock:
+            if item_statistics is not None:
+                item_statistics.commit()
+            count = self.remaining[item] - 1
+            if count > 0:
+                self.remaining[item] = count
+            else:
+                del self.remaining[item]
+            self.completed += 1
+
+    def get_checkpoint(self) -> Dict[str, Any]:
+        """
+        Get the current checkpoint.
+        """
+        # The hostnames and the statistics are read under the lock mark_done adds statistics under,
+        # so every hostname is either remaining or in the statistics, never both.
+        with self._lock:
+            remaining = list(self.remaining.elements())
+            completed = self.completed
+            statistics = self.statistics_manager.get_state()
+        return {
+            "version": self.CHECKPOINT_VERSION,
+            "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "completed": completed,
+            "remaining": remaining,
+            "statistics": statistics
+        }
+
+    def save(self) -> None:
+        """
+        Save a checkpoint. It is written to a temporary file in the same directory and then
+        moved over the checkpoint, so the checkpoint is always complete.
+        """
+        checkpoint = self.get_checkpoint()
+        directory = os.path.dirname(os.path.abspath(self.checkpoint_file))
+        file_descriptor, temp_path = tempfile.mkstemp(prefix=".checkpoint-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(checkpoint, file, separators=(",", ":"))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.checkpoint_file)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def checkpoint_worker(self) -> None:
+        """
+        Checkpoint thread. Saves a checkpoint every interval seconds.
+        """
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Error while saving checkpoint {self.checkpoint_file}: {e}")
+
+    def start(self, items: Iterable[Any], completed: int = 0) -> None:
+        """
+        Start saving checkpoints of items.
+
+        :param items: the hostnames to be tested.
+        :param completed: the number of hostnames completed before a resumed run.
+        """
+        with self._lock:
+            self.remaining = Counter(items)
+            self.completed = completed
+        self.checkpoint_thread = threading.Thread(target=self.checkpoint_worker, daemon=True)
+        self.checkpoint_thread.start()
+
+    def stop(self) -> Optional[int]:
+        """
+        Stop saving checkpoints. If hostnames are left, a last checkpoint is saved and their
+        number is returned. Otherwise the run is complete and the checkpoint is removed.
+        """
+        self._stop_event.set()
+        if self.checkpoint_thread is not None:
+            self.checkpoint_thread.join()
+            self.checkpoint_thread = None
+
+        with self._lock:
+            remaining = sum(self.remaining.values())
+        if remaining:
+            self.save()
+            return remaining
+
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        return None
@@ -1,36 +1,185 @@
 # Author:                   TheScriptGuy
-# Date:                     2025-01-03
-# Version:                  0.11
+# Date:                     2026-10-17
+# Version:                  0.21
 # Description:              ConnectionManager class used for URL connectivity operations (multithreaded)
 import requests
-import random
+import urllib3
+import socket
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib3.exceptions import InsecureRequestWarning, NewConnectionError, MaxRetryError
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from SessionManager import SessionManager
+from PhaseTimer import PhaseTimer
+from DnsManager import DnsManager
+from TimeoutManager import TimeoutManager
+from DestinationManager import DestinationManager
+from ResultManager import ResultRecord
+from ProfileManager import ProfileManager
+
+
+class AttemptStatistics:
+    """
+    The statistics and result records of one raced attempt, held back until the race is decided
+    (see ConnectionManager.race_request), so only the attempts that count are recorded. Everything
+    else, such as the percentiles read for adaptive timeouts, comes from statistics_manager.
+    """
+    __slots__ = ("statistics_manager", "data", "results")
+
+    def __init__(self, statistics_manager) -> None:
+        self.statistics_manager = statistics_manager
+        self.data: List[Tuple[tuple, dict]] = []
+        self.results: List[ResultRecord] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.statistics_manager, name)
+
+    def add_data(self, *args, **kwargs) -> None:
+        self.data.append((args, kwargs))
+
+    def commit(self, result_manager=None) -> None:
+        """
+        Add the statistics and result records held back.
+        """
+        for args, kwargs in self.data:
+            self.statistics_manager.add_data(*args, **kwargs)
+        if result_manager is not None:
+            for record in self.results:
+                result_manager.add(record)
+
 
 class ConnectionManager:
+    # Protocols are attempted in this order, HTTPS is preferred.
+    PROTOCOLS = ['https', 'http']
+
+    # How the response body is handled: "get" downloads it all, "head" sends a HEAD request,
+    # "stream" closes the response once the headers arrive, "capped" reads at most max_bytes.
+    REQUEST_MODES = ('get', 'head', 'stream', 'capped')
+
     def __init__(self, 
                 secure: bool = True,
                 use_proxy: bool = False,
                 proxy_settings: Optional[Dict[str, str]] = None,
                 http_headers: Optional[Dict[str, str]] = None,
                 delay: Optional[int] = None,
-                random_delay_max: Optional[int] = None
+                random_delay_max: Optional[int] = None,
+                pool_size: int = 10,
+                keep_alive: bool = True,
+                max_retries: int = 0,
+                retry_backoff: float = 0.0,
+                phase_timing: bool = False,
+                dns_ttl: float = 300,
+                dns_negative_ttl: float = 60,
+                race: bool = False,
+                race_stagger: float = 0.25,
+                race_families: bool = False,
+                probe_workers: int = 32,
+                connect_timeout: float = 5.0,
+                read_timeout: float = 5.0,
+                adaptive_timeout: bool = False,
+                adaptive_multiplier: float = 3.0,
+                adaptive_min_timeout: float = 0.5,
+                adaptive_warmup: int = 100,
+                request_mode: str = 'get',
+                max_bytes: int = 65536,
+                max_per_destination: Optional[int] = None,
+                destination_key: str = 'domain',
+                breaker_threshold: Optional[int] = None,
+                breaker_cooldown: float = 30.0,
+                protocols: Optional[List[str]] = None,
+                result_manager=None,
+                profile_manager=None,
+                outcome_cache=None
                 ):
-        self.CLASS_VERSION = "0.11"
+        self.CLASS_VERSION = "0.21"
         self.secure = secure
         self.use_proxy = use_proxy
         self.proxy_settings = proxy_settings if use_proxy else None
         self.http_headers = http_headers or {}
         self.delay = delay
         self.random_delay_max = random_delay_max
+        self.phase_timing = phase_timing
+        self.race = race
+        self.race_stagger = race_stagger
+        self.race_families = race_families and not use_proxy
+        self.probe_workers = probe_workers
+        self.request_mode = request_mode
+        self.max_bytes = max_bytes
+
+        # The protocols attempted for every hostname, in order of preference.
+        self.protocols = list(protocols or self.PROTOCOLS)
+
+        # Every request result is also written to a file, if a ResultManager is given.
+        self.result_manager = result_manager
+
+        # The hot path is timed into a ProfileManager, if one is given.
+        self.profile_manager = profile_manager
+
+        # The outcome of every request is remembered across runs, if an OutcomeCacheManager is given.
+        self.outcome_cache = outcome_cache
 
         # Validate delay parameters
         if delay is not None and (delay < 0 or delay > 10):
             raise ValueError("Delay must be between 0 and 10 seconds")
         if random_delay_max is not None and (random_delay_max < 0 or random_delay_max > 10):
             raise ValueError("Random delay maximum must be between 0 and 10 seconds")
+        if race_stagger < 0:
+            raise ValueError("Race stagger must be 0 or greater")
+        if probe_workers < 1:
+            raise ValueError("Number of probe workers must be at least 1")
+        if request_mode not in self.REQUEST_MODES:
+            raise ValueError(f"Request mode must be one of {', '.join(self.REQUEST_MODES)}")
+        if max_bytes < 1:
+            raise ValueError("Maximum bytes must be at least 1")
+        if any(protocol not in self.PROTOCOLS for protocol in self.protocols):
+            raise ValueError(f"Protocols must be some of {', '.join(self.PROTOCOLS)}")
+
+        # Suppress only the single warning from urllib3 needed.
+        if not self.secure:
+            urllib3.disable_warnings(category=InsecureRequestWarning)
+
+        # Each worker thread gets its own pooled, keep-alive session.
+        self.session_manager = SessionManager(
+            secure=self.secure,
+            proxy_settings=self.proxy_settings,
+            http_headers=self.http_headers,
+            pool_size=pool_size,
+            keep_alive=keep_alive,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff
+        )
+
+        # Every worker shares one DNS cache, new connections resolve hostnames through it.
+        self.dns_manager = DnsManager(ttl=dns_ttl, negative_ttl=dns_negative_ttl)
+        PhaseTimer.dns_manager = self.dns_manager
+
+        # Works out the connect and read timeouts of each request.
+        self.timeout_manager = TimeoutManager(
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            adaptive=adaptive_timeout,
+            multiplier=adaptive_multiplier,
+            min_timeout=adaptive_min_timeout,
+            warmup=adaptive_warmup
+        )
+
+        # Caps the requests in flight to each destination and runs their circuit breakers (None if neither is enabled).
+        self.destination_manager = None
+        if max_per_destination is not None or breaker_threshold is not None:
+            self.destination_manager = DestinationManager(
+                destination_key=destination_key,
+                max_in_flight=max_per_destination,
+                breaker_threshold=breaker_threshold,
+                breaker_cooldown=breaker_cooldown,
+                dns_manager=self.dns_manager,
+                proxy_settings=self.proxy_settings
+            )
+
+        # The racing attempts run on a shared pool of probe threads, created on first use.
+        self._probe_executor = None
+        self._probe_lock = threading.Lock()
 
         # Print the startup metrics
         self.print_variables()
@@ -41,161 +190,435 @@ class ConnectionManager:
         """
         print(f"Secure/Verify Connections = {self.secure}, Use Proxy = {self.use_proxy}, "
               f"Proxy Settings = {self.proxy_settings}, HTTP Headers = {self.http_headers}, "
-              f"Delay = {self.delay}s, Random Delay Max = {self.random_delay_max}s")
+              f"Delay = {self.delay}s, Random Delay Max = {self.random_delay_max}s, "
+              f"Pool Size = {self.session_manager.pool_size}, Keep-Alive = {self.session_manager.keep_alive}, "
+              f"Retries = {self.session_manager.max_retries}, Request Mode = {self.request_mode}"
+              + (f", Maximum Bytes = {self.max_bytes}" if self.request_mode == 'capped' else "")
+              + (f", Protocols = {self.protocols}" if self.protocols != self.PROTOCOLS else ""))
+        if self.race:
+            print(f"Race Protocols = {self.race}, Race Address Families = {self.race_families}, "
+                  f"Race Stagger = {self.race_stagger}s, Probe Workers = {self.probe_workers}")
+        self.dns_manager.print_variables()
+        self.timeout_manager.print_variables()
+        if self.destination_manager is not None:
+            self.destination_manager.print_variables()
+
+    @staticmethod
+    def format_thread_info(thread_id: int, applied_delay: int) -> str:
+        """
+        Format the thread id and applied delay prefix for an output line.
+        """
+        return f"TID: {thread_id}, D: {applied_delay:02d}s"
 
-    def make_request(self, hostname: str, thread_id: int, statistics_manager) -> str:
+    @staticmethod
+    def format_response_output(thread_info: str, protocol: str, hostname: str, status_code: int, reason: str) -> str:
+        """
+        Format the output line for a request that received an HTTP response.
         """
-        Attempt to connect to a hostname using HTTPS and then HTTP, logging the results.
+        # Lets check the HTTP Response code first.
+        if status_code == 400 and "query parameters specified" in reason:
+            # This is the response: Value for one of the query parameters specified in the request URI is invalid.
+            # Let us adjust that to Invalid query parm.
+            return f"{thread_info}, SC: (Invalid query parm ), Hostname: {protocol}://{hostname}"
+        if status_code == 503:
+            return f"{thread_info}, SC: {status_code} (Service Unavailable ), Hostname: {protocol}://{hostname}"
+        return f"{thread_info}, SC: {status_code} ({reason: <20}), Hostname: {protocol}://{hostname}"
+
+    @staticmethod
+    def format_error_output(thread_info: str, protocol: str, hostname: str, error_detail: str) -> str:
         """
-        # Calculate and apply delay if needed
-        applied_delay = 0
-        if self.delay is not None:
-            applied_delay = self.delay
-            time.sleep(applied_delay)
-        elif self.random_delay_max is not None:
-            applied_delay = random.randint(0, self.random_delay_max)
-            time.sleep(applied_delay)
+        Format the output line for a request that failed before an HTTP response was received.
+        """
+        return f"{thread_info}, SC: 000 ({error_detail: <20}), Hostname: {protocol}://{hostname}"
 
-        # Format delay for output
-        delay_str = f"{applied_delay:02d}"
+    @staticmethod
+    def connection_error_detail(error_message: str) -> str:
+        """
+        Work out a short description of a connection error from its message.
+        """
+        if "Name or service not known" in error_message:
+            return "DNS resolution issue"
+        if "Connection refused" in error_message:
+            return "Connection refused"
+        return "Connection error"
+
+    @staticmethod
+    def calculate_phase_times(response: requests.Response, total_time: float) -> Dict[str, float]:
+        """
+        Work out the time spent in each phase of a request that received a response.
+        The DNS, connect and TLS phases are recorded while connecting. The time to first byte
+        is what is left of requests' elapsed time (which ends once the headers are parsed),
+        and the body phase is the rest of the total time.
+        """
+        phase_times = PhaseTimer.get()
+        elapsed = sum((r.elapsed for r in response.history), response.elapsed).total_seconds()
+        connection_time = sum(phase_times.get(phase, 0.0) for phase in ("dns", "connect", "tls"))
+        phase_times["ttfb"] = max(0.0, elapsed - connection_time)
+        phase_times["body"] = max(0.0, total_time - elapsed)
+        return phase_times
+
+    @staticmethod
+    def read_body(response: requests.Response, max_bytes: Optional[int] = None) -> int:
+        """
+        Read the body of a streamed response, stopping after max_bytes (None to read it all).
+        The raw stream is read without decoding it, so the bytes counted are the bytes received,
+        before any gzip or deflate content encoding is undone. Errors are raised as the requests
+        exceptions iter_content would raise.
 
-        final_output = ""  # Variable to store the final output
+        :return: the number of body bytes received
+        """
+        num_bytes = 0
+        try:
+            for chunk in response.raw.stream(min(max_bytes or 65536, 65536), decode_content=False):
+                num_bytes += len(chunk)
+                if max_bytes is not None and num_bytes >= max_bytes:
+                    break
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except urllib3.exceptions.SSLError as e:
+            raise requests.exceptions.SSLError(e)
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        return num_bytes
+
+    def send_request(self, session: requests.Session, url: str, timeout: Tuple[float, float]) -> Tuple[requests.Response, int]:
+        """
+        Send a request in the configured request mode. The bytes counted are the body bytes received
+        before any content encoding is undone, in every mode (see read_body).
 
-        thread_info = f"TID: {thread_id}, D: {delay_str}s"
+        :return: the response, and the number of body bytes received
+        """
+        # verify is passed on every request, as REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE would override the session setting.
+        if self.request_mode == 'head':
+            # Follow redirects like a GET would, HEAD requests do not by default.
+            return session.head(url, timeout=timeout, verify=self.secure, allow_redirects=True), 0
+
+        # The body is not downloaded up front, only the headers have been read when get returns.
+        response = session.get(url, timeout=timeout, verify=self.secure, stream=True)
+        if self.request_mode == 'get':
+            try:
+                num_bytes = self.read_body(response)
+            except BaseException:
+                response.close()
+                raise
+            # A body read to the end has already released its connection back to the pool.
+            return response, num_bytes
+
+        num_bytes = 0
+        try:
+            if self.request_mode == 'capped':
+                num_bytes = self.read_body(response, self.max_bytes)
+        finally:
+            # Closing a response that has not been read to the end drops its connection.
+            response.close()
+        return response, min(num_bytes, self.max_bytes)
+
+    def pre_resolve(self, hostnames: List[str], statistics_manager, message_manager, num_workers: int = 50) -> List[str]:
+        """
+        Resolve every hostname concurrently before any requests are made, filling the DNS cache.
+        Hostnames that cannot be resolved are recorded as a DNS resolution issue (for each protocol,
+        as make_request would, including a result record) and left out of the returned list, so they never take up a worker.
+        When a proxy is used the proxy resolves the hostnames, so nothing is done.
 
-        # Suppress only the single warning from urllib3 needed.
-        if not self.secure:
-            requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+        :return: the hostnames that resolved
+        """
+        if self.use_proxy:
+            message_manager.add_to_queue("Skipping DNS pre-resolution, hostnames are resolved by the proxy")
+            return hostnames
+
+        start_time = time.perf_counter()
+        resolved, failed = self.dns_manager.pre_resolve(hostnames, num_workers=num_workers)
+
+        for hostname in failed:
+            for protocol in self.protocols:
+                statistics_manager.add_data(hostname, 0, "DNS resolution issue", 0)
+                if self.result_manager is not None:
+                    self.result_manager.add(ResultRecord(hostname, protocol, 0, "", error="DNS resolution issue"))
+                if self.outcome_cache is not None:
+                    self.outcome_cache.record(hostname, protocol, "DNS resolution issue")
+            # Like make_request, only the last protocol attempted is shown.
+            message_manager.add_to_queue(self.format_error_output("TID: DNS, D: 00s", self.protocols[-1], hostname, "DNS resolution issue"))
+
+        message_manager.add_to_queue(f"Pre-resolved {len(hostnames)} hostnames in {time.perf_counter() - start_time:.2f}s, "
+                                     f"{len(failed)} could not be resolved")
+        return resolved
+
+    def make_request(self, hostname: str, thread_id: int, statistics_manager, applied_delay: int = 0, destination: Optional[str] = None) -> str:
+        """
+        Attempt to connect to a hostname using each protocol in turn (HTTPS and then HTTP by default), logging the results.
+        If racing is enabled, the attempts are raced instead (see race_request).
+        The delay before the request is applied by the engine's rate limiter (see RateLimiter),
+        applied_delay is only shown in the output. destination is the hostname's destination
+        if the engine has already worked it out.
+        """
+        thread_info = self.format_thread_info(thread_id, applied_delay)
 
-        protocols = ['https', 'http']
-        for protocol in protocols:
-            # Lets assume an exception won't be triggered.
-            exception_triggered = False
-            exception_error = ""
-            output = ""
-            error_detail = None
-            error_output = None
+        # Fail at once if the circuit breaker of the hostname's destination is open.
+        if self.destination_manager is not None:
+            if destination is None:
+                destination = self.destination_manager.get_destination(hostname)
+            if not self.destination_manager.allow(destination):
+                return self.reject_request(hostname, thread_info, statistics_manager)
 
-            start_time = datetime.now()  # Start the timer
+        # Record the hostname as skipped if every protocol is known to fail, so it still has a result.
+        protocols = self.request_protocols(hostname)
+        if not protocols:
+            return self.reject_request(hostname, thread_info, statistics_manager, "Skipped")
 
-            # Attempting to connect to the hostname
-            try:
-                request_kwargs = {
-                    "timeout": 5,
-                    "verify": self.secure,
-                    "headers": self.http_headers
-                }
-
-                if self.use_proxy and self.proxy_settings:
-                    request_kwargs["proxies"] = self.proxy_settings
-                response = requests.get(f"{protocol}://{hostname}", **request_kwargs)
-
-                # Lets check the HTTP Response code first.
-                if response.status_code == 400:
-                    if "query parameters specified" in response.reason:
-                        # This is the response: Value for one of the query parameters specified in the request URI is invalid.
-                        # Let us adjust that to Invalid query parm.
-                        output = f"{thread_info}, SC: (Invalid query parm ), Hostname: {protocol}://{hostname}"
-                    else:
-                        # Format the result
-                        output = f"{thread_info}, SC: {response.status_code} ({response.reason: <20}), Hostname: {protocol}://{hostname}"
-                elif response.status_code == 503:
-                    output = f"{thread_info}, SC: {response.status_code} (Service Unavailable ), Hostname: {protocol}://{hostname}"
-                else:  # Handling other status codes here
-                    output = f"{thread_info}, SC: {response.status_code} ({response.reason: <20}), Hostname: {protocol}://{hostname}"
-
-            except requests.exceptions.ConnectionError as e:
-                if "Name or service not known" in str(e):
-                    error_detail = "DNS resolution issue"
-                elif "Connection refused" in str(e):
-                    error_detail = "Connection refused"
-                else:
-                    error_detail = "Connection error"
-
-                error_output = f"{thread_info}, SC: 000 ({error_detail: <20}), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-
-            except requests.exceptions.InvalidSchema:
-                error_output = f"{thread_info}, SC: 000 (Invalid Schema       ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Invalid Schema"
-
-            except requests.exceptions.ReadTimeout:
-                error_output = f"{thread_info}, SC: 000 (Read timeout        ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Read timeout"
-
-            except requests.exceptions.TooManyRedirects:
-                error_output = f"{thread_info}, SC: 000 (Too many redirects   ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Too many redirects"
-
-            except requests.exceptions.ChunkedEncodingError:
-                error_output = f"{thread_info}, SC: 000 (Chunk Encoding Error ), Hostname {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Chunked Encoding Error"
-
-            except requests.exceptions.ConnectTimeout:
-                error_output = f"{thread_info}, SC: 000 (Connection Timeout   ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Connection Timeout"            
-
-            except urllib3.exceptions.ProtocolError:
-                error_output = f"{thread_info}, SC: 000 (Protocol Error       ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Protocol Error"
-
-            except urllib3.exceptions.DecodeError:
-                error_output = f"{thread_info}, SC: 000 (Decode Error         ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Decode Error"
-
-            except requests.exceptions.ContentDecodingError:
-                error_output = f"{thread_info}, SC: 000 (Content Decode Error ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Content Decode Error"
-
-            except urllib3.exceptions.LocationParseError:
-                error_output = f"{thread_info}, SC: 000 (Location Parse Error ), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-                exception_error = "Location Parse Error"
-
-            except requetss.exceptions.SSLError:
-                if protocol == 'https':  # If HTTPS fails due to SSLError, let it retry with HTTP
-                    error_output = f"{thread_info}, SC: 000 (SSL Error            ), Hostname: {protocol}://{hostname}"
-                    continue
-
-            # Additional exception handling for proxy errors
-            except (NewConnectionError, MaxRetryError) as e:
-                error_output = f"{thread_info}, SC: 000 (Proxy Connection Error), Hostname: {protocol}://{hostname}"
-                exception_triggered = True
-
-            except requests.exceptions.RequestException as e:
-                error_output = f"{thread_info}, An error occurred while connecting to {protocol}://{hostname}: {e}"
-                exception_triggered = True
-
-            end_time = datetime.now()  # Stop the timer
-
-            if not exception_triggered:
-                # Calculate the response time
-                response_time = end_time - start_time
-
-                # Update the statistics
-                statistics_manager.add_data(hostname, response.status_code, response.reason, response_time)
-            else:
-                response_time = 0
-                statistics_manager.add_data(hostname, 0, error_detail or exception_error, response_time)
-                exception_error = ""
-                exception_triggered = False
+        if self.race:
+            return self.race_request(hostname, thread_info, statistics_manager, protocols, destination)
+
+        final_output = ""  # Variable to store the final output
+
+        for protocol in protocols:
+            output, error_output = self.attempt_request(protocol, hostname, thread_info, statistics_manager, destination)
 
             # Store the output to return after the loop ends
             final_output = output or error_output
 
-            # Display the output or error_output.
-            #print(final_output)
-
             # If it is a successful HTTPS request, no need to try HTTP
             if output:
                 break
 
         return final_output
+
+    def request_protocols(self, hostname: str) -> List[str]:
+        """
+        Get the protocols to attempt for a hostname, in order of preference. A protocol known to fail
+        for a hostname that answers on another one is left out.
+        """
+        if self.outcome_cache is None:
+            return self.protocols
+        return [protocol for protocol in self.protocols if not self.outcome_cache.should_skip(hostname, protocol)]
+
+    def reject_request(self, hostname: str, thread_info: str, statistics_manager, error_detail: str = "Circuit breaker open") -> str:
+        """
+        Record a hostname as failed with error_detail (for each protocol, as make_request would) without
+        sending a request. Used when its destination has an open circuit breaker, or every protocol is skipped.
+
+        :return: the error output line
+        """
+        for protocol in self.protocols:
+            statistics_manager.add_data(hostname, 0, error_detail, 0)
+            if self.result_manager is not None:
+                self.result_manager.add(ResultRecord(hostname, protocol, 0, "", error=error_detail))
+        # Like make_request, only the last protocol is shown.
+        return self.format_error_output(thread_info, self.protocols[-1], hostname, error_detail)
+
+    def attempt_request(self, protocol: str, hostname: str, thread_info: str, statistics_manager,
+                        destination: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """
+        Make a single request to protocol://hostname and record the result in statistics_manager,
+        and for the circuit breaker of destination (None if destinations are not tracked).
+
+        :return: the output line if a response was received (otherwise an empty string), and the error output line
+        """
+        output = ""
+        error_detail = None
+        error_output = None
+
+        # Headers, proxies and verify are already applied to the session.
+        session = self.session_manager.get_session()
+
+        start_time = datetime.now()  # Start the timer
+
+        PhaseTimer.reset()
+
+        # A (connect, read) timeout tuple, adaptive timeouts follow the latency observed so far.
+        timeout = self.timeout_manager.get_timeouts(statistics_manager)
+
+        # Attempting to connect to the hostname.
+        # The more specific exceptions are caught first, as ConnectTimeout, SSLError
+        # and ProxyError are all subclasses of ConnectionError.
+        try:
+            with ProfileManager.measure(self.profile_manager, "network"):
+                response, num_bytes = self.send_request(session, f"{protocol}://{hostname}", timeout)
+
+        except requests.exceptions.ConnectTimeout:
+            error_detail = "Connection Timeout"
+
+        except requests.exceptions.SSLError:
+            error_detail = "SSL Error"
+
+        except (requests.exceptions.ProxyError, NewConnectionError, MaxRetryError):
+            error_detail = "Proxy Connection Error"
+
+        except requests.exceptions.ConnectionError as e:
+            error_detail = self.connection_error_detail(str(e))
+
+        except requests.exceptions.InvalidSchema:
+            error_detail = "Invalid Schema"
+
+        except requests.exceptions.ReadTimeout:
+            error_detail = "Read timeout"
+
+        except requests.exceptions.TooManyRedirects:
+            error_detail = "Too many redirects"
+
+        except requests.exceptions.ChunkedEncodingError:
+            error_detail = "Chunk Encoding Error"
+
+        except urllib3.exceptions.ProtocolError:
+            error_detail = "Protocol Error"
+
+        except urllib3.exceptions.DecodeError:
+            error_detail = "Decode Error"
+
+        except requests.exceptions.ContentDecodingError:
+            error_detail = "Content Decode Error"
+
+        except urllib3.exceptions.LocationParseError:
+            error_detail = "Location Parse Error"
+
+        except requests.exceptions.RequestException as e:
+            error_output = f"{thread_info}, An error occurred while connecting to {protocol}://{hostname}: {e}"
+            error_detail = ""
+
+        end_time = datetime.now()  # Stop the timer
+
+        if self.outcome_cache is not None:
+            self.outcome_cache.record(hostname, protocol, error_detail)
+        if destination is not None:
+            self.destination_manager.record(destination, error_detail)
+
+        if error_detail is None:
+            # Calculate the response time and update the statistics
+            response_time = end_time - start_time
+            phase_times = self.calculate_phase_times(response, response_time.total_seconds())
+            with ProfileManager.measure(self.profile_manager, "statistics"):
+                statistics_manager.add_data(hostname, response.status_code, response.reason, response_time, phase_times, num_bytes)
+                if self.result_manager is not None:
+                    self.add_result(statistics_manager, ResultRecord(hostname, protocol, response.status_code, response.reason,
+                                                                     response_time=response_time.total_seconds(),
+                                                                     phase_times=phase_times, num_bytes=num_bytes))
+            with ProfileManager.measure(self.profile_manager, "formatting"):
+                output = self.format_response_output(thread_info, protocol, hostname, response.status_code, response.reason)
+                if self.phase_timing:
+                    output = f"{output}, {PhaseTimer.format_phases(phase_times)}"
+        else:
+            with ProfileManager.measure(self.profile_manager, "statistics"):
+                statistics_manager.add_data(hostname, 0, error_detail, 0)
+                if self.result_manager is not None:
+                    self.add_result(statistics_manager, ResultRecord(hostname, protocol, 0, "", error=error_detail or "Request Error"))
+            with ProfileManager.measure(self.profile_manager, "formatting"):
+                error_output = error_output or self.format_error_output(thread_info, protocol, hostname, error_detail)
+
+        return output, error_output
+
+    def add_result(self, statistics_manager, record: ResultRecord) -> None:
+        """
+        Write a result record, or hold it back with the statistics of a raced attempt (see AttemptStatistics).
+        """
+        if isinstance(statistics_manager, AttemptStatistics):
+            statistics_manager.results.append(record)
+        else:
+            self.result_manager.add(record)
+
+    def get_probe_executor(self) -> ThreadPoolExecutor:
+        """
+        Return the pool of probe threads used to race attempts, creating it on first use.
+        """
+        with self._probe_lock:
+            if self._probe_executor is None:
+                self._probe_executor = ThreadPoolExecutor(max_workers=self.probe_workers, thread_name_prefix="probe")
+            return self._probe_executor
+
+    def race_attempts(self, hostname: str, protocols: List[str]) -> List[Tuple[str, Optional[int]]]:
+        """
+        Work out the attempts to race for a hostname over protocols, in order of preference.
+        Each attempt is a protocol and an address family (None for any family). Address families
+        are only raced if the hostname has addresses in more than one of them.
+        """
+        families = [None]
+        if self.race_families:
+            try:
+                addresses = self.dns_manager.resolve(hostname.split(":", 1)[0])
+            except (socket.gaierror, UnicodeError):
+                addresses = []
+            available = [family for family in (socket.AF_INET6, socket.AF_INET)
+                         if any((":" in address) == (family == socket.AF_INET6) for address in addresses)]
+            if len(available) > 1:
+                families = available
+        return [(protocol, family) for protocol in protocols for family in families]
+
+    def race_request(self, hostname: str, thread_info: str, statistics_manager, protocols: List[str],
+                     destination: Optional[str] = None) -> str:
+        """
+        Race the attempts for a hostname over protocols (happy eyeballs style, see race_attempts). The next attempt is started when the
+        previous one fails, or after race_stagger seconds, and the first response received wins.
+
+        Every attempt records into its own AttemptStatistics. Once the race is decided, the winner and
+        the last failure of each other protocol that finished before it are recorded, so a hostname has
+        at most one result per protocol, as with make_request. Attempts that have not started are cancelled.
+        Attempts that are already running cannot be interrupted, so they finish on the probe threads and
+        their results are dropped. They still hold a request in flight to destination until they finish.
+
+        :return: the output line of the winner, or the error output line of the last attempt if every attempt failed
+        """
+        executor = self.get_probe_executor()
+        attempts = self.race_attempts(hostname, protocols)
+        if not attempts:
+            return self.reject_request(hostname, thread_info, statistics_manager, "Skipped")
+
+        def run_attempt(protocol: str, family: Optional[int], attempt_statistics: AttemptStatistics) -> Tuple[str, Optional[str]]:
+            PhaseTimer.set_family(family)
+            try:
+                return self.attempt_request(protocol, hostname, thread_info, attempt_statistics, destination)
+            finally:
+                PhaseTimer.set_family(None)
+
+        attempt_statistics = [AttemptStatistics(statistics_manager) for _ in attempts]
+        positions = {}
+        results = {}
+        finished = []
+        pending = set()
+        winner = None
+        winner_position = None
+        next_attempt = 0
+        while winner is None and (next_attempt < len(attempts) or pending):
+            timeout = None
+            if next_attempt < len(attempts):
+                future = executor.submit(run_attempt, *attempts[next_attempt], attempt_statistics[next_attempt])
+                positions[future] = next_attempt
+                pending.add(future)
+                next_attempt += 1
+                if next_attempt < len(attempts):
+                    timeout = self.race_stagger
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                output, error_output = future.result()
+                position = positions[future]
+                results[position] = output or error_output
+                if output and winner is None:
+                    winner = output
+                    winner_position = position
+                elif not output:
+                    finished.append(position)
+
+        # Record the winner, and the last failure of each other protocol that finished before it.
+        recorded = {}
+        for position in finished:
+            recorded[attempts[position][0]] = position
+        if winner_position is not None:
+            recorded[attempts[winner_position][0]] = winner_position
+        for position in sorted(recorded.values()):
+            attempt_statistics[position].commit(self.result_manager)
+
+        # Cancel the attempts that have not started yet. The ones still running keep their destination
+        # counted as in flight (the worker releases its own request once this returns) until they finish.
+        for future in pending:
+            if not future.cancel() and destination is not None:
+                self.destination_manager.hold(destination)
+                future.add_done_callback(lambda future: self.destination_manager.release(destination))
+
+        return winner or results[len(attempts) - 1]
+
+    def close(self) -> None:
+        """
+        Wait for any running probe attempts to finish, and close the pooled sessions.
+        """
+        if self._probe_executor is not None:
+            self._probe_executor.shutdown(wait=True)
+            self._probe_executor = None
+        self.session_manager.close_all()
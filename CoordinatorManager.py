@@ -0,0 +1,311 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              CoordinatorManager class used to hand out hostnames to agents on other machines and merge their statistics
+
+import json
+import queue
+import socket
+import socketserver
+import threading
+from collections import Counter, deque
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    """
+    The TCP server agents connect to, with one thread per agent.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class CoordinatorRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles the connection of one agent.
+    """
+    def handle(self) -> None:
+        self.server.coordinator_manager.handle_agent(self.connection, self.rfile, self.client_address)
+
+
+class CoordinatorManager:
+    """
+    CoordinatorManager Class. Owns the sample and the rate schedule of a distributed run.
+
+    Agents (see AgentManager) connect over TCP and exchange newline delimited JSON messages:
+        agent -> coordinator  {"type": "hello", "name": ..., "workers": ...}
+        coordinator -> agent  {"type": "settings", "connection_settings": {...}, "stats_interval": ...}
+        agent -> coordinator  {"type": "request", "count": N}
+        coordinator -> agent  {"type": "batch", "hostnames": [...]}    (an empty batch means there are no more)
+        agent -> coordinator  {"type": "stats", "state": {...}, "done": [...], "completed": N}
+        agent -> coordinator  {"type": "finished"}
+
+    Agents ask for a batch whenever their queue has room, so faster agents get more work.
+    If a rate_limiter is given, hostnames are only handed out as fast as it allows, which
+    holds the total rate across every agent. Agents send the statistics collected since
+    their last message, with the hostnames those statistics are for, which are merged into
+    statistics_manager as they arrive.
+
+    The hostnames handed to an agent stay open until it reports them done. If an agent
+    disconnects, its open hostnames are put back at the front of the sample for the other
+    agents. An agent is only told there are no more hostnames once no other agent has any
+    open. If every agent leaves before the sample is done, the run ends and agents_lost is set.
+    """
+    def __init__(self,
+                item_source: Iterable[Any],
+                statistics_manager,
+                message_manager,
+                connection_settings: Dict[str, Any],
+                listen_host: str = "127.0.0.1",
+                listen_port: int = 8600,
+                min_agents: int = 1,
+                batch_size: int = 100,
+                rate_limiter=None,
+                stats_interval: float = 1.0
+                ) -> None:
+        """
+        Initialize the CoordinatorManager.
+
+        :param item_source: the hostnames to hand out (a list, or an iterator for soak runs).
+        :param statistics_manager: the agents' statistics are merged into this.
+        :param message_manager: used for the coordinator's output.
+        :param connection_settings: the settings every agent builds its ConnectionManager from.
+        :param listen_host: the address to listen on for agents.
+        :param listen_port: the port to listen on for agents.
+        :param min_agents: no hostnames are handed out until this many agents have connected.
+        :param batch_size: the most hostnames handed out at once.
+        :param rate_limiter: paces how fast hostnames are handed out (None for no limit).
+        :param stats_interval: seconds between the statistics messages sent by each agent.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        if min_agents < 1:
+            raise ValueError("Minimum agents must be at least 1")
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        if stats_interval <= 0:
+            raise ValueError("Statistics interval must be greater than 0 seconds")
+
+        self.items = iter(item_source)
+        self.statistics_manager = statistics_manager
+        self.message_manager = message_manager
+        self.connection_settings = connection_settings
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.min_agents = min_agents
+        self.batch_size = batch_size
+        self.rate_limiter = rate_limiter
+        self.stats_interval = stats_interval
+
+        # Guards the sample, the agents and their open hostnames.
+        self._condition = threading.Condition()
+        self.source_exhausted = False
+
+        # Hostnames given back by agents that disconnected, handed out before the rest of the sample.
+        self.requeued = deque()
+
+        # agent name -> {"workers": N, "assigned": hostnames handed out, "completed": hostnames finished,
+        #                "open": Counter of the hostnames handed out and not yet reported done}
+        self.agents: Dict[str, Dict[str, Any]] = {}
+        self.active_agents = 0
+
+        # Set if every agent left before the sample was done, with the number of hostnames given back and not tested.
+        self.agents_lost = False
+        self.unfinished = 0
+
+        # Set once min_agents have connected, and once every hostname is done.
+        self.start_event = threading.Event()
+        self.finished_event = threading.Event()
+
+        self.server = None
+        self.server_thread = None
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        self.message_manager.add_to_queue(f"Coordinator listening on {self.listen_host}:{self.listen_port}, "
+                                          f"Minimum agents = {self.min_agents}, Batch size = {self.batch_size}")
+        if self.rate_limiter is not None:
+            self.message_manager.add_to_queue(self.rate_limiter.format_settings())
+        self.message_manager.add_to_queue("-" * 30)
+
+    @staticmethod
+    def send_message(connection: socket.socket, message: dict, lock: Optional[threading.Lock] = None) -> None:
+        """
+        Send a message as one line of JSON. The lock is needed if several threads send on the connection.
+        """
+        data = json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+        if lock is None:
+            connection.sendall(data)
+            return
+        with lock:
+            connection.sendall(data)
+
+    @staticmethod
+    def read_message(rfile: BinaryIO) -> Optional[dict]:
+        """
+        Read one line of JSON. Returns None once the connection has been closed.
+        """
+        line = rfile.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    def take_batch(self, agent: Dict[str, Any], count: int) -> List[Any]:
+        """
+        Take up to count hostnames (at most batch_size) for agent, waiting for the rate limiter if there is one.
+        Hostnames given back by agents that disconnected come first. An empty batch means every hostname
+        has been handed out and no other agent has any open, so none can be given back.
+        """
+        count = max(1, min(count, self.batch_size))
+        with self._condition:
+            while True:
+                batch = [self.requeued.popleft() for _ in range(min(count, len(self.requeued)))]
+                if not self.source_exhausted:
+                    batch.extend(islice(self.items, count - len(batch)))
+                    if not batch:
+                        self.source_exhausted = True
+                if batch or self.finished_event.is_set() or not agent["connected"]:
+                    break
+                if not any(other["open"] for other in self.agents.values() if other is not agent):
+                    break
+                # Another agent may still disconnect and give its open hostnames back.
+                self._condition.wait(0.5)
+            agent["assigned"] += len(batch)
+            agent["open"].update(batch)
+
+        # Waiting happens outside the lock, so the other agents can take their own batches.
+        if self.rate_limiter is not None:
+            for _ in batch:
+                self.rate_limiter.acquire()
+        return batch
+
+    def mark_done(self, agent: Dict[str, Any], done: List[Any]) -> None:
+        """
+        Record the hostnames an agent reported done.
+        """
+        with self._condition:
+            agent["open"].subtract(done)
+            agent["open"] = +agent["open"]
+            if not agent["open"]:
+                self._condition.notify_all()
+
+    def give_back(self, agent: Dict[str, Any]) -> int:
+        """
+        Put the open hostnames of an agent that disconnected back at the front of the sample.
+        Must be called with the condition held.
+
+        :return: the number of hostnames given back
+        """
+        unfinished = list(agent["open"].elements())
+        self.requeued.extendleft(reversed(unfinished))
+        agent["open"] = Counter()
+        agent["connected"] = False
+        self._condition.notify_all()
+        return len(unfinished)
+
+    def check_finished(self) -> None:
+        """
+        Set the finished event once every hostname is done and every agent has gone, or once every agent
+        has gone before the sample is done (setting agents_lost). Must be called with the condition held.
+        """
+        if self.active_agents > 0 or not self.start_event.is_set():
+            return
+        if not self.source_exhausted or self.requeued:
+            self.agents_lost = True
+            self.unfinished = len(self.requeued)
+        self.finished_event.set()
+
+    def batch_worker(self, connection: socket.socket, agent: Dict[str, Any], batch_requests: queue.Queue) -> None:
+        """
+        Batch thread of one agent. Answers its requests for hostnames, so its statistics are still read
+        while a request waits for hostnames to be given back.
+        """
+        while True:
+            count = batch_requests.get()
+            if count is None:
+                return
+            batch = self.take_batch(agent, count)
+            try:
+                self.send_message(connection, {"type": "batch", "hostnames": batch})
+            except OSError:
+                return
+
+    def handle_agent(self, connection: socket.socket, rfile: BinaryIO, address) -> None:
+        """
+        Serve one agent until it has finished or disconnected.
+        """
+        try:
+            hello = self.read_message(rfile)
+        except (OSError, ValueError):
+            return
+        if not hello or hello.get("type") != "hello":
+            return
+
+        name = f"{hello.get('name') or 'agent'} ({address[0]}:{address[1]})"
+        agent = {"workers": hello.get("workers", 0), "assigned": 0, "completed": 0, "open": Counter(), "connected": True}
+        with self._condition:
+            self.agents[name] = agent
+            self.active_agents += 1
+            if self.active_agents >= self.min_agents:
+                self.start_event.set()
+        self.message_manager.add_to_queue(f"Agent {name} connected with {agent['workers']} workers")
+
+        batch_requests = queue.Queue()
+        try:
+            self.send_message(connection, {"type": "settings", "connection_settings": self.connection_settings,
+                                           "stats_interval": self.stats_interval})
+            self.start_event.wait()
+            threading.Thread(target=self.batch_worker, args=(connection, agent, batch_requests), daemon=True).start()
+
+            while not self.finished_event.is_set():
+                message = self.read_message(rfile)
+                if message is None or message.get("type") == "finished":
+                    break
+                if message.get("type") == "request":
+                    batch_requests.put(int(message.get("count", self.batch_size)))
+                elif message.get("type") == "stats":
+                    self.statistics_manager.merge_state(message["state"])
+                    self.mark_done(agent, message.get("done", []))
+                    agent["completed"] = message.get("completed", agent["completed"])
+        except (OSError, ValueError, KeyError) as e:
+            self.message_manager.add_to_queue(f"Agent {name} connection error: {e}")
+        finally:
+            batch_requests.put(None)
+            with self._condition:
+                unfinished = self.give_back(agent)
+                self.active_agents -= 1
+                self.check_finished()
+            self.message_manager.add_to_queue(f"Agent {name} disconnected after {agent['completed']} hostnames"
+                                              + (f", {unfinished} hostnames it was given were not finished and were put back"
+                                                 if unfinished else ""))
+
+    def start(self) -> None:
+        """
+        Start listening for agents, and return once every hostname is done, every agent has left
+        before the sample is done (agents_lost is set) or Ctrl+C is pressed.
+        """
+        self.server = CoordinatorServer((self.listen_host, self.listen_port), CoordinatorRequestHandler)
+        self.server.coordinator_manager = self
+        self.listen_port = self.server.server_address[1]
+
+        message_thread = threading.Thread(target=self.message_manager.monitor_queue)
+        message_thread.start()
+        self.print_variables()
+
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+
+        try:
+            # A timeout keeps the main thread able to receive Ctrl+C.
+            while not self.finished_event.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            print("Exiting due to Ctrl+C")
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+            self.message_manager.shutdown(wait=False)
+            message_thread.join()
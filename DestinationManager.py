@@ -0,0 +1,244 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.03
+# Description:              DestinationManager class used to cap the requests in flight to each destination and run circuit breakers
+
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from DnsManager import DnsManager
+
+
+class CircuitBreaker:
+    """
+    The circuit breaker state of one destination.
+    """
+    __slots__ = ("timeouts", "opened_at", "probe_started")
+
+    def __init__(self) -> None:
+        # Timeouts in a row, when the breaker was opened, and when the probe of a half-open breaker was let through.
+        self.timeouts = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started: Optional[float] = None
+
+
+class DestinationManager:
+    """
+    DestinationManager Class. Keeps one slow destination (a domain, an address or a proxy) from
+    tying up every worker.
+
+    The engines work out the destination of a hostname once (get_destination, a DNS lookup with
+    the ip key) and pass it to the other methods. try_acquire caps the requests in flight to
+    each destination. The engines put a hostname whose destination is at the cap aside, retry
+    it after DEFER_INTERVAL seconds and take other work in the meantime.
+
+    Every destination also has a circuit breaker. It opens after breaker_threshold timeouts
+    in a row, and allow then fails its hostnames at once instead of waiting for more timeouts.
+    After breaker_cooldown seconds the breaker is half-open. One probe request is let through,
+    and its outcome closes the breaker or opens it for another cooldown.
+    """
+    DESTINATION_KEYS = ("domain", "ip", "proxy")
+
+    # The error details (see ConnectionManager.attempt_request) counted as timeouts.
+    TIMEOUT_ERRORS = ("Connection Timeout", "Read timeout")
+
+    # Seconds a hostname put aside waits before it is tried again.
+    DEFER_INTERVAL = 0.05
+
+    # Labels used under country code top level domains for registrations, as in example.co.uk.
+    SECOND_LEVEL_LABELS = frozenset(("ac", "co", "com", "edu", "go", "gob", "gov", "mil", "ne", "net", "or", "org"))
+
+    def __init__(self,
+                destination_key: str = "domain",
+                max_in_flight: Optional[int] = None,
+                breaker_threshold: Optional[int] = None,
+                breaker_cooldown: float = 30.0,
+                dns_manager=None,
+                proxy_settings: Optional[Dict[str, str]] = None
+                ) -> None:
+        """
+        Initialize the DestinationManager.
+
+        :param destination_key: what counts as one destination, domain (the registrable domain), ip (the first resolved address) or proxy.
+        :param max_in_flight: the most requests in flight to one destination (None for no cap).
+        :param breaker_threshold: the number of timeouts in a row that open a circuit breaker (None for no circuit breakers).
+        :param breaker_cooldown: seconds before an open circuit breaker lets a probe request through.
+        :param dns_manager: resolves hostnames for the ip destination key.
+        :param proxy_settings: the proxies, for the proxy destination key.
+        """
+        self.CLASS_VERSION = "0.03"
+
+        if destination_key not in self.DESTINATION_KEYS:
+            raise ValueError(f"Destination key must be one of {', '.join(self.DESTINATION_KEYS)}")
+        if destination_key == "ip" and dns_manager is None:
+            raise ValueError("The ip destination key requires a DNS manager")
+        if destination_key == "proxy" and not proxy_settings:
+            raise ValueError("The proxy destination key requires a proxy")
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("Maximum requests per destination must be at least 1")
+        if breaker_threshold is not None and breaker_threshold < 1:
+            raise ValueError("Circuit breaker threshold must be at least 1")
+        if breaker_cooldown <= 0:
+            raise ValueError("Circuit breaker cooldown must be greater than 0 seconds")
+
+        self.destination_key = destination_key
+        self.max_in_flight = max_in_flight
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.dns_manager = dns_manager
+        self.proxy_settings = proxy_settings
+
+        self._lock = threading.Lock()
+
+        # Destination -> requests in flight. Only destinations with requests in flight are kept.
+        self.in_flight: Dict[str, int] = {}
+
+        # Destination -> circuit breaker. Only destinations that have timed out since their last answer are kept.
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+        self.deferred = 0
+        self.rejected = 0
+        self.breakers_opened = 0
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        output = f"Destination Key = {self.destination_key}, Maximum Requests per Destination = {self.max_in_flight or 'unlimited'}"
+        if self.breaker_threshold is not None:
+            output += f", Circuit Breaker Threshold = {self.breaker_threshold} timeouts, Circuit Breaker Cooldown = {self.breaker_cooldown}s"
+        print(output)
+
+    @classmethod
+    def registrable_domain(cls, host: str) -> str:
+        """
+        Work out the registrable domain of a host, for example example.co.uk for www.example.co.uk.
+        Without the public suffix list this is the last two labels, or three under a country code
+        top level domain when the second label is a common registration label.
+        """
+        labels = host.rstrip(".").lower().split(".")
+        if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in cls.SECOND_LEVEL_LABELS:
+            return ".".join(labels[-3:])
+        return ".".join(labels[-2:])
+
+    def get_destination(self, hostname: str) -> str:
+        """
+        Work out the destination of a hostname (which may include a port).
+        """
+        if self.destination_key == "proxy":
+            return self.proxy_settings.get("https") or self.proxy_settings.get("http")
+
+        # Leave out the port, if there is one.
+        if hostname.startswith("["):
+            host = hostname[1:].split("]", 1)[0]
+        elif hostname.count(":") == 1:
+            host = hostname.split(":", 1)[0]
+        else:
+            host = hostname
+        if DnsManager.is_ip_address(host):
+            return host
+
+        if self.destination_key == "ip":
+            try:
+                return self.dns_manager.resolve(host)[0]
+            except (socket.gaierror, UnicodeError, IndexError):
+                # Hostnames that do not resolve fail quickly, each is its own destination.
+                return host
+        return self.registrable_domain(host)
+
+    def try_acquire(self, destination: str) -> bool:
+        """
+        Start a request to destination, unless it already has max_in_flight requests in flight.
+
+        :return: True if the request may start (call release once it is done), False if the destination is busy
+        """
+        with self._lock:
+            count = self.in_flight.get(destination, 0)
+            if self.max_in_flight is not None and count >= self.max_in_flight:
+                self.deferred += 1
+                return False
+            self.in_flight[destination] = count + 1
+        return True
+
+    def hold(self, destination: str) -> None:
+        """
+        Count one more request in flight to destination, whatever the cap, for a request that outlives
+        the one that was let through by try_acquire (such as a raced attempt still running once the race
+        is won). Call release once it is done.
+        """
+        with self._lock:
+            self.in_flight[destination] = self.in_flight.get(destination, 0) + 1
+
+    def release(self, destination: str) -> None:
+        """
+        Record that a request to destination started by try_acquire is done.
+        """
+        with self._lock:
+            count = self.in_flight.get(destination, 0) - 1
+            if count > 0:
+                self.in_flight[destination] = count
+            else:
+                self.in_flight.pop(destination, None)
+
+    def allow(self, destination: str) -> bool:
+        """
+        Return False if the circuit breaker of destination is open, so the request should fail at once.
+        """
+        if self.breaker_threshold is None:
+            return True
+
+        with self._lock:
+            breaker = self.breakers.get(destination)
+            if breaker is None or breaker.opened_at is None:
+                return True
+
+            now = time.monotonic()
+            # While open, and while the probe of a half-open breaker is running, every request fails at once.
+            # A probe that never reports back is replaced after another cooldown.
+            if (now - breaker.opened_at < self.breaker_cooldown
+                    or (breaker.probe_started is not None and now - breaker.probe_started < self.breaker_cooldown)):
+                self.rejected += 1
+                return False
+            breaker.probe_started = now
+            return True
+
+    def record(self, destination: str, error_detail: Optional[str]) -> None:
+        """
+        Record the outcome of a request to destination for its circuit breaker.
+
+        :param error_detail: the error detail of the request, None if a response was received.
+        """
+        if self.breaker_threshold is None:
+            return
+
+        with self._lock:
+            breaker = self.breakers.get(destination)
+            if error_detail not in self.TIMEOUT_ERRORS:
+                # The destination answered (even with an error), so its breaker is closed.
+                if breaker is not None:
+                    del self.breakers[destination]
+                return
+
+            if breaker is None:
+                breaker = self.breakers[destination] = CircuitBreaker()
+            breaker.timeouts += 1
+            if breaker.opened_at is None:
+                if breaker.timeouts >= self.breaker_threshold:
+                    breaker.opened_at = time.monotonic()
+                    self.breakers_opened += 1
+            elif breaker.probe_started is not None:
+                # The probe timed out, so the breaker stays open for another cooldown.
+                breaker.opened_at = time.monotonic()
+                breaker.probe_started = None
+
+    def format_statistics(self) -> str:
+        """
+        Format the destination statistics for user friendly output.
+        """
+        with self._lock:
+            open_breakers = sum(1 for breaker in self.breakers.values() if breaker.opened_at is not None)
+        return (f"Destinations: {self.deferred} hostnames put aside for a busy destination, "
+                f"{self.breakers_opened} circuit breakers opened ({open_breakers} still open), "
+                f"{self.rejected} hostnames failed at once by an open circuit breaker")
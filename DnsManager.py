@@ -0,0 +1,167 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              DnsManager class used for a shared DNS cache and a pre-resolution stage
+
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+
+class DnsManager:
+    """
+    A thread-safe DNS cache shared by every worker.
+
+    Successful lookups are cached for `ttl` seconds and failed lookups (for example NXDOMAIN)
+    for `negative_ttl` seconds. The system resolver does not return record TTLs, so the TTLs
+    are configured here. If several workers look up the same hostname at once, only one
+    lookup is sent and the others wait for its result.
+    """
+    def __init__(self, ttl: float = 300, negative_ttl: float = 60, max_entries: int = 100000) -> None:
+        """
+        Initialize the DnsManager.
+
+        :param ttl: seconds to cache a successful lookup (0 disables caching).
+        :param negative_ttl: seconds to cache a failed lookup (0 disables negative caching).
+        :param max_entries: the maximum number of hostnames kept in the cache.
+        """
+        self.CLASS_VERSION = "0.01"
+
+        if ttl < 0 or negative_ttl < 0:
+            raise ValueError("DNS TTLs must be 0 or greater")
+        if max_entries < 1:
+            raise ValueError("DNS cache size must be at least 1")
+
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+
+        # hostname -> (expiry time, list of addresses or the socket.gaierror raised)
+        self._cache: Dict[str, Tuple[float, object]] = {}
+        # hostname -> [event set once the in-flight lookup has finished, its result]
+        self._in_flight: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        print(f"DNS Cache TTL = {self.ttl}s, DNS Negative TTL = {self.negative_ttl}s, DNS Cache Size = {self.max_entries}")
+
+    @staticmethod
+    def is_ip_address(host: str) -> bool:
+        """
+        Return True if host is an IPv4 or IPv6 address literal.
+        """
+        try:
+            ipaddress.ip_address(host.strip("[]"))
+            return True
+        except ValueError:
+            return False
+
+    @staticmethod
+    def lookup(host: str) -> List[str]:
+        """
+        Look up a hostname with the system resolver, returning the unique addresses in order.
+        """
+        addresses = []
+        for _, _, _, _, sockaddr in socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM):
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        return addresses
+
+    def store(self, host: str, result: object, ttl: float) -> None:
+        """
+        Store a lookup result in the cache. Must be called with the lock held.
+        """
+        if ttl <= 0:
+            return
+        self._cache.pop(host, None)
+        self._cache[host] = (time.monotonic() + ttl, result)
+
+        # The cache keeps insertion order, so the first entries are the oldest.
+        while len(self._cache) > self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+    def add_hosts(self, hostnames: Iterable[str], addresses: List[str]) -> None:
+        """
+        Add hostnames that always resolve to the given addresses and never expire,
+        for example synthetic hostnames pointing at a local test server.
+        """
+        with self._lock:
+            for host in hostnames:
+                self.store(host.split(":", 1)[0], list(addresses), float("inf"))
+
+    def resolve(self, host: str) -> List[str]:
+        """
+        Resolve a hostname to its addresses, using the cache where possible.
+        Raises socket.gaierror if the hostname cannot be resolved.
+        """
+        if self.is_ip_address(host):
+            return [host.strip("[]")]
+
+        with self._lock:
+            entry = self._cache.get(host)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                result = entry[1]
+                in_flight = None
+            else:
+                in_flight = self._in_flight.get(host)
+                owner = in_flight is None
+                if owner:
+                    # This thread does the lookup, any others wait for its result.
+                    in_flight = self._in_flight[host] = [threading.Event(), None]
+                    self.lookups += 1
+
+        if in_flight is not None and not owner:
+            in_flight[0].wait()
+            result = in_flight[1]
+        elif in_flight is not None:
+            result = None
+            try:
+                result = self.lookup(host)
+                ttl = self.ttl
+            except socket.gaierror as e:
+                result = e
+                ttl = self.negative_ttl
+            finally:
+                with self._lock:
+                    if result is not None:
+                        self.store(host, result, ttl)
+                    del self._in_flight[host]
+                # If the lookup raised anything else, the waiting threads see a failed lookup.
+                in_flight[1] = result if result is not None else socket.gaierror(socket.EAI_FAIL, "Name resolution failed")
+                in_flight[0].set()
+
+        if isinstance(result, socket.gaierror):
+            raise result
+        return list(result)
+
+    def pre_resolve(self, hostnames: Iterable[str], num_workers: int = 50) -> Tuple[List[str], List[str]]:
+        """
+        Resolve every hostname concurrently, filling the cache before the HTTP phase starts.
+
+        :return: the hostnames that resolved, and the hostnames that failed to resolve.
+        """
+        hostnames = list(hostnames)
+
+        def try_resolve(hostname: str) -> bool:
+            try:
+                self.resolve(hostname.split(":", 1)[0])
+                return True
+            except (socket.gaierror, UnicodeError):
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+            results = list(executor.map(try_resolve, hostnames))
+
+        resolved = [hostname for hostname, ok in zip(hostnames, results) if ok]
+        failed = [hostname for hostname, ok in zip(hostnames, results) if not ok]
+        return resolved, failed
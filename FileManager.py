@@ -1,87 +1,207 @@
 # Author:                   TheScriptGuy
-# Date:                     2023-10-24
-# Version:                  0.01
+# Date:                     2026-10-17
+# Version:                  0.06
 # Description:              FileManager class used for file operations
 
 import os
+import glob
+import json
 import random
 import sys
+import time
 import requests
-import csv
+import math
 import zipfile
+from itertools import islice
+from typing import Iterator, Optional
+from HostnameIndex import HostnameIndex
 
 
 class FileManager:
-    def __init__(self, __date: str):
-        self.CLASS_VERSION = "0.01"
+    def __init__(self, __date: str, cache_dir: str = "cache", revalidate_after: int = 3600, sampling_manager=None):
+        self.CLASS_VERSION = "0.06"
+        self.date = __date
         self.url = f"http://s3-us-west-1.amazonaws.com/umbrella-static/top-1m-{__date}.csv.zip"
         self.zip_path = "top-1m.csv.zip"
-        self.response = None
-        self.hostnames = []
+        self.cache_dir = cache_dir
+        self.revalidate_after = revalidate_after
+        self.csv_name = "top-1m.csv"
         self.random_sample = []
+        self.index = None
 
-    def download_file(self, __url: str) -> requests.Response:
+        # Draws samples from the hostname index by rank (None for a uniform sample).
+        self.sampling_manager = sampling_manager
+
+    def get_cache_path(self, __date: str) -> str:
         """
-        Download the file and return the response.
+        Get the path of the cached ZIP file for a list date.
         """
-        print(f"Attempting to download source file {__url}")
-        try:
-            self.response = requests.get(__url)
-            self.response.raise_for_status()  # Check for HTTP errors (404 in this case)
-            print("Download successful.")
-        except requests.exceptions.RequestException as e:
-            print(f"Error while downloading the file. {e}")
-            sys.exit(1)
+        return os.path.join(self.cache_dir, f"top-1m-{__date}.csv.zip")
 
     @staticmethod
-    def save_file(__response_content, __zip_path: str) -> None:
+    def load_cache_metadata(__zip_path: str) -> dict:
         """
-        Save the response content to a file.
+        Load the ETag/Last-Modified metadata stored next to a cached ZIP file.
         """
-        print("Saving contents to file.")
-        with open(__zip_path, 'wb') as file:
-            file.write(__response_content)
-        print("Save successful.")
+        try:
+            with open(f"{__zip_path}.json", mode='r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
 
     @staticmethod
-    def unzip_file(__zip_path: str) -> None:
+    def save_cache_metadata(__zip_path: str, metadata: dict) -> None:
+        """
+        Save the ETag/Last-Modified metadata next to a cached ZIP file.
         """
-        Unzip the downloaded file.
+        with open(f"{__zip_path}.json", mode='w', encoding='utf-8') as file:
+            json.dump(metadata, file)
+
+    def get_newest_cached_file(self) -> str:
         """
-        print(f"Attempting to extract {__zip_path}")
+        Get the path of the newest cached ZIP file, or an empty string if there is none.
+        """
+        cached_files = sorted(glob.glob(os.path.join(self.cache_dir, "top-1m-*.csv.zip")))
+        return cached_files[-1] if cached_files else ""
+
+    def download_to_cache(self, offline: bool = False) -> None:
+        """
+        Make sure the ZIP file for the list date is in the cache directory, and point zip_path at it.
+
+        A cached file that was checked within revalidate_after seconds is used straight away.
+        Otherwise the cached file is revalidated with If-None-Match/If-Modified-Since, and a new
+        file is streamed to disk in chunks. If the download fails, the newest cached list is used.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self.get_cache_path(self.date)
+        metadata = self.load_cache_metadata(cache_path) if os.path.exists(cache_path) else {}
+
+        if metadata and (offline or time.time() - metadata.get("checked", 0) < self.revalidate_after):
+            print(f"Using cached source file {cache_path}")
+            self.zip_path = cache_path
+            return
+
+        if offline:
+            self.use_newest_cached_file("Offline mode and no cached file for this date.")
+            return
+
+        headers = {}
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+        print(f"Attempting to download source file {self.url}")
         try:
-            with zipfile.ZipFile(__zip_path, 'r') as zip_ref:
-                zip_ref.extractall()
-            print(f"Extraction successful.")
+            with requests.get(self.url, headers=headers, stream=True, timeout=30) as response:
+                if response.status_code == 304:
+                    print("Cached source file is up to date.")
+                else:
+                    response.raise_for_status()  # Check for HTTP errors (404 in this case)
+
+                    # Stream the download to a temporary file so a failed download never replaces a good one.
+                    temporary_path = f"{cache_path}.part"
+                    with open(temporary_path, 'wb') as file:
+                        for chunk in response.iter_content(chunk_size=1024 * 1024):
+                            file.write(chunk)
+                    os.replace(temporary_path, cache_path)
+                    print("Download successful.")
+
+                    metadata = {
+                        "url": self.url,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified")
+                    }
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"Error while downloading the file. {e}")
+            self.use_newest_cached_file("No cached source file to fall back to.")
+            return
+
+        metadata["checked"] = time.time()
+        self.save_cache_metadata(cache_path, metadata)
+        self.zip_path = cache_path
+
+    def use_newest_cached_file(self, __error_message: str) -> None:
+        """
+        Point zip_path at the newest cached ZIP file, or exit if there is none.
+        """
+        newest_cached_file = self.get_newest_cached_file()
+        if not newest_cached_file:
+            print(__error_message)
+            sys.exit(1)
+        print(f"Falling back to cached source file {newest_cached_file}")
+        self.zip_path = newest_cached_file
+
+    def stream_csv_lines(self) -> Iterator[bytes]:
+        """
+        Stream the raw CSV lines straight out of the ZIP file, without extracting it.
+        """
+        try:
+            with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
+                member = self.csv_name if self.csv_name in zip_ref.namelist() else zip_ref.namelist()[0]
+                with zip_ref.open(member, 'r') as csv_file:
+                    yield from csv_file
         except zipfile.BadZipFile:
             print(f"Downloaded zip file is not a zip file.")
             sys.exit(1)
 
-    def download_and_extract_file(self, date: str) -> None:
+    @staticmethod
+    def parse_hostname(line: bytes) -> str:
         """
-        Download and extract the ZIP file containing hostnames.
+        Get the hostname from a raw "rank,hostname" CSV line.
         """
-        # Download the file from self.url
-        self.download_file(self.url)  # Download the file
+        return line.decode('utf-8').rstrip('\r\n').split(',', 1)[1]
 
-        # Save the response to the zip_path
-        self.save_file(self.response.content, self.zip_path)  # Save the downloaded file
+    @staticmethod
+    def reservoir_sample(items: Iterator, __sample_size: int) -> list:
+        """
+        Pick a uniform random sample from an iterator in a single pass using O(sample size) memory.
+        Uses Algorithm L, which skips over items without looking at them, so only the
+        picked items need to be parsed.
+        """
+        items = iter(items)
+        reservoir = list(islice(items, __sample_size))
+        if len(reservoir) < __sample_size or __sample_size == 0:
+            random.shuffle(reservoir)
+            return reservoir
 
-        # Set the response to None
-        self.response = None
+        # 1.0 - random.random() is in (0, 1], so log() never sees 0.
+        weight = math.exp(math.log(1.0 - random.random()) / __sample_size)
+        while True:
+            if weight >= 1.0:
+                break
+            skip = math.floor(math.log(1.0 - random.random()) / math.log(1.0 - weight))
+            item = next(islice(items, skip, skip + 1), None)
+            if item is None:
+                break
+            reservoir[random.randrange(__sample_size)] = item
+            weight *= math.exp(math.log(1.0 - random.random()) / __sample_size)
 
-        # Unzip the file.
-        self.unzip_file(self.zip_path)  # Unzip the saved file
+        # The reservoir keeps the order the items were read in, so shuffle it like random.sample would.
+        random.shuffle(reservoir)
+        return reservoir
 
-    def load_csv(self) -> None:
+    def get_index_path(self) -> str:
         """
-        Load the hostnames from the CSV file into a list.
+        Get the path of the hostname index that belongs to the current ZIP file.
         """
+        return f"{self.zip_path[:-len('.csv.zip')]}.idx" if self.zip_path.endswith(".csv.zip") else f"{self.zip_path}.idx"
 
-        with open("top-1m.csv", mode='r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                self.hostnames.append(row[1])
+    def load_index(self) -> None:
+        """
+        Load the compact hostname index for the current ZIP file, building it first if required.
+        The index only has to be built once per list, later runs memory map it straight away.
+        """
+        zip_stat = os.stat(self.zip_path)
+        index = HostnameIndex(self.get_index_path())
+        if not index.open(zip_stat.st_size, zip_stat.st_mtime_ns):
+            print(f"Building hostname index {index.index_path}")
+            HostnameIndex.build(index.index_path, self.stream_csv_lines(), zip_stat.st_size, zip_stat.st_mtime_ns)
+            if not index.open(zip_stat.st_size, zip_stat.st_mtime_ns):
+                print(f"Unable to load hostname index {index.index_path}")
+                sys.exit(1)
+        print(f"Loaded hostname index with {len(index)} hostnames.")
+        self.index = index
 
     @staticmethod
     def cleanup_files(files_to_remove: list[str]) -> None:
@@ -99,8 +219,66 @@ class FileManager:
                 print(f"An error occurred while trying to remove '{file_path}': {e}")
                 sys.exit(1)
 
-    def get_random_sample(self, __num_connections: int) -> None:
+    # The files kept in the cache directory for each list: the list, its metadata and its hostname index,
+    # and any partly written download or index.
+    CACHE_FILE_PATTERNS = ("top-1m-*.csv.zip", "top-1m-*.csv.zip.json", "top-1m-*.csv.zip.part", "top-1m-*.idx", "top-1m-*.idx.part")
+
+    @staticmethod
+    def cleanup_cache(__cache_dir: str) -> None:
+        """
+        Remove every cached list, its metadata and its hostname index from the cache directory,
+        and the cache directory itself if nothing else is left in it.
+        """
+        if not os.path.isdir(__cache_dir):
+            print(f"No such directory: '{__cache_dir}'")
+            return
+        cached_files = sorted(path for pattern in FileManager.CACHE_FILE_PATTERNS
+                              for path in glob.glob(os.path.join(__cache_dir, pattern)))
+        FileManager.cleanup_files(cached_files)
+        try:
+            if not os.listdir(__cache_dir):
+                os.rmdir(__cache_dir)
+                print(f"Successfully removed {__cache_dir}")
+        except OSError as e:
+            print(f"An error occurred while trying to remove '{__cache_dir}': {e}")
+            sys.exit(1)
+
+    def get_random_sample(self, __num_connections: int, top: Optional[int] = None) -> None:
+        """
+        Get a random sample of from the __hostnames, optionally limited to the top ranked hostnames.
+        The hostname index is used if it has been loaded, with the sampling_manager strategy if one is set.
+        Otherwise the sample is streamed straight out of the ZIP file.
+        """
+        if self.index is not None:
+            if self.sampling_manager is not None:
+                self.random_sample = self.sampling_manager.sample(self.index, __num_connections, top)
+            else:
+                self.random_sample = self.index.sample(__num_connections, top)
+            return
+
+        if top:
+            lines = islice(self.stream_csv_lines(), top)
+            sampled_lines = self.reservoir_sample(lines, __num_connections)
+            self.random_sample = [self.parse_hostname(line) for line in sampled_lines]
+            return
+
+        sampled_lines = self.reservoir_sample(self.stream_csv_lines(), __num_connections)
+        self.random_sample = [self.parse_hostname(line) for line in sampled_lines]
+
+    def iter_random_hostnames(self, top: Optional[int] = None, batch_size: int = 1000) -> Iterator[str]:
+        """
+        Endlessly yield random hostnames, optionally limited to the top ranked hostnames.
+        Hostnames are drawn in batches, so memory use stays constant however many are taken.
+        """
+        while True:
+            self.get_random_sample(batch_size, top)
+            batch = self.random_sample
+            if not batch:
+                return
+            yield from batch
+
+    def get_sample_shards(self, __num_shards: int) -> list[list[str]]:
         """
-        Get a random sample of from the __hostnames.
+        Split the random sample into a number of (roughly) equally sized shards.
         """
-        self.random_sample = random.sample(self.hostnames, __num_connections)
+        return [self.random_sample[i::__num_shards] for i in range(__num_shards) if self.random_sample[i::__num_shards]]
@@ -0,0 +1,136 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              HostnameIndex class used for a compact, memory mapped index of the hostname list
+
+import mmap
+import os
+import random
+import struct
+from array import array
+from typing import Iterator, List, Optional
+
+
+class HostnameIndex:
+    """
+    A compact on-disk index of the hostname list.
+
+    The file holds a small header, a packed array of offsets and a contiguous UTF-8 blob
+    of every hostname. The position of a hostname in the index is its rank - 1.
+    The file is memory mapped, so looking up a hostname does not require parsing the list.
+    """
+    MAGIC = b"HIDX"
+    FORMAT_VERSION = 1
+
+    # magic, format version, number of hostnames, source file size, source file mtime (ns)
+    HEADER = struct.Struct("<4sIQQQ")
+
+    def __init__(self, index_path: str) -> None:
+        """
+        Initialize the HostnameIndex for the given index file.
+        """
+        self.CLASS_VERSION = "0.01"
+        self.index_path = index_path
+        self.count = 0
+        self._file = None
+        self._mmap = None
+        self._offsets = None
+        self._blob_start = 0
+
+    @classmethod
+    def build(cls, index_path: str, lines: Iterator[bytes], source_size: int = 0, source_mtime_ns: int = 0) -> None:
+        """
+        Build an index file from raw "rank,hostname" CSV lines.
+        The index is written to a temporary file first so a partly written index is never used.
+        """
+        offsets = array("I", [0])
+        blob = bytearray()
+        for line in lines:
+            hostname = line.rstrip(b"\r\n").split(b",", 1)[-1]
+            blob += hostname
+            if len(blob) > 0xFFFFFFFF:
+                raise ValueError("Hostname list is too large to index")
+            offsets.append(len(blob))
+
+        temporary_path = f"{index_path}.part"
+        with open(temporary_path, "wb") as file:
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.FORMAT_VERSION, len(offsets) - 1, source_size, source_mtime_ns))
+            offsets.tofile(file)
+            file.write(blob)
+        os.replace(temporary_path, index_path)
+
+    def open(self, source_size: int = 0, source_mtime_ns: int = 0) -> bool:
+        """
+        Memory map the index file.
+        Returns False if the file does not exist, is invalid, or was built from a different source file.
+        """
+        self.close()
+        if not os.path.exists(self.index_path):
+            return False
+
+        self._file = open(self.index_path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be memory mapped.
+            self.close()
+            return False
+
+        if len(self._mmap) < self.HEADER.size:
+            self.close()
+            return False
+
+        magic, version, count, size, mtime_ns = self.HEADER.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.FORMAT_VERSION or (size, mtime_ns) != (source_size, source_mtime_ns):
+            self.close()
+            return False
+
+        offsets_size = (count + 1) * array("I").itemsize
+        self._offsets = memoryview(self._mmap)[self.HEADER.size:self.HEADER.size + offsets_size].cast("I")
+        self._blob_start = self.HEADER.size + offsets_size
+        self.count = count
+        return True
+
+    def close(self) -> None:
+        """
+        Release the memory map and close the index file.
+        """
+        if self._offsets is not None:
+            self._offsets.release()
+            self._offsets = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, position: int) -> str:
+        """
+        Get the hostname at a position (rank - 1) in the index.
+        """
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError("Hostname index out of range")
+        start = self._blob_start + self._offsets[position]
+        end = self._blob_start + self._offsets[position + 1]
+        return self._mmap[start:end].decode("utf-8")
+
+    def get_range(self, start: int, stop: int) -> List[str]:
+        """
+        Get the hostnames between two positions (rank - 1), like a slice.
+        """
+        return [self[position] for position in range(*slice(start, stop).indices(self.count))]
+
+    def sample(self, sample_size: int, top: Optional[int] = None) -> List[str]:
+        """
+        Get a uniform random sample of hostnames, optionally limited to the top ranked hostnames.
+        Only the sampled hostnames are read from the index.
+        """
+        population = min(top, self.count) if top else self.count
+        return [self[position] for position in random.sample(range(population), min(sample_size, population))]
@@ -0,0 +1,150 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              LatencyHistogram class used for constant memory latency percentiles
+
+import math
+from typing import Dict, Optional
+
+
+class LatencyHistogram:
+    """
+    An HDR-style log-linear histogram of latencies in microseconds.
+
+    Values below 2 ** SIGNIFICANT_BITS are counted exactly. Larger values are counted in
+    buckets that keep SIGNIFICANT_BITS bits of precision, so every bucket is within about
+    1.6% of the values it holds. Memory use depends on the range of values seen, not on
+    the number of values recorded.
+    """
+    SIGNIFICANT_BITS = 7
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty histogram.
+        """
+        self.CLASS_VERSION = "0.01"
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min_value: Optional[int] = None
+        self.max_value: Optional[int] = None
+
+    @classmethod
+    def bucket_index(cls, value: int) -> int:
+        """
+        Get the bucket index for a value.
+        """
+        shift = value.bit_length() - cls.SIGNIFICANT_BITS
+        if shift <= 0:
+            return value
+        return (shift << (cls.SIGNIFICANT_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def bucket_range(cls, index: int) -> tuple:
+        """
+        Get the lowest and highest value that fall into a bucket.
+        """
+        if index < (1 << cls.SIGNIFICANT_BITS):
+            return index, index
+        shift = (index >> (cls.SIGNIFICANT_BITS - 1)) - 1
+        mantissa = index - (shift << (cls.SIGNIFICANT_BITS - 1))
+        low = mantissa << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        """
+        Record a value (in microseconds).
+        """
+        value = max(0, int(value))
+        index = self.bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+
+    def percentile(self, percentile: float) -> Optional[int]:
+        """
+        Get the value (in microseconds) at a percentile between 0 and 100, or None if the histogram is empty.
+        """
+        if not self.count:
+            return None
+
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low, high = self.bucket_range(index)
+                # Report the middle of the bucket, kept inside the exact min and max.
+                return min(max((low + high) // 2, self.min_value), self.max_value)
+        return self.max_value
+
+    def mean(self) -> Optional[float]:
+        """
+        Get the mean value (in microseconds), or None if the histogram is empty.
+        """
+        return self.total / self.count if self.count else None
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Add every value recorded in another histogram to this one.
+        """
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        if other.max_value is not None and (self.max_value is None or other.max_value > self.max_value):
+            self.max_value = other.max_value
+
+    def subtract(self, other: "LatencyHistogram") -> None:
+        """
+        Remove every value recorded in another histogram from this one, where other holds an earlier
+        snapshot of this histogram. The exact min and max of what is left are not known, so they are
+        worked out from the remaining buckets.
+        """
+        for index, count in other.buckets.items():
+            remaining = self.buckets.get(index, 0) - count
+            if remaining > 0:
+                self.buckets[index] = remaining
+            else:
+                self.buckets.pop(index, None)
+        self.count -= other.count
+        self.total -= other.total
+        if not self.buckets:
+            self.count = 0
+            self.total = 0
+            self.min_value = None
+            self.max_value = None
+            return
+        self.min_value = max(self.bucket_range(min(self.buckets))[0], self.min_value)
+        self.max_value = min(self.bucket_range(max(self.buckets))[1], self.max_value)
+
+    def get_state(self) -> dict:
+        """
+        Get the histogram as plain types, so it can be sent to another process.
+        """
+        return {
+            "buckets": [[index, count] for index, count in self.buckets.items()],
+            "count": self.count,
+            "total": self.total,
+            "min": self.min_value,
+            "max": self.max_value
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "LatencyHistogram":
+        """
+        Create a histogram from the state returned by get_state.
+        """
+        histogram = cls()
+        histogram.buckets = {int(index): int(count) for index, count in state["buckets"]}
+        histogram.count = state["count"]
+        histogram.total = state["total"]
+        histogram.min_value = state["min"]
+        histogram.max_value = state["max"]
+        return histogram
@@ -1,34 +1,124 @@
-from typing import Union, List
-import time
+import queue
+import sys
+import threading
+from typing import Optional, TextIO, Union, List
+
+from ProfileManager import ProfileManager
+
 
 class MessageManager:
-    def __init__(self):
-        """Initialize the Output class with an empty queue."""
-        self.queue: List[Union[str, List[str]]] = []
-        self.message_exit_event = False
+    # Placed on the queue by shutdown() to tell monitor_queue to flush and stop.
+    _SHUTDOWN = object()
+
+    def __init__(self, output_stream: Optional[TextIO] = None, batch_size: int = 1000, profile_manager=None):
+        """
+        Initialize the Output class with an empty queue.
+
+        :param output_stream: where the messages are written to. Defaults to stdout.
+        :param batch_size: the maximum number of messages written to the output stream at once.
+        :param profile_manager: times writing the output into a ProfileManager, if given.
+        """
+        self.CLASS_VERSION = "0.04"
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.output_stream = output_stream
+        self.batch_size = batch_size
+        self.profile_manager = profile_manager
+
+        # Set once shutdown() has been requested, once monitor_queue has stopped reading the queue,
+        # and once every message has been written.
+        self._shutdown_requested = threading.Event()
+        self._stopped = threading.Event()
+        self.finished_event = threading.Event()
 
     def add_to_queue(self, item: Union[str, List[str]]) -> None:
         """
         Add an item to the queue. The item can be a string or a list of strings.
+        Once monitor_queue has stopped, the item (and anything else still queued) is written straight away.
 
         :param item: The item to be added to the queue.
         """
-        self.queue.append(item)
+        self.queue.put(item)
+        # Checked after the put, so an item is either seen by the last drain of monitor_queue or written here.
+        if self._stopped.is_set():
+            self.write_remaining()
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Ask monitor_queue to write every message already queued, flush the output and stop.
+        Calling this more than once is safe.
+
+        :param wait: wait for the remaining messages to be written before returning.
+        :param timeout: the maximum number of seconds to wait.
+        :return: True if every message has been written.
+        """
+        if not self._shutdown_requested.is_set():
+            self._shutdown_requested.set()
+            self.queue.put(self._SHUTDOWN)
+
+        if wait:
+            return self.finished_event.wait(timeout)
+        return self.finished_event.is_set()
+
+    def write_batch(self, lines: List[str]) -> None:
+        """
+        Write a batch of lines to the output stream with a single write and flush.
+
+        :param lines: The lines to write.
+        """
+        if not lines:
+            return
+        output_stream = self.output_stream or sys.stdout
+        output_stream.write("\n".join(lines) + "\n")
+        output_stream.flush()
+
+    def format_items(self, items: list) -> List[str]:
+        """
+        Turn queued items into the lines to write, leaving out the shutdown marker and empty items.
+        """
+        lines = []
+        for item in items:
+            if item is self._SHUTDOWN:
+                continue
+            if isinstance(item, list):
+                lines.extend(item)
+            elif item is not None:
+                lines.append(str(item))
+        return lines
+
+    def write_remaining(self) -> None:
+        """
+        Write everything still on the queue, for messages added after monitor_queue has stopped.
+        """
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        self.write_batch(self.format_items(items))
 
     def monitor_queue(self) -> None:
         """
         Monitor the queue and print items as they are added.
-        The function runs in a loop and should be called in a way that doesn't block the main program.
-        """
-        while not self.message_exit_event:
-            while self.queue:
-                item = self.queue.pop(0)  # Get the first item from the queue
-                if isinstance(item, list):
-                    for sub_item in item:
-                        print(sub_item)
-                else:
-                    if item == "QUIT":
-                        self.message_exit_event = True
-                    else:
-                        print(item)
-            time.sleep(0.5)  # Sleep to prevent constant CPU usage, adjust as needed
+        The function blocks until messages arrive and should be called in its own thread.
+        It returns once shutdown() has been called and every earlier message has been written.
+        Messages added after that are written by add_to_queue itself, so none are dropped.
+        """
+        stopping = False
+        while not stopping:
+            # Block until there is at least one message, then take whatever else is waiting.
+            items = [self.queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = any(item is self._SHUTDOWN for item in items)
+            with ProfileManager.measure(self.profile_manager, "output_write"):
+                self.write_batch(self.format_items(items))
+
+        # Anything added while the last batch was written is written now, later messages by add_to_queue.
+        self._stopped.set()
+        self.write_remaining()
+        self.finished_event.set()
@@ -0,0 +1,213 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              MetricsManager class used for live metrics while a run is in progress
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from LatencyHistogram import LatencyHistogram
+
+
+class MetricsManager:
+    """
+    MetricsManager Class. Reports live metrics while the workers are running.
+
+    Every report_interval seconds an interval snapshot (requests/s, error rate and latency
+    percentiles for the last window) is added to the message queue. If a metrics_port is
+    given, the statistics are also served at /metrics in the Prometheus text format.
+    Every rotate_interval seconds the full statistics of the last window are added to the message
+    queue, so long (soak) runs report each window as well as the totals at the end.
+    """
+    # The quantiles exported to Prometheus.
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self,
+                statistics_manager,
+                message_manager,
+                report_interval: Optional[float] = None,
+                metrics_port: Optional[int] = None,
+                metrics_host: str = "127.0.0.1",
+                rotate_interval: Optional[float] = None
+                ) -> None:
+        """
+        Initialize the MetricsManager.
+        """
+        self.CLASS_VERSION = "0.01"
+
+        if report_interval is not None and report_interval <= 0:
+            raise ValueError("Report interval must be greater than 0 seconds")
+        if metrics_port is not None and not 0 <= metrics_port <= 65535:
+            raise ValueError("Metrics port must be between 0 and 65535")
+        if rotate_interval is not None and rotate_interval <= 0:
+            raise ValueError("Rotate interval must be greater than 0 seconds")
+
+        self.statistics_manager = statistics_manager
+        self.message_manager = message_manager
+        self.report_interval = report_interval
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.rotate_interval = rotate_interval
+
+        self.stop_event = threading.Event()
+        self.report_thread = None
+        self.rotate_thread = None
+        self.server = None
+        self.server_thread = None
+
+        # The most recent interval snapshot, also exported to Prometheus.
+        self.last_window = None
+
+    def start(self) -> None:
+        """
+        Start the reporting thread and the metrics endpoint, if they are enabled.
+        """
+        if self.report_interval:
+            # Start a fresh window, so the first snapshot does not include anything from before the run.
+            self.statistics_manager.take_window()
+            self.report_thread = threading.Thread(target=self.report_worker, daemon=True)
+            self.report_thread.start()
+
+        if self.rotate_interval:
+            self.rotate_thread = threading.Thread(target=self.rotate_worker, daemon=True)
+            self.rotate_thread.start()
+
+        if self.metrics_port is not None:
+            self.server = ThreadingHTTPServer((self.metrics_host, self.metrics_port), self.create_handler())
+            self.server.daemon_threads = True
+            self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+            self.server_thread.start()
+            self.message_manager.add_to_queue(f"Serving metrics on http://{self.metrics_host}:{self.server.server_address[1]}/metrics")
+
+    def stop(self) -> None:
+        """
+        Stop the reporting thread and the metrics endpoint.
+        """
+        self.stop_event.set()
+        if self.report_thread is not None:
+            self.report_thread.join()
+            self.report_thread = None
+        if self.rotate_thread is not None:
+            self.rotate_thread.join()
+            self.rotate_thread = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server_thread.join()
+            self.server = None
+
+    def report_worker(self) -> None:
+        """
+        Add an interval snapshot to the message queue every report_interval seconds.
+        """
+        while not self.stop_event.wait(self.report_interval):
+            self.last_window = self.statistics_manager.take_window()
+            self.message_manager.add_to_queue(self.format_window(self.last_window))
+
+    def rotate_worker(self) -> None:
+        """
+        Add the statistics of the last window to the message queue every rotate_interval seconds.
+        Only the previous snapshot is kept, so memory use does not grow with the number of windows.
+        """
+        window_number = 0
+        previous_state = self.statistics_manager.get_state()
+        window_start = time.strftime("%Y-%m-%d %H:%M:%S")
+        while not self.stop_event.wait(self.rotate_interval):
+            window_number += 1
+            state = self.statistics_manager.get_state()
+            window_end = time.strftime("%Y-%m-%d %H:%M:%S")
+            window = self.statistics_manager.difference(state, previous_state)
+            self.message_manager.add_to_queue(window.format_statistics(f"Statistics for window {window_number} ({window_start} - {window_end})"))
+            previous_state = state
+            window_start = window_end
+
+    @staticmethod
+    def format_seconds(microseconds: Optional[float]) -> str:
+        """
+        Format a number of microseconds as seconds for the interval snapshot.
+        """
+        return "n/a" if microseconds is None else f"{microseconds / 1_000_000:.3f}s"
+
+    def format_window(self, window: dict) -> str:
+        """
+        Format an interval snapshot as a single line.
+        """
+        duration = window["duration"] or self.report_interval
+        error_rate = window["failed_requests"] / window["requests"] * 100 if window["requests"] else 0.0
+        latency = window["latency"]
+        return (f"[Interval {duration:.1f}s] Requests: {window['requests']}, "
+                f"Rate: {window['requests'] / duration:.1f} req/s, Errors: {error_rate:.1f}%, "
+                f"p50: {self.format_seconds(latency.percentile(50))}, "
+                f"p90: {self.format_seconds(latency.percentile(90))}, "
+                f"p99: {self.format_seconds(latency.percentile(99))}")
+
+    def render_prometheus(self) -> str:
+        """
+        Render the statistics in the Prometheus text exposition format.
+        """
+        state = self.statistics_manager.get_state()
+        latency = LatencyHistogram.from_state(state["latency"])
+
+        # Collate the counts of each unique HTTP response code
+        code_counts = {}
+        for code, _, count in state["response_codes"]:
+            code_counts[code] = code_counts.get(code, 0) + count
+
+        lines = [
+            "# HELP generate_requests_requests_total Total number of requests made, by HTTP response code (0 for failed requests).",
+            "# TYPE generate_requests_requests_total counter"
+        ]
+        for code, count in sorted(code_counts.items()):
+            lines.append(f'generate_requests_requests_total{{code="{code:03}"}} {count}')
+
+        lines += [
+            "# HELP generate_requests_failed_requests_total Total number of requests that failed without an HTTP response.",
+            "# TYPE generate_requests_failed_requests_total counter",
+            f"generate_requests_failed_requests_total {state['failed_requests']}",
+            "# HELP generate_requests_received_bytes_total Total number of body bytes received by successful requests.",
+            "# TYPE generate_requests_received_bytes_total counter",
+            f"generate_requests_received_bytes_total {state['bytes_received']}",
+            "# HELP generate_requests_response_time_seconds Response time of successful requests.",
+            "# TYPE generate_requests_response_time_seconds summary"
+        ]
+        for quantile in self.QUANTILES:
+            value = latency.percentile(quantile * 100)
+            value = "NaN" if value is None else value / 1_000_000
+            lines.append(f'generate_requests_response_time_seconds{{quantile="{quantile}"}} {value}')
+        lines.append(f"generate_requests_response_time_seconds_sum {latency.total / 1_000_000}")
+        lines.append(f"generate_requests_response_time_seconds_count {latency.count}")
+
+        window = self.last_window
+        if window is not None and window["duration"]:
+            lines += [
+                "# HELP generate_requests_interval_requests_per_second Request rate over the last reporting interval.",
+                "# TYPE generate_requests_interval_requests_per_second gauge",
+                f"generate_requests_interval_requests_per_second {window['requests'] / window['duration']}"
+            ]
+        return "\n".join(lines) + "\n"
+
+    def create_handler(self) -> type:
+        """
+        Create the request handler class for the metrics endpoint.
+        """
+        metrics_manager = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics_manager.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                # Keep the per-request output clean.
+                pass
+
+        return MetricsHandler
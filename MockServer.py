@@ -0,0 +1,270 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              MockServer class used as a local stand-in for web servers and forward proxies when benchmarking
+
+import os
+import random
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with the configured latency, error rate and body size.
+    TLS and plain HTTP are served on the same port, the first byte of a connection tells them apart.
+    """
+    protocol_version = "HTTP/1.1"
+
+    # The first byte of a TLS handshake record.
+    TLS_HANDSHAKE = 0x16
+
+    def setup(self) -> None:
+        """
+        Wrap the connection in TLS if the client starts a TLS handshake.
+        """
+        self.timeout = self.server.mock_server.idle_timeout
+        self.tls_socket = None
+        ssl_context = self.server.mock_server.ssl_context
+        if ssl_context is not None:
+            self.request.settimeout(self.timeout)
+            try:
+                first_byte = self.request.recv(1, socket.MSG_PEEK)
+            except OSError:
+                first_byte = b""
+            if first_byte and first_byte[0] == self.TLS_HANDSHAKE:
+                try:
+                    self.request = self.tls_socket = ssl_context.wrap_socket(self.request, server_side=True)
+                except (OSError, ssl.SSLError):
+                    # The handshake failed, handle() sees a closed connection.
+                    pass
+        super().setup()
+
+    def finish(self) -> None:
+        """
+        Close the TLS connection, the server only closes the socket it accepted.
+        """
+        try:
+            super().finish()
+        except OSError:
+            pass
+        if self.tls_socket is not None:
+            self.tls_socket.close()
+
+    def handle(self) -> None:
+        """
+        Handle the connection, ignoring clients that go away part way through.
+        """
+        try:
+            super().handle()
+        except (ConnectionError, ssl.SSLError, socket.timeout):
+            pass
+
+    def log_message(self, format: str, *args) -> None:
+        """
+        Do not log every request.
+        """
+
+    def respond(self, send_body: bool) -> None:
+        """
+        Send the response after the configured latency, or fail it at the configured error rates.
+        """
+        mock_server = self.server.mock_server
+        mock_server.count_request()
+
+        latency = mock_server.latency + random.uniform(0, mock_server.jitter)
+        if latency:
+            time.sleep(latency)
+
+        if mock_server.reset_rate and random.random() < mock_server.reset_rate:
+            # Drop the connection without a response.
+            self.close_connection = True
+            return
+
+        if mock_server.error_rate and random.random() < mock_server.error_rate:
+            status_code, body = 503, b""
+        else:
+            status_code, body = 200, mock_server.body
+
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.respond(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self.respond(send_body=False)
+
+    def do_CONNECT(self) -> None:
+        """
+        Forward proxy mode. Instead of opening a tunnel to the requested host, the tunnel ends
+        here and the requests sent through it are answered by this server.
+        """
+        if not self.server.mock_server.proxy:
+            self.send_error(405, "Not a proxy")
+            return
+
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        self.wfile.flush()
+
+        # Serve the tunnelled connection (TLS or plain HTTP) with a new handler on the same socket.
+        self.server.finish_request(self.request, self.client_address)
+        self.close_connection = True
+
+
+class MockServer:
+    """
+    MockServer Class. A local stand-in for the web servers (and the forward proxy) that
+    requests are normally made to, so that runs can be compared without the internet.
+
+    Every request waits `latency` seconds (plus up to `jitter` seconds), and is then answered
+    with a 503 at `error_rate`, dropped without a response at `reset_rate`, or answered with a
+    200 and a body of `body_size` bytes. If `tls` is set, HTTPS is served on the same port as
+    HTTP. If `proxy` is set, the server also accepts CONNECT and absolute URL requests like a
+    forward proxy, and answers them itself.
+    """
+    def __init__(self,
+                host: str = "127.0.0.1",
+                port: int = 0,
+                latency: float = 0.0,
+                jitter: float = 0.0,
+                error_rate: float = 0.0,
+                reset_rate: float = 0.0,
+                body_size: int = 1024,
+                tls: bool = False,
+                proxy: bool = False,
+                certfile: Optional[str] = None,
+                keyfile: Optional[str] = None,
+                idle_timeout: float = 30.0
+                ) -> None:
+        """
+        Initialize the MockServer.
+
+        :param host: the address to listen on.
+        :param port: the port to listen on (0 picks a free port).
+        :param latency: seconds to wait before every response.
+        :param jitter: up to this many extra seconds are added to the latency at random.
+        :param error_rate: the fraction of requests answered with a 503 (0-1).
+        :param reset_rate: the fraction of requests dropped without a response (0-1).
+        :param body_size: the number of bytes in the body of every 200 response.
+        :param tls: serve HTTPS as well as HTTP.
+        :param proxy: also act as a forward proxy.
+        :param certfile: the TLS certificate. A self-signed one is created with openssl if not given.
+        :param keyfile: the TLS private key.
+        :param idle_timeout: seconds before an idle connection is closed.
+        """
+        self.CLASS_VERSION = "0.01"
+
+        if latency < 0 or jitter < 0:
+            raise ValueError("Latency and jitter must be 0 or greater")
+        if not 0 <= error_rate <= 1 or not 0 <= reset_rate <= 1:
+            raise ValueError("Error rate and reset rate must be between 0 and 1")
+        if body_size < 0:
+            raise ValueError("Body size must be 0 or greater")
+
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.body = os.urandom(body_size)
+        self.tls = tls
+        self.proxy = proxy
+        self.idle_timeout = idle_timeout
+
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._temp_dir = None
+        self.ssl_context = self.create_ssl_context(certfile, keyfile) if tls else None
+
+        self.server = None
+        self.server_thread = None
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        print(f"Mock Server = {self.host}:{self.port}, Latency = {self.latency}s, Jitter = {self.jitter}s, "
+              f"Error Rate = {self.error_rate}, Reset Rate = {self.reset_rate}, Body Size = {len(self.body)}, "
+              f"TLS = {self.tls}, Proxy = {self.proxy}")
+
+    def create_self_signed_certificate(self) -> Tuple[str, str]:
+        """
+        Create a temporary self-signed certificate and key with the openssl command.
+        """
+        if shutil.which("openssl") is None:
+            raise ValueError("TLS needs a certificate and key, or the openssl command to create them")
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        certfile = os.path.join(self._temp_dir.name, "cert.pem")
+        keyfile = os.path.join(self._temp_dir.name, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-keyout", keyfile, "-out", certfile],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return certfile, keyfile
+
+    def create_ssl_context(self, certfile: Optional[str], keyfile: Optional[str]) -> ssl.SSLContext:
+        """
+        Create the server TLS context.
+        """
+        if certfile is None:
+            certfile, keyfile = self.create_self_signed_certificate()
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(certfile, keyfile)
+        return ssl_context
+
+    def count_request(self) -> None:
+        """
+        Count a request that has been served.
+        """
+        with self._lock:
+            self.requests_served += 1
+
+    @property
+    def url(self) -> str:
+        """
+        The URL of the server (used as the proxy URL in proxy mode).
+        """
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> None:
+        """
+        Start serving from a background thread.
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), MockRequestHandler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        # The default listen backlog of 5 would refuse connections under load.
+        self.server.request_queue_size = 1024
+        self.server.mock_server = self
+        self.server.server_bind()
+        self.server.server_activate()
+        self.port = self.server.server_address[1]
+
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving.
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server_thread.join()
+            self.server = None
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
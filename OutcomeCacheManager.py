@@ -0,0 +1,284 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              OutcomeCacheManager class used to remember the outcome of every hostname across runs
+
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class OutcomeCacheManager:
+    """
+    OutcomeCacheManager Class. Keeps the last outcome of every hostname and protocol in an
+    sqlite database, so later runs can skip hostnames that are known to be dead.
+
+    Every outcome is kept for its own TTL. A success is kept for a short time, as it says
+    little about the next run, while DNS failures and refused connections are kept longer.
+    A hostname is known to be dead while every protocol has a failure that has not expired.
+
+    Outcomes are put on a queue and written in batches by a background thread (see start), so
+    the workers never wait on the database.
+    Expired entries are removed when the cache is opened and closed, and if there are still
+    more than max_entries, the entries closest to expiring are removed first.
+    """
+    OUTCOMES = ("success", "dns", "refused", "timeout", "error")
+
+    # Placed on the queue by close() to tell the writer thread to write what is left and stop.
+    _SHUTDOWN = object()
+
+    # Seconds each outcome is kept for.
+    DEFAULT_TTLS = {
+        "success": 6 * 3600,
+        "dns": 7 * 86400,
+        "refused": 3 * 86400,
+        "timeout": 86400,
+        "error": 86400
+    }
+
+    # The error details (see ConnectionManager.attempt_request) of the outcomes other than success and error.
+    ERROR_OUTCOMES = {
+        "DNS resolution issue": "dns",
+        "Connection refused": "refused",
+        "Connection Timeout": "timeout",
+        "Read timeout": "timeout"
+    }
+
+    def __init__(self,
+                cache_file: str,
+                ttls: Optional[Dict[str, float]] = None,
+                max_entries: int = 1000000,
+                protocols: Tuple[str, ...] = ("https", "http"),
+                batch_size: int = 1000,
+                flush_interval: float = 1.0
+                ) -> None:
+        """
+        Initialize the OutcomeCacheManager.
+
+        :param cache_file: the sqlite database the outcomes are kept in.
+        :param ttls: seconds each outcome is kept for, overriding DEFAULT_TTLS.
+        :param max_entries: the most entries kept in the cache.
+        :param protocols: the protocols attempted for every hostname.
+        :param batch_size: the maximum number of outcomes written at once.
+        :param flush_interval: the longest time (in seconds) an outcome waits before it is written.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        for outcome, ttl in ttls.items():
+            if outcome not in self.OUTCOMES:
+                raise ValueError(f"Outcome must be one of {', '.join(self.OUTCOMES)}")
+            if ttl < 0:
+                raise ValueError("Outcome TTLs must be 0 or greater")
+        if max_entries < 1:
+            raise ValueError("Outcome cache size must be at least 1")
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+
+        self.cache_file = cache_file
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.protocols = protocols
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._connection = None
+        # Held while the database is used, by the writer thread and by the reads and evictions.
+        self._lock = threading.Lock()
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.writer_thread = None
+        self.message_manager = None
+
+        # (hostname, protocol) pairs known to fail for hostnames that answer on another protocol.
+        self.skip_protocols: Set[Tuple[str, str]] = set()
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        ttls = ", ".join(f"{outcome} {ttl:g}s" for outcome, ttl in self.ttls.items())
+        print(f"Outcome Cache = {self.cache_file}, Entries = {self.count_entries()}, Maximum Entries = {self.max_entries}, TTLs = {ttls}")
+
+    @classmethod
+    def outcome_from_error(cls, error_detail: Optional[str]) -> str:
+        """
+        Work out the outcome of a request from its error detail (None if a response was received).
+        """
+        if error_detail is None:
+            return "success"
+        return cls.ERROR_OUTCOMES.get(error_detail, "error")
+
+    def open(self) -> None:
+        """
+        Open the database, creating it if required, remove expired entries and load the protocols to skip.
+        """
+        try:
+            # Several processes may write to the same database, WAL lets them read while another writes.
+            self._connection = sqlite3.connect(self.cache_file, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS outcomes ("
+                                     "hostname TEXT NOT NULL, protocol TEXT NOT NULL, outcome TEXT NOT NULL, "
+                                     "checked REAL NOT NULL, expires REAL NOT NULL, "
+                                     "PRIMARY KEY (hostname, protocol)) WITHOUT ROWID")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS outcomes_expires ON outcomes (expires)")
+            self._connection.commit()
+            self.evict()
+            self.skip_protocols = self.load_skip_protocols()
+        except sqlite3.Error as e:
+            raise ValueError(f"Could not open outcome cache {self.cache_file}: {e}")
+
+    def count_entries(self) -> int:
+        """
+        Get the number of entries in the cache.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM outcomes").fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Remove the expired entries, and then the entries closest to expiring while there are more than max_entries.
+
+        :return: the number of entries removed
+        """
+        with self._lock:
+            removed = self._connection.execute("DELETE FROM outcomes WHERE expires <= ?", (time.time(),)).rowcount
+            excess = self._connection.execute("SELECT COUNT(*) FROM outcomes").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += self._connection.execute("DELETE FROM outcomes WHERE (hostname, protocol) IN "
+                                                    "(SELECT hostname, protocol FROM outcomes ORDER BY expires LIMIT ?)",
+                                                    (excess,)).rowcount
+            self._connection.commit()
+        return removed
+
+    def get_dead_hostnames(self) -> Set[str]:
+        """
+        Get the hostnames known to be dead, every protocol has failed and none of the failures have expired.
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT hostname FROM outcomes WHERE expires > ? GROUP BY hostname "
+                                            "HAVING SUM(outcome = 'success') = 0 AND COUNT(*) >= ?",
+                                            (time.time(), len(self.protocols)))
+            return {hostname for hostname, in rows}
+
+    def load_skip_protocols(self) -> Set[Tuple[str, str]]:
+        """
+        Get the (hostname, protocol) pairs that have failed for hostnames that answer on another protocol.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._connection.execute("SELECT failed.hostname, failed.protocol FROM outcomes AS failed "
+                                            "JOIN outcomes AS answered ON answered.hostname = failed.hostname "
+                                            "AND answered.protocol <> failed.protocol "
+                                            "WHERE failed.outcome <> 'success' AND answered.outcome = 'success' "
+                                            "AND failed.expires > ? AND answered.expires > ?", (now, now))
+            return set(rows)
+
+    def should_skip(self, hostname: str, protocol: str) -> bool:
+        """
+        Return True if protocol is known to fail for a hostname that answers on another protocol.
+        """
+        return (hostname, protocol) in self.skip_protocols
+
+    def record(self, hostname: str, protocol: str, error_detail: Optional[str]) -> None:
+        """
+        Record the outcome of a request.
+
+        :param error_detail: the error detail of the request, None if a response was received.
+        """
+        outcome = self.outcome_from_error(error_detail)
+        now = time.time()
+        self.queue.put((hostname, protocol, outcome, now, now + self.ttls[outcome]))
+
+    def report_error(self, message: str) -> None:
+        """
+        Show an error through the message manager, or print it if the writer thread was not started with one.
+        """
+        if self.message_manager is not None:
+            self.message_manager.add_to_queue(message)
+        else:
+            print(message)
+
+    def write_batch(self, outcomes: List[Tuple[str, str, str, float, float]]) -> None:
+        """
+        Write a batch of outcomes in a single transaction.
+        """
+        if not outcomes:
+            return
+        try:
+            with self._lock:
+                self._connection.executemany("INSERT OR REPLACE INTO outcomes (hostname, protocol, outcome, checked, expires) "
+                                             "VALUES (?, ?, ?, ?, ?)", outcomes)
+                self._connection.commit()
+        except sqlite3.Error as e:
+            # Losing some outcomes only means those hostnames are tested again next time.
+            self.report_error(f"Error while writing to outcome cache {self.cache_file}: {e}")
+
+    def take_batch(self, timeout: Optional[float]) -> Tuple[List[Tuple[str, str, str, float, float]], bool]:
+        """
+        Take up to batch_size outcomes off the queue, waiting at most timeout seconds (None to not wait).
+
+        :return: the outcomes, and True if close() has asked the writer thread to stop
+        """
+        outcomes = []
+        deadline = time.monotonic() + (timeout or 0)
+        while len(outcomes) < self.batch_size:
+            try:
+                if timeout is None:
+                    outcome = self.queue.get_nowait()
+                else:
+                    outcome = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if outcome is self._SHUTDOWN:
+                return outcomes, True
+            outcomes.append(outcome)
+        return outcomes, False
+
+    def writer_worker(self) -> None:
+        """
+        Writer thread. Takes outcomes off the queue in batches of up to batch_size and writes them,
+        waiting at most flush_interval before writing a partial batch.
+        """
+        stopping = False
+        while not stopping:
+            outcomes, stopping = self.take_batch(self.flush_interval)
+            self.write_batch(outcomes)
+
+    def start(self, message_manager=None) -> None:
+        """
+        Start the writer thread. Errors while writing are shown through message_manager if one is given.
+        """
+        self.message_manager = message_manager
+        self.writer_thread = threading.Thread(target=self.writer_worker, daemon=True)
+        self.writer_thread.start()
+
+    def flush(self) -> None:
+        """
+        Write the outcomes still on the queue from this thread. Only used when the writer thread is not running.
+        """
+        while True:
+            outcomes, _ = self.take_batch(None)
+            if not outcomes:
+                return
+            self.write_batch(outcomes)
+
+    def close(self) -> None:
+        """
+        Write every outcome already recorded, remove expired entries and close the database.
+        """
+        if self._connection is None:
+            return
+        if self.writer_thread is not None:
+            self.queue.put(self._SHUTDOWN)
+            self.writer_thread.join()
+            self.writer_thread = None
+        self.flush()
+        try:
+            self.evict()
+        except sqlite3.Error as e:
+            self.report_error(f"Error while evicting from outcome cache {self.cache_file}: {e}")
+        self._connection.close()
+        self._connection = None
@@ -0,0 +1,176 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              PhaseTimer class used to time the DNS, connect, TLS, TTFB and body phases of a request
+
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:
+    # urllib3 1.x reports name resolution failures as a NewConnectionError.
+    NameResolutionError = None
+
+
+class PhaseTimer:
+    """
+    Records how long each phase of a request took, for the calling thread.
+
+    The DNS, connect and TLS phases are recorded by the connection classes below when a
+    new connection is made (they are missing when a pooled connection is reused).
+    The TTFB and body phases are worked out by the caller once the response is complete.
+    """
+    PHASES = ("dns", "connect", "tls", "ttfb", "body")
+
+    # The shared DNS cache (a DnsManager) used to resolve hostnames, if one has been set.
+    dns_manager = None
+
+    _local = threading.local()
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Start timing a new request on the calling thread.
+        """
+        cls._local.phases = {}
+
+    @classmethod
+    def add(cls, phase: str, seconds: float) -> None:
+        """
+        Add time (in seconds) to a phase of the current request on the calling thread.
+        """
+        phases = getattr(cls._local, "phases", None)
+        if phases is None:
+            phases = cls._local.phases = {}
+        phases[phase] = phases.get(phase, 0.0) + max(0.0, seconds)
+
+    @classmethod
+    def get(cls) -> Dict[str, float]:
+        """
+        Get the phases recorded for the current request on the calling thread.
+        """
+        return dict(getattr(cls._local, "phases", {}))
+
+    @classmethod
+    def set_family(cls, family: Optional[int]) -> None:
+        """
+        Only connect over one address family (socket.AF_INET or socket.AF_INET6) on the calling thread,
+        or any family if None.
+        """
+        cls._local.family = family
+
+    @classmethod
+    def filter_family(cls, addresses: List[str]) -> List[str]:
+        """
+        Keep the addresses in the calling thread's address family. If there are none, every address is kept.
+        """
+        family = getattr(cls._local, "family", None)
+        if family is None:
+            return addresses
+        filtered = [address for address in addresses if (":" in address) == (family == socket.AF_INET6)]
+        return filtered or addresses
+
+    @classmethod
+    def resolve(cls, host: str, port: int) -> List[str]:
+        """
+        Resolve a hostname to a list of addresses, in the order they should be tried.
+        The shared DNS cache is used if one has been set.
+        """
+        if cls.dns_manager is not None:
+            return cls.dns_manager.resolve(host)
+
+        addresses = []
+        for _, _, _, _, sockaddr in socket.getaddrinfo(host, port, socket.AF_UNSPEC, socket.SOCK_STREAM):
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        return addresses
+
+    @classmethod
+    def format_phases(cls, phases: Dict[str, float]) -> str:
+        """
+        Format the recorded phases for an output line, for example "DNS: 0.012s, TTFB: 0.150s".
+        """
+        labels = {"dns": "DNS", "connect": "Connect", "tls": "TLS", "ttfb": "TTFB", "body": "Body"}
+        return ", ".join(f"{labels[phase]}: {phases[phase]:.3f}s" for phase in cls.PHASES if phase in phases)
+
+
+class _TimingConnectionMixin:
+    """
+    Times name resolution and the TCP connect of a new connection.
+    Name resolution is done here (once), and every resolved address is then tried in order.
+    """
+    def _new_conn(self) -> socket.socket:
+        dns_start = time.perf_counter()
+        try:
+            addresses = PhaseTimer.filter_family(PhaseTimer.resolve(self._dns_host, self.port))
+        except socket.gaierror as e:
+            PhaseTimer.add("dns", time.perf_counter() - dns_start)
+            if NameResolutionError is not None:
+                raise NameResolutionError(self.host, self, e) from e
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+        dns_time = time.perf_counter() - dns_start
+        PhaseTimer.add("dns", dns_time)
+
+        connect_start = time.perf_counter()
+        dns_host = self._dns_host
+        try:
+            for position, address in enumerate(addresses):
+                # Connecting to the resolved address skips a second lookup, the hostname is still used for SNI.
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except NewConnectionError:
+                    if position == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+            connect_time = time.perf_counter() - connect_start
+            PhaseTimer.add("connect", connect_time)
+            self._phase_new_conn_time = dns_time + connect_time
+        return sock
+
+
+class TimingHTTPConnection(_TimingConnectionMixin, HTTPConnection):
+    """HTTPConnection that records the DNS and connect phases."""
+
+
+class TimingHTTPSConnection(_TimingConnectionMixin, HTTPSConnection):
+    """HTTPSConnection that also records the TLS phase (including any proxy tunnel set up)."""
+    def connect(self) -> None:
+        self._phase_new_conn_time = 0.0
+        connect_start = time.perf_counter()
+        super().connect()
+        PhaseTimer.add("tls", time.perf_counter() - connect_start - self._phase_new_conn_time)
+
+
+class _TimingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimingHTTPConnection
+
+
+class _TimingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimingHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools (direct and through a proxy) use the timing connections.
+    """
+    POOL_CLASSES_BY_SCHEME = {"http": _TimingHTTPConnectionPool, "https": _TimingHTTPSConnectionPool}
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self.POOL_CLASSES_BY_SCHEME
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = self.POOL_CLASSES_BY_SCHEME
+        return manager
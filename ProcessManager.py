@@ -0,0 +1,207 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              ProcessManager class used to run shards of the sample in separate processes
+
+import math
+import multiprocessing
+import queue
+import signal
+from typing import Any, Dict, List, Optional
+
+from ConnectionManager import ConnectionManager
+from ThreadManager import ThreadManager
+from AsyncManager import AsyncManager
+from StatisticsManager import StatisticsManager
+from MessageManager import MessageManager
+from RateLimiter import RateLimiter
+from MetricsManager import MetricsManager
+from AutoscaleManager import AutoscaleManager
+from ResultManager import ResultManager
+from OutcomeCacheManager import OutcomeCacheManager
+
+
+def run_shard(shard: List[Any], shard_id: int, settings: Dict[str, Any], result_queue: multiprocessing.Queue) -> None:
+    """
+    Run one shard of hostnames in its own process with its own engine, and send the
+    collected statistics back to the parent through result_queue.
+    """
+    # The parent ignores Ctrl+C while it waits, so restore the default handler for the engine.
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    statistics_manager = StatisticsManager()
+    result_manager = None
+    outcome_cache = None
+    error = None
+    try:
+        # Every process writes its results to its own file, so no locking is needed between them.
+        if settings["result_settings"]:
+            result_manager = ResultManager(ResultManager.shard_path(settings["result_settings"]["output_file"], shard_id),
+                                           settings["result_settings"]["output_format"])
+            result_manager.start()
+
+        message_manager = MessageManager()
+
+        # Every process opens the shared outcome cache itself, sqlite handles the locking between them.
+        if settings["outcome_cache_settings"]:
+            outcome_cache = OutcomeCacheManager(**settings["outcome_cache_settings"])
+            outcome_cache.open()
+            outcome_cache.start(message_manager)
+
+        connection_manager = ConnectionManager(**settings["connection_settings"], result_manager=result_manager,
+                                               outcome_cache=outcome_cache)
+        rate_limiter = RateLimiter(**settings["rate_settings"]) if settings["rate_settings"] else None
+        autoscaler = AutoscaleManager(**settings["autoscale_settings"]) if settings["autoscale_settings"] else None
+
+        # Every process reports its own live metrics, each on its own port.
+        metrics_manager = None
+        if settings["metrics_settings"]:
+            metrics_settings = dict(settings["metrics_settings"])
+            if metrics_settings.get("metrics_port"):
+                metrics_settings["metrics_port"] += shard_id
+            metrics_manager = MetricsManager(statistics_manager, message_manager, **metrics_settings)
+            metrics_manager.start()
+
+        if settings["pre_resolve_workers"]:
+            shard = connection_manager.pre_resolve(shard, statistics_manager, message_manager, settings["pre_resolve_workers"])
+
+        if settings["engine"] == "async":
+            async_manager = AsyncManager(settings["num_workers"], connection_manager, statistics_manager, message_manager, rate_limiter,
+                                         dns_workers=settings["dns_workers"])
+            async_manager.start(shard)
+        else:
+            thread_manager = ThreadManager(settings["num_workers"], connection_manager.make_request, statistics_manager, message_manager,
+                                           rate_limiter, autoscaler, destination_manager=connection_manager.destination_manager)
+            thread_manager.start(shard, f"hostnames_queue_{shard_id}", f"hostnames_thread_list_{shard_id}")
+            thread_manager.join_threads(f"hostnames_thread_list_{shard_id}")
+
+        if metrics_manager is not None:
+            metrics_manager.stop()
+        connection_manager.close()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if result_manager is not None:
+            result_manager.close()
+        if outcome_cache is not None:
+            outcome_cache.close()
+        result_queue.put((shard_id, statistics_manager.get_state(), error))
+
+
+class ProcessManager:
+    """ProcessManager Class. Used for running shards of the sample in separate processes."""
+    def __init__(self,
+                num_processes: int,
+                engine: str,
+                num_workers: int,
+                connection_settings: Dict[str, Any],
+                statistics_manager,
+                rate_settings: Optional[Dict[str, Any]] = None,
+                metrics_settings: Optional[Dict[str, Any]] = None,
+                pre_resolve_workers: Optional[int] = None,
+                autoscale_settings: Optional[Dict[str, Any]] = None,
+                result_settings: Optional[Dict[str, Any]] = None,
+                outcome_cache_settings: Optional[Dict[str, Any]] = None,
+                dns_workers: int = 50
+                ) -> None:
+        """
+        Initialize the ProcessManager.
+        Every process runs its own engine with num_workers workers, using a ConnectionManager
+        built from connection_settings. The results are merged into statistics_manager.
+        If rate_settings are given, the target rate is split evenly across the processes.
+        Every process caps its own requests per destination and runs its own circuit breakers, so the
+        max_per_destination and breaker_threshold of connection_settings are split across the processes
+        as well. A destination's hostnames are spread over every shard, so each process sees its share
+        of the requests and timeouts, and the cap across every process stays at max_per_destination.
+        If metrics_settings are given, every process reports live metrics, and process N serves
+        its metrics endpoint on metrics_port + N.
+        If pre_resolve_workers is given, every process pre-resolves its own shard into its DNS cache.
+        If autoscale_settings are given, every process autoscales its own worker pool (thread engine only).
+        If result_settings are given, process N writes its results to output_file with -N added to the name.
+        If outcome_cache_settings are given, every process records its outcomes in the same outcome cache.
+        With the async engine, every process looks up hostnames on dns_workers threads of its own.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        if num_processes < 1:
+            raise ValueError("Number of processes must be at least 1")
+        max_per_destination = connection_settings.get("max_per_destination")
+        if max_per_destination is not None and max_per_destination < num_processes:
+            raise ValueError("Maximum requests per destination must be at least the number of processes")
+
+        self.num_processes = num_processes
+        self.settings = {
+            "engine": engine,
+            "num_workers": num_workers,
+            "connection_settings": connection_settings,
+            "rate_settings": rate_settings,
+            "metrics_settings": metrics_settings,
+            "pre_resolve_workers": pre_resolve_workers,
+            "autoscale_settings": autoscale_settings,
+            "result_settings": result_settings,
+            "outcome_cache_settings": outcome_cache_settings,
+            "dns_workers": dns_workers
+        }
+        self.statistics_manager = statistics_manager
+        self.processes = []
+
+    def print_variables(self, shards: List[List[Any]]) -> None:
+        """
+        Print variables.
+        """
+        print(f"Number of processes = {self.num_processes}, Engine = {self.settings['engine']}, "
+              f"Workers per process = {self.settings['num_workers']}, "
+              f"Shard sizes = {[len(shard) for shard in shards]}")
+
+    def start(self, shards: List[List[Any]]) -> None:
+        """
+        Start one process per shard, wait for them all to finish and merge their statistics.
+        """
+        self.print_variables(shards)
+
+        # Every process gets an equal share of the target rate.
+        settings = dict(self.settings)
+        if settings["rate_settings"] and settings["rate_settings"]["rate"]:
+            settings["rate_settings"] = dict(settings["rate_settings"], rate=settings["rate_settings"]["rate"] / len(shards))
+
+        # And an equal share of the requests in flight to each destination, and of the timeouts that open a circuit breaker.
+        connection_settings = dict(settings["connection_settings"])
+        if connection_settings.get("max_per_destination") is not None:
+            connection_settings["max_per_destination"] //= len(shards)
+        if connection_settings.get("breaker_threshold") is not None:
+            connection_settings["breaker_threshold"] = math.ceil(connection_settings["breaker_threshold"] / len(shards))
+        settings["connection_settings"] = connection_settings
+
+        result_queue = multiprocessing.Queue()
+        self.processes = [
+            multiprocessing.Process(target=run_shard, args=(shard, shard_id, settings, result_queue))
+            for shard_id, shard in enumerate(shards)
+        ]
+
+        for process in self.processes:
+            process.start()
+
+        # The child processes handle Ctrl+C themselves and still report what they collected.
+        previous_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            # Results must be read before joining, otherwise a full queue could block the children.
+            remaining_results = len(self.processes)
+            while remaining_results:
+                try:
+                    shard_id, state, error = result_queue.get(timeout=1)
+                except queue.Empty:
+                    # Stop waiting if every process has exited without reporting back.
+                    if not any(process.is_alive() for process in self.processes) and result_queue.empty():
+                        print(f"{remaining_results} process(es) exited without reporting statistics.")
+                        break
+                    continue
+
+                if error:
+                    print(f"Process for shard {shard_id} failed: {error}")
+                self.statistics_manager.merge_state(state)
+                remaining_results -= 1
+
+            for process in self.processes:
+                process.join()
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
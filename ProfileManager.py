@@ -0,0 +1,288 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              ProfileManager class used to profile the request hot path
+
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class ProfileTimer:
+    """
+    Adds the time spent inside a with block to a ProfileManager counter.
+    """
+    __slots__ = ("profile_manager", "counter", "start_time")
+
+    def __init__(self, profile_manager: "ProfileManager", counter: str) -> None:
+        self.profile_manager = profile_manager
+        self.counter = counter
+        self.start_time = 0.0
+
+    def __enter__(self) -> "ProfileTimer":
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.profile_manager.add(self.counter, time.perf_counter() - self.start_time)
+        return False
+
+
+class ProfileManager:
+    """
+    ProfileManager Class. Profiles a run, to show whether it is limited by the network,
+    the GIL or the output path.
+
+    Every thread keeps its own counters of the time spent in each step of the hot path
+    (waiting for the queue, waiting for the rate limiter and delays, the network call, recording statistics,
+    formatting output and writing it), so counting never contends on a lock. On top of that,
+    the "cprofile" mode runs cProfile in every thread and merges the results, and the "sample"
+    mode samples the stack of every thread at a fixed interval, which costs far less.
+    """
+    PROFILE_MODES = ("cprofile", "sample")
+
+    # The counters in the order they are reported.
+    COUNTERS = ("queue_wait", "rate_limit_wait", "network", "statistics", "formatting", "output_write")
+
+    # Returned by measure when profiling is not enabled, it can be reused.
+    _NOT_MEASURED = contextlib.nullcontext()
+
+    def __init__(self, mode: str = "cprofile", sample_interval: float = 0.005, output_file: Optional[str] = None, limit: int = 25) -> None:
+        """
+        Initialize the ProfileManager.
+
+        :param mode: cprofile or sample.
+        :param sample_interval: with the sample mode, seconds between samples.
+        :param output_file: with the cprofile mode, the merged profile is also saved to this file (for pstats or snakeviz).
+        :param limit: the number of functions shown in the report.
+        """
+        self.CLASS_VERSION = "0.01"
+
+        if mode not in self.PROFILE_MODES:
+            raise ValueError(f"Profile mode must be one of {', '.join(self.PROFILE_MODES)}")
+        if sample_interval <= 0:
+            raise ValueError("Sample interval must be greater than 0 seconds")
+        if limit < 1:
+            raise ValueError("Profile limit must be at least 1")
+
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.output_file = output_file
+        self.limit = limit
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        # The counters of every thread, counter -> [count, total seconds].
+        self._thread_counters: List[Dict[str, list]] = []
+
+        # The cProfile profiles of every thread.
+        self._profiles: List[cProfile.Profile] = []
+
+        # Sampled functions (file, line, name) -> the number of samples they were on the stack, and on top of it.
+        self._inclusive_samples: Dict[Tuple[str, int, str], int] = {}
+        self._self_samples: Dict[Tuple[str, int, str], int] = {}
+        self.samples = 0
+
+        self._stop_event = threading.Event()
+        self.sampler_thread = None
+        self._start_wall = self._end_wall = None
+        self._start_cpu = self._end_cpu = None
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        output = f"Profile Mode = {self.mode}"
+        if self.mode == "sample":
+            output += f", Sample Interval = {self.sample_interval}s"
+        if self.output_file:
+            output += f", Profile Output File = {self.output_file}"
+        print(output)
+
+    def add(self, counter: str, seconds: float) -> None:
+        """
+        Add time to one of the calling thread's counters.
+        """
+        counters = getattr(self._local, "counters", None)
+        if counters is None:
+            counters = self._local.counters = {}
+            with self._lock:
+                self._thread_counters.append(counters)
+
+        entry = counters.get(counter)
+        if entry is None:
+            entry = counters[counter] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+
+    @classmethod
+    def measure(cls, profile_manager: Optional["ProfileManager"], counter: str):
+        """
+        Time a with block into a counter. Does nothing if profile_manager is None.
+        """
+        if profile_manager is None:
+            return cls._NOT_MEASURED
+        return ProfileTimer(profile_manager, counter)
+
+    def wrap(self, target: Callable) -> Callable:
+        """
+        Wrap a thread target so that the thread is profiled (cprofile mode only).
+        """
+        if self.mode != "cprofile":
+            return target
+
+        def profiled_target(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # From Python 3.12 only one profiler can be active, and it already sees every thread.
+                return target(*args, **kwargs)
+
+            with self._lock:
+                self._profiles.append(profile)
+            try:
+                return target(*args, **kwargs)
+            finally:
+                profile.disable()
+
+        return profiled_target
+
+    def sampler_worker(self) -> None:
+        """
+        Sampler thread. Records the stack of every other thread every sample_interval seconds.
+        """
+        own_thread_id = threading.get_ident()
+        while not self._stop_event.wait(self.sample_interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                self.samples += 1
+                seen = set()
+                top = True
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if top:
+                        self._self_samples[key] = self._self_samples.get(key, 0) + 1
+                        top = False
+                    # Recursive functions are only counted once per sample.
+                    if key not in seen:
+                        seen.add(key)
+                        self._inclusive_samples[key] = self._inclusive_samples.get(key, 0) + 1
+                    frame = frame.f_back
+
+    def start(self) -> None:
+        """
+        Start profiling. In sample mode the sampler thread is started.
+        """
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        if self.mode == "sample":
+            self.sampler_thread = threading.Thread(target=self.sampler_worker, daemon=True)
+            self.sampler_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop profiling.
+        """
+        self._end_wall = time.perf_counter()
+        self._end_cpu = time.process_time()
+        if self.sampler_thread is not None:
+            self._stop_event.set()
+            self.sampler_thread.join()
+            self.sampler_thread = None
+
+    def merge_counters(self) -> Dict[str, list]:
+        """
+        Merge the counters of every thread, counter -> [count, total seconds].
+        """
+        merged = {}
+        with self._lock:
+            thread_counters = list(self._thread_counters)
+        for counters in thread_counters:
+            for counter, (count, seconds) in list(counters.items()):
+                entry = merged.setdefault(counter, [0, 0.0])
+                entry[0] += count
+                entry[1] += seconds
+        return merged
+
+    @staticmethod
+    def format_function(key: Tuple[str, int, str]) -> str:
+        """
+        Format a sampled function like pstats does, file:line(name).
+        """
+        filename, line, name = key
+        return f"{os.path.basename(filename)}:{line}({name})"
+
+    def format_samples(self) -> List[str]:
+        """
+        Format the functions seen most often by the sampler.
+        """
+        if not self.samples:
+            return ["No samples were taken."]
+        lines = [f"{self.samples} samples, the functions most often running (self) and on the stack (total):",
+                 f"{'Self %':<10}{'Total %':<10}Function"]
+        top_functions = sorted(self._self_samples.items(), key=lambda item: item[1], reverse=True)[:self.limit]
+        for key, count in top_functions:
+            lines.append(f"{100 * count / self.samples:<10.1f}{100 * self._inclusive_samples.get(key, 0) / self.samples:<10.1f}"
+                         f"{self.format_function(key)}")
+        return lines
+
+    def format_profiles(self) -> List[str]:
+        """
+        Merge the cProfile profiles of every thread and format the slowest functions.
+        """
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return ["No threads were profiled."]
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiles[0], stream=stream)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        if self.output_file:
+            stats.dump_stats(self.output_file)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.limit)
+
+        lines = [f"Merged cProfile output of {len(profiles)} threads:"]
+        if self.output_file:
+            lines.append(f"The merged profile was saved to {self.output_file}")
+        return lines + stream.getvalue().strip("\n").splitlines()
+
+    def format_report(self) -> str:
+        """
+        Format the profile for user friendly output.
+        """
+        lines = ["-" * 30, "Profile:"]
+
+        if self._start_wall is not None and self._end_wall is not None:
+            wall = self._end_wall - self._start_wall
+            cpu = self._end_cpu - self._start_cpu
+            # A run using close to one core (100%) while workers wait on each other is limited by the GIL.
+            lines.append(f"Wall time: {wall:.2f}s, Process CPU time: {cpu:.2f}s ({100 * cpu / wall if wall else 0:.0f}% of one core)\n")
+
+        lines.append(f"{'Counter':<30}{'Count':<12}{'Total':<12}{'Mean':<12}")
+        counters = self.merge_counters()
+        for counter in self.COUNTERS:
+            if counter in counters:
+                count, seconds = counters[counter]
+                lines.append(f"{counter:<30}{count:<12}{seconds:<12.2f}{1000 * seconds / count:.3f}ms")
+        lines.append("")
+
+        lines += self.format_profiles() if self.mode == "cprofile" else self.format_samples()
+        return "\n".join(lines)
+
+    def print_report(self) -> None:
+        """
+        Print the profile for user friendly output.
+        """
+        print(self.format_report())
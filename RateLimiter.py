@@ -0,0 +1,144 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              RateLimiter class used to pace requests across every worker to a target rate
+
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every worker, used to hold the total request rate at a target
+    number of requests per second.
+
+    The bucket is implemented with virtual scheduling: every caller reserves the next
+    departure time under a lock and then waits outside the lock, so callers never block
+    each other while waiting. Up to `burst` requests may leave at once after an idle period.
+    With the "poisson" arrival mode the gaps between requests are exponentially distributed
+    around the target rate, instead of being evenly spaced.
+
+    The delay before each request (a constant delay, or a random delay up to random_delay_max)
+    is applied here as well, so a worker waits for its delay and its departure slot at the
+    same time, before it starts the request.
+    """
+    ARRIVAL_MODES = ("uniform", "poisson")
+
+    def __init__(self,
+                rate: Optional[float] = None,
+                burst: int = 1,
+                arrival: str = "uniform",
+                delay: Optional[int] = None,
+                random_delay_max: Optional[int] = None
+                ) -> None:
+        """
+        Initialize the RateLimiter.
+
+        :param rate: the target number of requests per second across every worker (None for no rate limit).
+        :param burst: the number of requests that may be sent at once after an idle period.
+        :param arrival: "uniform" for evenly spaced requests or "poisson" for random (Poisson) arrivals.
+        :param delay: a constant delay in seconds before each request.
+        :param random_delay_max: a random delay between 0 and random_delay_max seconds before each request.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        if rate is not None and rate <= 0:
+            raise ValueError("Rate must be greater than 0 requests per second")
+        if burst < 1:
+            raise ValueError("Burst must be at least 1")
+        if arrival not in self.ARRIVAL_MODES:
+            raise ValueError(f"Arrival must be one of {', '.join(self.ARRIVAL_MODES)}")
+        if delay is not None and delay < 0:
+            raise ValueError("Delay must be 0 seconds or greater")
+        if random_delay_max is not None and random_delay_max < 0:
+            raise ValueError("Random delay maximum must be 0 seconds or greater")
+
+        self.rate = rate
+        self.burst = burst
+        self.arrival = arrival
+        self.delay = delay
+        self.random_delay_max = random_delay_max
+
+        self._lock = threading.Lock()
+        # Start with a full bucket, so the first `burst` requests can leave straight away.
+        self._next_departure = float("-inf")
+
+    def __repr__(self) -> str:
+        return (f"RateLimiter(rate={self.rate}, burst={self.burst}, arrival={self.arrival!r}, "
+                f"delay={self.delay}, random_delay_max={self.random_delay_max})")
+
+    def format_settings(self) -> str:
+        """
+        Format the settings for user friendly output.
+        """
+        settings = []
+        if self.rate is not None:
+            settings.append(f"Rate limit = {self.rate} requests/s, Burst = {self.burst}, Arrival = {self.arrival}")
+        if self.delay is not None:
+            settings.append(f"Delay = {self.delay}s")
+        if self.random_delay_max is not None:
+            settings.append(f"Random Delay Max = {self.random_delay_max}s")
+        return ", ".join(settings)
+
+    def next_interval(self) -> float:
+        """
+        Get the gap (in seconds) until the next request.
+        """
+        if self.arrival == "poisson":
+            return random.expovariate(self.rate)
+        return 1.0 / self.rate
+
+    def next_delay(self) -> int:
+        """
+        Get the delay (in seconds) to apply before the next request.
+        """
+        if self.delay is not None:
+            return self.delay
+        if self.random_delay_max is not None:
+            return random.randint(0, self.random_delay_max)
+        return 0
+
+    def reserve(self) -> float:
+        """
+        Reserve the next departure slot and return how long (in seconds) the caller has to wait for it.
+        """
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            interval = self.next_interval()
+
+            # Unused capacity from an idle period is capped at `burst` requests.
+            earliest = now - (self.burst - 1) * interval
+            departure = max(self._next_departure, earliest)
+            self._next_departure = departure + interval
+        return max(0.0, departure - now)
+
+    def acquire(self) -> int:
+        """
+        Wait until the caller is allowed to send its next request, once its departure slot
+        has come and its delay has passed.
+
+        :return: the delay (in seconds) applied before the request.
+        """
+        applied_delay = self.next_delay()
+        wait_time = max(self.reserve(), applied_delay)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return applied_delay
+
+    async def acquire_async(self) -> int:
+        """
+        Wait on the event loop until the caller is allowed to send its next request, once its
+        departure slot has come and its delay has passed.
+
+        :return: the delay (in seconds) applied before the request.
+        """
+        applied_delay = self.next_delay()
+        wait_time = max(self.reserve(), applied_delay)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return applied_delay
@@ -0,0 +1,286 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.02
+# Description:              ResultManager class used to write every request result to a JSONL, CSV or Parquet file
+
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class ResultRecord:
+    """
+    The result of a single request. Uses __slots__ so that millions of records stay small.
+    """
+    __slots__ = ("timestamp", "hostname", "protocol", "status_code", "reason", "error",
+                 "response_time", "dns", "connect", "tls", "ttfb", "body", "bytes")
+
+    # The field names, in the order they are written.
+    FIELDS = __slots__
+
+    def __init__(self,
+                hostname: str,
+                protocol: str,
+                status_code: int,
+                reason: str,
+                error: Optional[str] = None,
+                response_time: Optional[float] = None,
+                phase_times: Optional[Dict[str, float]] = None,
+                num_bytes: Optional[int] = None
+                ) -> None:
+        """
+        Initialize the ResultRecord.
+
+        :param hostname: the hostname the request was made to
+        :param protocol: the protocol used (https or http)
+        :param status_code: the HTTP response code (0 for failed requests)
+        :param reason: the HTTP response reason
+        :param error: the short description of the error for failed requests (for example "SSL Error")
+        :param response_time: the time (in seconds) it took to get the response, None for failed requests
+        :param phase_times: the time (in seconds) spent in each phase of the request
+        :param num_bytes: the number of body bytes received
+        """
+        phase_times = phase_times or {}
+        self.timestamp = time.time()
+        self.hostname = hostname
+        self.protocol = protocol
+        self.status_code = status_code
+        self.reason = reason
+        self.error = error
+        self.response_time = response_time
+        self.dns = phase_times.get("dns")
+        self.connect = phase_times.get("connect")
+        self.tls = phase_times.get("tls")
+        self.ttfb = phase_times.get("ttfb")
+        self.body = phase_times.get("body")
+        self.bytes = num_bytes
+
+    def to_dict(self) -> dict:
+        """
+        Get the record as a dict of field names and values.
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def to_row(self) -> list:
+        """
+        Get the record as a list of values, in the order of FIELDS.
+        """
+        return [getattr(self, field) for field in self.FIELDS]
+
+
+class ResultManager:
+    """
+    ResultManager Class. Writes ResultRecords to a file from a background thread.
+
+    Workers only put records on a queue. The writer thread takes them off in batches and
+    writes each batch with a single buffered write, so writing results never slows the workers.
+    JSONL and CSV files are appended to. Parquet files (which require the pyarrow package) are
+    written as one row group per batch.
+
+    If a batch cannot be written (for example the disk is full), the error is reported and no
+    more records are accepted, so the queue does not grow for the rest of the run.
+    """
+    OUTPUT_FORMATS = ("jsonl", "csv", "parquet")
+
+    # Placed on the queue by close() to tell the writer thread to flush and stop.
+    _SHUTDOWN = object()
+
+    def __init__(self, output_file: str, output_format: Optional[str] = None, batch_size: int = 10000, flush_interval: float = 1.0) -> None:
+        """
+        Initialize the ResultManager.
+
+        :param output_file: the file to write the results to.
+        :param output_format: jsonl, csv or parquet. Worked out from the file extension if not given.
+        :param batch_size: the maximum number of records written at once.
+        :param flush_interval: the longest time (in seconds) a record waits before it is written.
+        """
+        self.CLASS_VERSION = "0.02"
+
+        output_format = output_format or self.format_from_path(output_file)
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Output format must be one of {', '.join(self.OUTPUT_FORMATS)}")
+        if output_format == "parquet" and not self.is_parquet_available():
+            raise ImportError("The parquet output format requires the pyarrow package. Install it with: pip install pyarrow")
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+
+        self.output_file = output_file
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.writer_thread = None
+        self.records_written = 0
+        self.records_dropped = 0
+        self.error: Optional[str] = None
+        self._file = None
+        self._csv_writer = None
+        self._parquet_writer = None
+
+    @staticmethod
+    def is_parquet_available() -> bool:
+        """
+        Return True if the optional pyarrow dependency is installed.
+        """
+        return pyarrow is not None
+
+    @classmethod
+    def format_from_path(cls, output_file: str) -> str:
+        """
+        Work out the output format from a file extension, defaulting to jsonl.
+        """
+        extension = os.path.splitext(output_file)[1].lstrip(".").lower()
+        if extension in ("pq", "parquet"):
+            return "parquet"
+        return extension if extension in cls.OUTPUT_FORMATS else "jsonl"
+
+    @staticmethod
+    def shard_path(output_file: str, shard_id: int) -> str:
+        """
+        Get the output file used by one process, for example results-1.jsonl.
+        """
+        base, extension = os.path.splitext(output_file)
+        return f"{base}-{shard_id}{extension}"
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        print(f"Output File = {self.output_file}, Output Format = {self.output_format}")
+
+    def add(self, record: ResultRecord) -> None:
+        """
+        Add a record to be written. Never blocks. Records are dropped once writing has failed.
+        """
+        if self.error is not None:
+            self.records_dropped += 1
+            return
+        self.queue.put(record)
+
+    def open(self) -> None:
+        """
+        Open the output file, writing the CSV header if the file is new.
+        """
+        directory = os.path.dirname(self.output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.output_format == "parquet":
+            schema = pyarrow.schema([
+                ("timestamp", pyarrow.float64()), ("hostname", pyarrow.string()), ("protocol", pyarrow.string()),
+                ("status_code", pyarrow.int32()), ("reason", pyarrow.string()), ("error", pyarrow.string()),
+                ("response_time", pyarrow.float64()), ("dns", pyarrow.float64()), ("connect", pyarrow.float64()),
+                ("tls", pyarrow.float64()), ("ttfb", pyarrow.float64()), ("body", pyarrow.float64()),
+                ("bytes", pyarrow.int64())
+            ])
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(self.output_file, schema)
+            return
+
+        new_file = not os.path.exists(self.output_file) or os.path.getsize(self.output_file) == 0
+        self._file = open(self.output_file, "a", newline="", encoding="utf-8", buffering=1024 * 1024)
+        if self.output_format == "csv":
+            self._csv_writer = csv.writer(self._file)
+            if new_file:
+                self._csv_writer.writerow(ResultRecord.FIELDS)
+
+    def write_batch(self, records: List[ResultRecord]) -> None:
+        """
+        Write a batch of records with a single write, and flush it to the file.
+        """
+        if not records:
+            return
+        if self.output_format == "parquet":
+            columns = {field: [getattr(record, field) for record in records] for field in ResultRecord.FIELDS}
+            self._parquet_writer.write_table(pyarrow.table(columns, schema=self._parquet_writer.schema))
+        elif self.output_format == "csv":
+            self._csv_writer.writerows(record.to_row() for record in records)
+            self._file.flush()
+        else:
+            self._file.write("".join(json.dumps(record.to_dict(), separators=(",", ":")) + "\n" for record in records))
+            self._file.flush()
+        self.records_written += len(records)
+
+    def writer_worker(self) -> None:
+        """
+        Writer thread. Takes records off the queue in batches of up to batch_size and writes them,
+        waiting at most flush_interval before writing a partial batch.
+        """
+        stopping = False
+        while not stopping:
+            records = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(records) < self.batch_size:
+                try:
+                    record = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if record is self._SHUTDOWN:
+                    stopping = True
+                    break
+                records.append(record)
+            try:
+                self.write_batch(records)
+            except Exception as e:
+                # OSError for the file, or an error from pyarrow. Stop accepting records and empty the queue.
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"Error while writing results to {self.output_file}: {self.error}. No more results will be written.")
+                self.records_dropped += len(records) + self.discard_queue()
+                return
+
+    def discard_queue(self) -> int:
+        """
+        Take every record off the queue without writing it.
+
+        :return: the number of records discarded
+        """
+        discarded = 0
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                return discarded
+            if record is not self._SHUTDOWN:
+                discarded += 1
+
+    def start(self) -> None:
+        """
+        Open the output file and start the writer thread.
+        """
+        self.open()
+        self.writer_thread = threading.Thread(target=self.writer_worker, daemon=True)
+        self.writer_thread.start()
+
+    def close(self) -> None:
+        """
+        Write every record already added, then close the output file.
+        """
+        if self.writer_thread is not None:
+            self.queue.put(self._SHUTDOWN)
+            self.writer_thread.join()
+            self.writer_thread = None
+        try:
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+            if self._file is not None:
+                self._file.close()
+        except Exception as e:
+            print(f"Error while closing {self.output_file}: {type(e).__name__}: {e}")
+        finally:
+            self._parquet_writer = None
+            self._file = None
+        if self.error is not None:
+            # Records added while the writer thread was failing.
+            self.records_dropped += self.discard_queue()
+        if self.records_dropped:
+            print(f"{self.records_dropped} results were not written to {self.output_file}")
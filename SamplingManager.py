@@ -0,0 +1,209 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.03
+# Description:              SamplingManager class used to draw hostnames by their Umbrella rank
+
+import random
+from array import array
+from bisect import bisect
+from itertools import accumulate
+from typing import AbstractSet, Dict, List, Optional, Sequence
+
+
+class SamplingManager:
+    """
+    Draws samples of hostnames from a list ordered by rank, such as a HostnameIndex
+    (where the position of a hostname is its rank - 1).
+
+    Strategies:
+        uniform     every hostname is equally likely, without repeats (the default).
+        zipf        the hostname at rank r is drawn with weight 1 / r^exponent, with repeats,
+                    so popular hostnames come up far more often, like real user traffic.
+        stratified  the sample is split evenly across rank bands (for example the top 1000,
+                    1001-10000 and so on), without repeats.
+
+    Zipf draws use precomputed cumulative weights and a binary search, so every draw is
+    O(log n) however many hostnames are drawn. A seed makes the samples reproducible.
+
+    Hostnames known to be dead (see OutcomeCacheManager) can be left out of the sample, or kept
+    with a lower chance. Their places are drawn again with the same strategy (and, with stratified,
+    from the same band).
+    """
+    STRATEGIES = ("uniform", "zipf", "stratified")
+
+    # The upper rank of each band used by the stratified strategy, if none are given.
+    DEFAULT_STRATA = (1000, 10000, 100000)
+
+    # How many times the places of dropped dead hostnames are drawn again, before the sample is left short.
+    MAX_REDRAWS = 10
+
+    def __init__(self,
+                strategy: str = "uniform",
+                zipf_exponent: float = 1.0,
+                strata: Optional[Sequence[int]] = None,
+                seed: Optional[int] = None,
+                dead_hostnames: Optional[AbstractSet[str]] = None,
+                dead_weight: float = 0.0
+                ) -> None:
+        """
+        Initialize the SamplingManager.
+
+        :param strategy: uniform, zipf or stratified.
+        :param zipf_exponent: with zipf, the exponent s of the weights 1 / rank^s. Larger values favour the top ranks more.
+        :param strata: with stratified, the upper rank of each band. The last band runs to the end of the list.
+        :param seed: seed for the random number generator, for reproducible samples.
+        :param dead_hostnames: hostnames known to be dead.
+        :param dead_weight: the chance (0-1) of keeping a dead hostname that is drawn. 0 leaves them all out.
+        """
+        self.CLASS_VERSION = "0.03"
+
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Sampling strategy must be one of {', '.join(self.STRATEGIES)}")
+        if zipf_exponent <= 0:
+            raise ValueError("Zipf exponent must be greater than 0")
+        strata = sorted(set(strata or self.DEFAULT_STRATA))
+        if strata[0] < 1:
+            raise ValueError("Strata ranks must be at least 1")
+        if not 0 <= dead_weight <= 1:
+            raise ValueError("Dead weight must be between 0 and 1")
+
+        self.strategy = strategy
+        self.zipf_exponent = zipf_exponent
+        self.strata = strata
+        self.seed = seed
+        self.dead_hostnames = dead_hostnames or frozenset()
+        self.dead_weight = dead_weight
+
+        # A private generator, so that a seeded sample does not depend on anything else using random.
+        self.random = random.Random(seed)
+
+        # Cumulative zipf weights by position, built on first use.
+        self._cum_weights: Optional[array] = None
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        output = f"Sampling Strategy = {self.strategy}"
+        if self.strategy == "zipf":
+            output += f", Zipf Exponent = {self.zipf_exponent}"
+        elif self.strategy == "stratified":
+            output += f", Strata = {self.strata}"
+        if self.dead_hostnames:
+            output += f", Known Dead Hostnames = {len(self.dead_hostnames)}, Dead Weight = {self.dead_weight}"
+        print(f"{output}, Seed = {self.seed}")
+
+    def get_cum_weights(self, population: int) -> array:
+        """
+        Get the cumulative zipf weights of the first population ranks, building them if required.
+        They are kept as a packed array of doubles, 8 bytes per hostname.
+        """
+        if self._cum_weights is None or len(self._cum_weights) < population:
+            exponent = self.zipf_exponent
+            self._cum_weights = array("d", accumulate(rank ** -exponent for rank in range(1, population + 1)))
+        return self._cum_weights
+
+    def zipf_positions(self, population: int, sample_size: int) -> List[int]:
+        """
+        Draw sample_size positions (rank - 1) with zipf weights, with repeats.
+        """
+        cum_weights = self.get_cum_weights(population)
+        total = cum_weights[population - 1]
+        hi = population - 1
+        random_value = self.random.random
+        return [bisect(cum_weights, random_value() * total, 0, hi) for _ in range(sample_size)]
+
+    def stratified_shares(self, population: int, sample_size: int) -> Dict[range, int]:
+        """
+        Split sample_size evenly across the rank bands of the first population positions.
+        A band with fewer hostnames than its share gives them all, and the rest goes to the other bands.
+
+        :return: band (a range of positions) -> number of positions to draw from it
+        """
+        boundaries = [rank for rank in self.strata if rank < population] + [population]
+        bands = [range(start, stop) for start, stop in zip([0] + boundaries[:-1], boundaries)]
+
+        # Share the sample out evenly, smallest bands first so their leftover goes to the larger ones.
+        shares = {}
+        remaining = min(sample_size, population)
+        for number, band in enumerate(sorted(bands, key=len)):
+            share = min(len(band), remaining // (len(bands) - number))
+            shares[band] = share
+            remaining -= share
+        return {band: shares[band] for band in bands}
+
+    def stratified_positions(self, population: int, sample_size: int) -> List[int]:
+        """
+        Draw sample_size positions (rank - 1) split evenly across the rank bands, without repeats.
+        """
+        positions = []
+        for band, share in self.stratified_shares(population, sample_size).items():
+            positions.extend(self.random.sample(band, share))
+        self.random.shuffle(positions)
+        return positions
+
+    def sample(self, hostnames: Sequence[str], sample_size: int, top: Optional[int] = None) -> List[str]:
+        """
+        Draw a sample of hostnames, optionally limited to the top ranked hostnames.
+
+        :param hostnames: the hostnames ordered by rank, such as a HostnameIndex.
+        :param sample_size: the number of hostnames to draw.
+        :param top: only draw from the top N ranked hostnames.
+        """
+        population = min(top, len(hostnames)) if top else len(hostnames)
+        if not population or sample_size < 1:
+            return []
+
+        if not self.dead_hostnames:
+            return [hostnames[position] for position in self.draw_positions(population, sample_size)]
+
+        if self.strategy != "stratified":
+            return self.sample_alive(hostnames, range(population), sample_size)
+
+        # The places of dead hostnames are drawn again within their own band, so every band keeps its share.
+        sample = []
+        for band, share in self.stratified_shares(population, sample_size).items():
+            sample.extend(self.sample_alive(hostnames, band, share))
+        self.random.shuffle(sample)
+        return sample
+
+    def sample_alive(self, hostnames: Sequence[str], band: range, sample_size: int) -> List[str]:
+        """
+        Draw sample_size hostnames from the positions in band, dropping dead hostnames and drawing again
+        for their places. Zipf draws (from a band starting at the top rank) have repeats, the others never
+        draw a position twice.
+        """
+        sample = []
+        drawn = set()
+        with_repeats = self.strategy == "zipf"
+        for _ in range(self.MAX_REDRAWS + 1):
+            needed = sample_size - len(sample)
+            if needed <= 0:
+                break
+            if with_repeats:
+                positions = self.zipf_positions(len(band), needed)
+            else:
+                # Drawing len(drawn) extra positions gives at least needed positions not drawn before.
+                positions = self.random.sample(band, min(needed + len(drawn), len(band)))
+            for position in positions:
+                if len(sample) >= sample_size:
+                    break
+                if not with_repeats:
+                    if position in drawn:
+                        continue
+                    drawn.add(position)
+                hostname = hostnames[position]
+                if hostname in self.dead_hostnames and self.random.random() >= self.dead_weight:
+                    continue
+                sample.append(hostname)
+        return sample
+
+    def draw_positions(self, population: int, sample_size: int) -> List[int]:
+        """
+        Draw sample_size positions (rank - 1) with the sampling strategy.
+        """
+        if self.strategy == "zipf":
+            return self.zipf_positions(population, sample_size)
+        if self.strategy == "stratified":
+            return self.stratified_positions(population, sample_size)
+        return self.random.sample(range(population), min(sample_size, population))
@@ -0,0 +1,129 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              SessionManager class used to hand out one pooled requests.Session per worker thread
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from PhaseTimer import TimingHTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Optional
+
+
+class SessionManager:
+    """
+    Creates and caches one tuned requests.Session per worker thread.
+
+    Every session is built once with the headers, proxies and verify settings
+    already applied, and mounts an HTTPAdapter with a sized connection pool and
+    retry policy. Connections (including the connection to a proxy) are kept
+    alive and reused between requests made by the same worker.
+    """
+    def __init__(self,
+                secure: bool = True,
+                proxy_settings: Optional[Dict[str, str]] = None,
+                http_headers: Optional[Dict[str, str]] = None,
+                pool_size: int = 10,
+                keep_alive: bool = True,
+                max_retries: int = 0,
+                retry_backoff: float = 0.0
+                ) -> None:
+        self.CLASS_VERSION = "0.01"
+        self.secure = secure
+        self.proxy_settings = proxy_settings
+        self.http_headers = http_headers or {}
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        # Validate pool and retry parameters
+        if pool_size < 1:
+            raise ValueError("Pool size must be at least 1")
+        if max_retries < 0:
+            raise ValueError("Maximum retries must be 0 or greater")
+        if retry_backoff < 0:
+            raise ValueError("Retry backoff must be 0 or greater")
+
+        # Sessions are stored per thread, and also tracked by thread so they can all be closed at the end.
+        self._local = threading.local()
+        self._sessions: Dict[threading.Thread, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+
+    def create_retry_policy(self) -> Retry:
+        """
+        Create the retry policy used by the HTTPAdapter.
+        Only connection failures are retried, read errors are raised straight away
+        so that they are still reported as read timeouts.
+        """
+        return Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=False,
+            redirect=None,
+            status=0,
+            backoff_factor=self.retry_backoff,
+            raise_on_status=False
+        )
+
+    def create_adapter(self) -> HTTPAdapter:
+        """
+        Create an HTTPAdapter with the configured pool size and retry policy.
+        Its connections record the DNS, connect and TLS phases of every new connection.
+        """
+        return TimingHTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=self.create_retry_policy()
+        )
+
+    def create_session(self) -> requests.Session:
+        """
+        Create a new session with headers, proxies and verify applied once.
+        Note that requests lets REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE override the session's verify
+        setting, so callers that disable verification should also pass verify on each request.
+        """
+        session = requests.Session()
+        session.headers.update(self.http_headers)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        if self.proxy_settings:
+            session.proxies.update(self.proxy_settings)
+        session.verify = self.secure
+
+        adapter = self.create_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get_session(self) -> requests.Session:
+        """
+        Return the session that belongs to the calling thread, creating it on first use.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self.create_session()
+            self._local.session = session
+            with self._sessions_lock:
+                self.close_finished_sessions()
+                self._sessions[threading.current_thread()] = session
+        return session
+
+    def close_finished_sessions(self) -> None:
+        """
+        Close the sessions of threads that have exited (for example when a worker pool shrinks),
+        so their pooled connections are not kept open. Must be called with the sessions lock held.
+        """
+        for thread in [thread for thread in self._sessions if not thread.is_alive()]:
+            self._sessions.pop(thread).close()
+
+    def close_all(self) -> None:
+        """
+        Close every session that has been handed out.
+        """
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+        self._local = threading.local()
@@ -1,112 +1,326 @@
-from typing import List, Tuple, Dict
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
 from datetime import timedelta
 from HttpStatusCodes import HttpStatusCode
+from LatencyHistogram import LatencyHistogram
+from PhaseTimer import PhaseTimer
 
 class StatisticsManager:
     """
     A class to manage and calculate statistics of HTTP requests.
+    Statistics are aggregated as they arrive, so memory use stays flat no matter how many
+    requests are recorded.
     """
+    # The percentiles reported by calculate_statistics and print_statistics.
+    PERCENTILES = (50, 90, 99, 99.9)
 
     def __init__(self) -> None:
         """
         Initializes a new instance of StatisticsManager.
         """
         # Define the class version
+        self.CLASS_VERSION = "0.06"
 
-        self.CLASS_VERSION = "0.01"
-        # A list of tuples to store hostname, response code, response reason, and response time
-        self._data: List[Tuple[str, int, str, timedelta]] = []
+        # Every update happens under this lock, so workers can add data from any thread.
+        self._lock = threading.Lock()
 
-    def add_data(self, hostname: str, response_code: int, response_message: str, response_time: timedelta) -> None:
+        # Running counts of requests and of each unique HTTP response code and response reason
+        self.total_requests = 0
+        self.failed_requests = 0
+        self.response_codes: Dict[Tuple[int, str], int] = {}
+
+        # Running count of the body bytes received by the successful requests
+        self.bytes_received = 0
+
+        # Latency histograms of the successful requests, overall and by HTTP response code
+        self.latency = LatencyHistogram()
+        self.latency_by_code: Dict[int, LatencyHistogram] = {}
+
+        # Latency histograms of each phase (DNS, connect, TLS, TTFB, body) of the successful requests
+        self.phase_latency: Dict[str, LatencyHistogram] = {}
+
+        # Statistics for the current reporting window, reset by take_window
+        self._window_start = time.monotonic()
+        self.window_requests = 0
+        self.window_failed_requests = 0
+        self.window_latency = LatencyHistogram()
+
+    def add_data(self,
+                 hostname: str,
+                 response_code: int,
+                 response_message: str,
+                 response_time: Union[timedelta, int],
+                 phase_times: Optional[Dict[str, float]] = None,
+                 num_bytes: int = 0
+                 ) -> None:
         """
-        Adds new data to the list.
+        Adds new data to the running statistics.
 
         :param hostname: the hostname the request was made to
         :param response_code: the HTTP response code
         :param response_message: the HTTP response message
-        :param response_time: the time it took to get the response
+        :param response_time: the time it took to get the response (0 for failed requests)
+        :param phase_times: the time (in seconds) spent in each phase of the request
+        :param num_bytes: the number of body bytes received
+        """
+        key = (response_code, response_message)
+        response_time_us = int(response_time.total_seconds() * 1_000_000) if isinstance(response_time, timedelta) else None
+
+        with self._lock:
+            self.total_requests += 1
+            self.window_requests += 1
+            self.response_codes[key] = self.response_codes.get(key, 0) + 1
+
+            if response_time_us is None:
+                self.failed_requests += 1
+                self.window_failed_requests += 1
+                return
+
+            self.bytes_received += num_bytes
+            self.latency.record(response_time_us)
+            self.window_latency.record(response_time_us)
+            code_latency = self.latency_by_code.get(response_code)
+            if code_latency is None:
+                code_latency = self.latency_by_code[response_code] = LatencyHistogram()
+            code_latency.record(response_time_us)
+
+            for phase, seconds in (phase_times or {}).items():
+                phase_latency = self.phase_latency.get(phase)
+                if phase_latency is None:
+                    phase_latency = self.phase_latency[phase] = LatencyHistogram()
+                phase_latency.record(seconds * 1_000_000)
+
+    def take_window(self) -> dict:
+        """
+        Return the statistics collected since the last call (the current window), and start a new window.
+
+        :return: the duration (in seconds), request counts and latency histogram of the window
+        """
+        with self._lock:
+            now = time.monotonic()
+            window = {
+                "duration": now - self._window_start,
+                "requests": self.window_requests,
+                "failed_requests": self.window_failed_requests,
+                "latency": self.window_latency
+            }
+            self._window_start = now
+            self.window_requests = 0
+            self.window_failed_requests = 0
+            self.window_latency = LatencyHistogram()
+        return window
+
+    def phase_percentile(self, phase: str, percentile: float) -> Tuple[int, Optional[float]]:
+        """
+        Return the number of times a phase has been recorded and the given percentile of its latency.
+
+        :param phase: the request phase (see PhaseTimer.PHASES)
+        :param percentile: the percentile to calculate (0-100)
+        :return: the count, and the percentile in microseconds (None if the phase has not been recorded)
+        """
+        with self._lock:
+            histogram = self.phase_latency.get(phase)
+            if histogram is None:
+                return 0, None
+            return histogram.count, histogram.percentile(percentile)
+
+    def get_state(self) -> dict:
+        """
+        Return the collected statistics as plain types so they can be sent to another process and merged.
+
+        :return: the collected statistics
+        """
+        with self._lock:
+            return {
+                "total_requests": self.total_requests,
+                "failed_requests": self.failed_requests,
+                "bytes_received": self.bytes_received,
+                "response_codes": [[code, message, count] for (code, message), count in self.response_codes.items()],
+                "latency": self.latency.get_state(),
+                "latency_by_code": [[code, histogram.get_state()] for code, histogram in self.latency_by_code.items()],
+                "phase_latency": [[phase, histogram.get_state()] for phase, histogram in self.phase_latency.items()]
+            }
+
+    def merge_state(self, state: dict) -> None:
+        """
+        Merge statistics collected by another StatisticsManager (for example in another process).
+
+        :param state: the statistics returned by get_state
+        """
+        with self._lock:
+            self.total_requests += state["total_requests"]
+            self.failed_requests += state["failed_requests"]
+            self.bytes_received += state.get("bytes_received", 0)
+            # Merged statistics count towards the current reporting window too.
+            self.window_requests += state["total_requests"]
+            self.window_failed_requests += state["failed_requests"]
+            for code, message, count in state["response_codes"]:
+                key = (code, message)
+                self.response_codes[key] = self.response_codes.get(key, 0) + count
+
+            latency = LatencyHistogram.from_state(state["latency"])
+            self.latency.merge(latency)
+            self.window_latency.merge(latency)
+            for code, histogram_state in state["latency_by_code"]:
+                code_latency = self.latency_by_code.setdefault(code, LatencyHistogram())
+                code_latency.merge(LatencyHistogram.from_state(histogram_state))
+            for phase, histogram_state in state.get("phase_latency", []):
+                phase_latency = self.phase_latency.setdefault(phase, LatencyHistogram())
+                phase_latency.merge(LatencyHistogram.from_state(histogram_state))
+
+    @classmethod
+    def from_state(cls, state: dict) -> "StatisticsManager":
+        """
+        Create a StatisticsManager from the statistics returned by get_state.
+
+        :param state: the statistics returned by get_state
+        :return: a new StatisticsManager
+        """
+        statistics_manager = cls()
+        statistics_manager.merge_state(state)
+        return statistics_manager
+
+    @classmethod
+    def difference(cls, state: dict, previous_state: dict) -> "StatisticsManager":
+        """
+        Create a StatisticsManager holding only what was collected between two calls to get_state,
+        for example the statistics of one rotation window.
+
+        :param state: the statistics returned by get_state
+        :param previous_state: the statistics returned by an earlier call to get_state
+        :return: a new StatisticsManager
         """
-        # Appending a new data tuple to the internal list
-        self._data.append((hostname, response_code, response_message, response_time))
+        statistics_manager = cls.from_state(state)
+        statistics_manager.total_requests -= previous_state["total_requests"]
+        statistics_manager.failed_requests -= previous_state["failed_requests"]
+        statistics_manager.bytes_received -= previous_state.get("bytes_received", 0)
+        for code, message, count in previous_state["response_codes"]:
+            key = (code, message)
+            remaining = statistics_manager.response_codes.get(key, 0) - count
+            if remaining > 0:
+                statistics_manager.response_codes[key] = remaining
+            else:
+                statistics_manager.response_codes.pop(key, None)
+
+        statistics_manager.latency.subtract(LatencyHistogram.from_state(previous_state["latency"]))
+        for histograms, previous_histograms in ((statistics_manager.latency_by_code, previous_state["latency_by_code"]),
+                                                (statistics_manager.phase_latency, previous_state.get("phase_latency", []))):
+            for key, histogram_state in previous_histograms:
+                if key in histograms:
+                    histograms[key].subtract(LatencyHistogram.from_state(histogram_state))
+                    if not histograms[key].count:
+                        del histograms[key]
+        return statistics_manager
 
     @staticmethod
     def timedelta_to_str(td: timedelta) -> str:
         """
-        Convert a timedelta object into a string format representing seconds 
+        Convert a timedelta object into a string format representing seconds
         followed by two digits of microseconds.
-    
+
         :param td: timedelta object to be converted
         :return: string representing the timedelta in custom format
         """
         total_seconds = td.total_seconds()
-    
+
         # Formatting the string to show seconds followed by two digits of microseconds
         result_str = f"{total_seconds:.2f}"
-    
+
         return result_str
 
+    @classmethod
+    def microseconds_to_str(cls, microseconds: Optional[float]) -> str:
+        """
+        Convert a number of microseconds into the same format as timedelta_to_str.
+
+        :param microseconds: the number of microseconds, or None if there is no value
+        :return: string representing the time in seconds, or "n/a"
+        """
+        if microseconds is None:
+            return "n/a"
+        return cls.timedelta_to_str(timedelta(microseconds=microseconds))
+
+    @staticmethod
+    def seconds_label(time_str: str) -> str:
+        """
+        Add the seconds unit to a time string, unless there is no value.
+
+        :param time_str: string returned by microseconds_to_str
+        :return: the string with the unit added
+        """
+        return time_str if time_str == "n/a" else f"{time_str}s"
+
     def calculate_statistics(self) -> Dict[str, object]:
         """
-        Calculates min, max, and average response times, and the count of each unique HTTP response code and message.
+        Calculates min, max, average and percentile response times of the successful requests,
+        and the count of each unique HTTP response code and message.
 
         :return: a dictionary containing the statistics
         """
+        with self._lock:
+            # Checking if there is any data to calculate statistics
+            if not self.total_requests:
+                return {}  # Returning an empty dictionary if no data available
 
-        # Checking if there is any data to calculate statistics
-        if not self._data:
-            return {}  # Returning an empty dictionary if no data available
-
-        # Finding the minimum response time
-        #min_time = min(data[3] for data in self._data)
-        # Ensuring that only datetime.timedelta objects are used in the comparison
-        min_time = min(data[3] for data in self._data if isinstance(data[3], timedelta))
-
-        
-        # Finding the maximum response time
-        #max_time = max(data[3] for data in self._data)
-        max_time = max(data[3] for data in self._data if isinstance(data[3], timedelta))
-
-
-        # Calculating the total time by summing the total seconds of each timedelta object
-        #total_time = sum(data[3].total_seconds() for data in self._data)
-        total_time = sum(data[3].total_seconds() for data in self._data if isinstance(data[3], timedelta))
-        
-        # Calculating the average time
-        avg_time = total_time / len(self._data)
-        f_avg_time = f"{avg_time:.2f}"
-
-        # Counting the occurrences of each unique representation of HTTP response code and response reason
-        response_codes = {}
-        for _, response_code, response_message, _ in self._data:
-            # Creating a unique key as a tuple of response_code and response_message
-            key = (response_code, response_message)
-            
-            # Counting each unique key occurrence
-            response_codes[key] = response_codes.get(key, 0) + 1
-
-        # Returning the calculated statistics as a dictionary
-        return {
-            'min_time': self.timedelta_to_str(min_time),  # Minimum response time
-            'max_time': self.timedelta_to_str(max_time),  # Maximum response time
-            'avg_time': f_avg_time,  # Average response time
-            'response_codes': response_codes  # Count of each unique HTTP response code and message
-        }
+            statistics = {
+                'total_requests': self.total_requests,
+                'failed_requests': self.failed_requests,
+                'bytes_received': self.bytes_received,  # Body bytes received by the successful requests
+                'min_time': self.microseconds_to_str(self.latency.min_value),  # Minimum response time
+                'max_time': self.microseconds_to_str(self.latency.max_value),  # Maximum response time
+                'avg_time': self.microseconds_to_str(self.latency.mean()),  # Average response time of successful requests
+                'response_codes': dict(self.response_codes)  # Count of each unique HTTP response code and message
+            }
+            for percentile in self.PERCENTILES:
+                statistics[f'p{percentile}'] = self.microseconds_to_str(self.latency.percentile(percentile))
 
-    def print_statistics(self) -> None:
+            # Latency percentiles for each HTTP response code
+            statistics['latency_by_code'] = {
+                code: {
+                    'p50': self.microseconds_to_str(histogram.percentile(50)),
+                    'p99': self.microseconds_to_str(histogram.percentile(99))
+                }
+                for code, histogram in self.latency_by_code.items()
+            }
+
+            # Latency percentiles for each phase of the requests
+            statistics['phase_latency'] = {
+                phase: {
+                    'count': histogram.count,
+                    'p50': self.microseconds_to_str(histogram.percentile(50)),
+                    'p90': self.microseconds_to_str(histogram.percentile(90)),
+                    'p99': self.microseconds_to_str(histogram.percentile(99))
+                }
+                for phase, histogram in self.phase_latency.items()
+            }
+            return statistics
+
+    def format_statistics(self, title: str = "Statistics") -> str:
         """
-        Print the statistics for user friendly output.
+        Format the statistics for user friendly output.
+
+        :param title: the heading printed above the statistics
+        :return: the formatted statistics
         """
-        print("-" * 30)
-        print("Statistics:")
+        lines = ["-" * 30, f"{title}:"]
         finished_output = self.calculate_statistics()
+        if not finished_output:
+            lines.append("No requests were made.")
+            return "\n".join(lines)
 
         # Formatting the output
-        print(f"Minimum time: {finished_output['min_time']}s")
-        print(f"Maximum time: {finished_output['max_time']}s")
-        print(f"Average time: {finished_output['avg_time']}s\n")
+        lines.append(f"Total requests: {finished_output['total_requests']} ({finished_output['failed_requests']} failed)")
+        successful_requests = finished_output['total_requests'] - finished_output['failed_requests']
+        average_bytes = finished_output['bytes_received'] // successful_requests if successful_requests else 0
+        lines.append(f"Bytes received: {finished_output['bytes_received']} ({average_bytes} per response)")
+        lines.append(f"Minimum time: {self.seconds_label(finished_output['min_time'])}")
+        lines.append(f"Maximum time: {self.seconds_label(finished_output['max_time'])}")
+        lines.append(f"Average time: {self.seconds_label(finished_output['avg_time'])}")
+        lines.append(", ".join(f"p{percentile}: {self.seconds_label(finished_output[f'p{percentile}'])}" for percentile in self.PERCENTILES) + "\n")
 
         # Print headers
-        print(f"{'HTTP Response Code':<30}{'Count':<10}")
+        lines.append(f"{'HTTP Response Code':<30}{'Count':<10}{'p50':<10}{'p99':<10}")
 
         # Collating the counts of each unique HTTP response code
         collated_counts = {}
@@ -120,4 +334,22 @@ class StatisticsManager:
 
         # Printing the sorted, collated counts
         for code, count in sorted_collated_counts:
-            print(f"{code:03} - {HttpStatusCode.get_status_message(code):<24}{count:<10}")
+            code_latency = finished_output['latency_by_code'].get(code, {'p50': 'n/a', 'p99': 'n/a'})
+            lines.append(f"{code:03} - {HttpStatusCode.get_status_message(code):<24}{count:<10}"
+                         f"{code_latency['p50']:<10}{code_latency['p99']:<10}")
+
+        # Printing the latency percentiles for each phase of the requests
+        if finished_output['phase_latency']:
+            lines.append(f"\n{'Request Phase':<30}{'Count':<10}{'p50':<10}{'p90':<10}{'p99':<10}")
+            for phase in PhaseTimer.PHASES:
+                phase_latency = finished_output['phase_latency'].get(phase)
+                if phase_latency is not None:
+                    lines.append(f"{phase.upper():<30}{phase_latency['count']:<10}{phase_latency['p50']:<10}"
+                                 f"{phase_latency['p90']:<10}{phase_latency['p99']:<10}")
+        return "\n".join(lines)
+
+    def print_statistics(self) -> None:
+        """
+        Print the statistics for user friendly output.
+        """
+        print(self.format_statistics())
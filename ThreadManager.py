@@ -1,28 +1,44 @@
 # Author:                   TheScriptGuy
 # Date:                     2023-11-30
-# Version:                  0.02
+# Version:                  0.05
 # Description:              ThreadManager class to help manage the workers..
 
 import threading
 import queue
+from collections import deque
 import signal
 import time
-from typing import Callable, List, Any
+from typing import Callable, Iterator, List, Any, Optional
+
+from ProfileManager import ProfileManager
 
 
 class ThreadManager:
     """ThreadManager Class. Used for managing threads."""
     def __init__(self,
                 num_workers: int,
-                worker_function: Callable[[Any, int], None],
+                worker_function: Callable[[Any, int, Any, int, Optional[str]], str],
                 statistics_manager,
-                message_manager
+                message_manager,
+                rate_limiter=None,
+                autoscaler=None,
+                profile_manager=None,
+                checkpoint_manager=None,
+                destination_manager=None
                 ) -> None:
         """
         Initialize the ThreadManager with the specified number of worker threads and a worker function.
-        The worker function should take an item to process and a thread id.
+        The worker function should take an item to process, a thread id, the statistics_manager, the delay applied before it
+        and its destination (None without a destination_manager).
+        An optional rate_limiter paces how quickly the workers start items, and applies the delay before each one.
+        An optional autoscaler (an AutoscaleManager) grows and shrinks the number of workers while running.
+        An optional profile_manager (a ProfileManager) profiles every thread and times the queue waits.
+        An optional checkpoint_manager (a CheckpointManager, or an AgentManager reporting to its coordinator) is told
+        about every item that is done.
+        An optional destination_manager (a DestinationManager) caps the items in flight to each destination,
+        items for a busy destination are put aside and retried while the worker takes other items.
         """
-        self.CLASS_VERSION = "0.02"
+        self.CLASS_VERSION = "0.05"
         
         # Define the number of workers in the class.
         self.num_workers = num_workers
@@ -48,17 +64,73 @@ class ThreadManager:
         # Set the messages_queue to None
         self.messages_queue = None
 
+        # Define the profile_manager object (None if profiling is not enabled)
+        self.profile_manager = profile_manager
+
+        # Define the checkpoint_manager object (None if checkpoints are not enabled)
+        self.checkpoint_manager = checkpoint_manager
+
+        # Define the destination_manager object (None if destinations are not capped)
+        self.destination_manager = destination_manager
+
+        # Items put aside because their destination was busy, as (time to retry, item)
+        self.deferred_lock = threading.Lock()
+        self.deferred_items = deque()
+
+        # Keep track of the number of worker threads still running, and how many should retire early
+        self.workers_lock = threading.Lock()
+        self.running_workers = 0
+        self.retiring_workers = 0
+
+        # Keep track of the items that have been submitted but not finished. Once input is closed
+        # and every item has finished, the done_event is set and the workers exit.
+        self.outstanding_items = 0
+        self.input_closed = False
+        self.done_event = threading.Event()
+        self.items_to_test = 0
+
+        # Items completed and time spent on them in the current autoscale window
+        self.window_completed = 0
+        self.window_latency = 0.0
+
+        # Define the rate_limiter object shared by every worker (None for no rate limit)
+        self.rate_limiter = rate_limiter
+
+        # Define the autoscaler used to resize the pool (None for a fixed number of workers)
+        self.autoscaler = autoscaler
+        if autoscaler is not None:
+            self.num_workers = autoscaler.clamp(num_workers)
+        self.autoscale_thread = None
+        self.item_queue = None
+
+        # In stream mode a producer thread feeds items from an iterator into a bounded queue.
+        self.item_source = None
+        self.max_queue_size = 0
+        self.total_items = None
+        self.duration = None
+        self.producer_thread = None
+
     def print_variables(self) -> None:
         """
         Print variables.
         """
         self.message_manager.add_to_queue(f"Number of workers = {self.num_workers}")
-        self.message_manager.add_to_queue(f"Number of items to test = {self.items_to_test}")
+        if self.autoscaler is not None:
+            self.message_manager.add_to_queue(f"Autoscale = {self.autoscaler.min_workers}-{self.autoscaler.max_workers} workers, "
+                                              f"Interval = {self.autoscaler.interval}s")
+        if self.item_source is None:
+            self.message_manager.add_to_queue(f"Number of items to test = {self.items_to_test}")
+        else:
+            self.message_manager.add_to_queue(f"Number of items to test = {self.total_items or 'unlimited'}, "
+                                              f"Duration = {f'{self.duration}s' if self.duration else 'unlimited'}, "
+                                              f"Queue size = {self.max_queue_size}")
+        if self.rate_limiter is not None:
+            self.message_manager.add_to_queue(self.rate_limiter.format_settings())
         self.message_manager.add_to_queue("-" * 30)
 
-    def create_queue(self, name_of_queue: str) -> queue.Queue:
-        """Creates a queue and stores it by the given name."""
-        self.queues[name_of_queue] = queue.Queue()
+    def create_queue(self, name_of_queue: str, maxsize: int = 0) -> queue.Queue:
+        """Creates a queue (bounded if maxsize is given) and stores it by the given name."""
+        self.queues[name_of_queue] = queue.Queue(maxsize)
         return self.queues[name_of_queue]
 
     def add_to_queue(self, name_of_queue: str, item_list: List[Any]) -> None:
@@ -74,45 +146,265 @@ class ThreadManager:
         if queue_name not in self.queues:
             raise ValueError(f"No queue found with the name: {queue_name}")
 
-        threads = []
+        # Threads added to an existing list (when the pool grows) are appended to it, and threads
+        # that have already exited are dropped so the list does not grow over a long run.
+        threads = self.thread_lists.setdefault(name_of_thread_list, [])
+        threads[:] = [thread for thread in threads if thread.is_alive()]
         for _ in range(number_of_workers):
-            thread = threading.Thread(target=_target, args=(self.queues[queue_name],))
+            target = self.profile_manager.wrap(_target) if self.profile_manager is not None else _target
+            thread = threading.Thread(target=target, args=(self.queues[queue_name],))
             threads.append(thread)
             thread.start()
 
-        self.thread_lists[name_of_thread_list] = threads
-
     def worker(self, queue_instance: queue.Queue) -> None:
-        """Worker thread to process items from the queue until the exit event is set."""
+        """
+        Worker thread to process items from the queue until every item is done, the exit event is set
+        or the pool shrinks. Items are taken with a blocking get, so a worker waits for new work
+        instead of exiting the moment the queue looks empty.
+        """
         thread_id = threading.get_ident()
 
-        while not self.exit_event.is_set():
-            try:
-                item = queue_instance.get_nowait()
-                result = self.worker_function(item, thread_id, self.statistics_manager)
-                self.message_manager.add_to_queue(result)
-                queue_instance.task_done()
-            except queue.Empty:
-                break
-
-        remaining_threads = threading.active_count() - 3  # Excluding the main thread and the messages thread and the thread that just exited.
-        #print(f"Thread ID: {thread_id} is exiting. Remaining threads: {remaining_threads} of {self.num_workers}")
+        try:
+            while not self.exit_event.is_set() and not self.done_event.is_set():
+                if self.retire_worker():
+                    break
+
+                try:
+                    with ProfileManager.measure(self.profile_manager, "queue_wait"):
+                        item = self.take_item(queue_instance)
+                except queue.Empty:
+                    continue
+
+                # Put the item aside if its destination already has the most items in flight, so the worker can take another.
+                # The destination is worked out once (with the ip key it is a DNS lookup) and passed on to the worker function.
+                destination = None
+                if self.destination_manager is not None:
+                    destination = self.destination_manager.get_destination(item)
+                    if not self.destination_manager.try_acquire(destination):
+                        with self.deferred_lock:
+                            self.deferred_items.append((time.monotonic() + self.destination_manager.DEFER_INTERVAL, item))
+                        continue
+
+                try:
+                    # Wait for the rate limiter (and the delay before each request) once the item can start, so no slot is spent without one.
+                    applied_delay = 0
+                    if self.rate_limiter is not None:
+                        with ProfileManager.measure(self.profile_manager, "rate_limit_wait"):
+                            applied_delay = self.rate_limiter.acquire()
+                        if self.exit_event.is_set():
+                            break
+
+                    # With checkpoints, the item's statistics are added when it is marked done, so a checkpoint never holds part of them.
+                    statistics_manager = self.statistics_manager
+                    if self.checkpoint_manager is not None:
+                        statistics_manager = self.checkpoint_manager.item_statistics()
+
+                    start_time = time.perf_counter()
+                    try:
+                        result = self.worker_function(item, thread_id, statistics_manager, applied_delay, destination)
+                        if self.checkpoint_manager is not None:
+                            self.checkpoint_manager.mark_done(item, statistics_manager)
+                        self.message_manager.add_to_queue(result)
+                    finally:
+                        self.complete_item(time.perf_counter() - start_time)
+                finally:
+                    if destination is not None:
+                        self.destination_manager.release(destination)
+        finally:
+            self.exit_worker(thread_id)
+
+    def take_item(self, queue_instance: queue.Queue) -> Any:
+        """
+        Take the next item. Items put aside because their destination was busy are taken once they are
+        due to be retried, or sooner if the queue is empty. Raises queue.Empty if there is nothing to take.
+        """
+        with self.deferred_lock:
+            if self.deferred_items and self.deferred_items[0][0] <= time.monotonic():
+                return self.deferred_items.popleft()[1]
+            waiting = bool(self.deferred_items)
+
+        try:
+            # The short timeout lets the worker notice the done and exit events.
+            item = queue_instance.get(block=not waiting, timeout=0.1)
+        except queue.Empty:
+            with self.deferred_lock:
+                if not self.deferred_items:
+                    raise
+                retry_time, item = self.deferred_items.popleft()
+            # Only items that were put aside are left, wait until the oldest is due.
+            time.sleep(max(0.0, retry_time - time.monotonic()))
+            return item
+        queue_instance.task_done()
+        return item
+
+    def exit_worker(self, thread_id: int) -> None:
+        """
+        Record that a worker has exited. The last worker to exit shuts down the messages thread.
+        """
+        # Count the workers that are still running, other threads (such as live metrics) are not included.
+        with self.workers_lock:
+            self.running_workers -= 1
+            remaining_threads = self.running_workers
         self.message_manager.add_to_queue(f"Thread ID: {thread_id} is exiting. Remaining threads: {remaining_threads} of {self.num_workers}")
         if remaining_threads == 0:
-            self.message_manager.add_to_queue("QUIT")
+            self.done_event.set()
+            self.message_manager.shutdown(wait=False)
+
+    def retire_worker(self) -> bool:
+        """
+        Return True if the calling worker should exit because the pool is shrinking.
+        """
+        with self.workers_lock:
+            if self.retiring_workers and not self.done_event.is_set():
+                self.retiring_workers -= 1
+                return True
+        return False
+
+    def complete_item(self, seconds: float) -> None:
+        """
+        Record that an item has finished, and set the done event once input is closed and nothing is left.
+        """
+        with self.workers_lock:
+            self.outstanding_items -= 1
+            self.window_completed += 1
+            self.window_latency += seconds
+            if self.input_closed and self.outstanding_items == 0:
+                self.done_event.set()
+
+    def submit(self, item_list: List[Any]) -> None:
+        """
+        Add more items to the work queue, including while the workers are running.
+        """
+        if self.item_queue is None:
+            raise ValueError("The ThreadManager has not been started")
+        with self.workers_lock:
+            if self.input_closed:
+                raise ValueError("No more items can be submitted once input is closed")
+            self.outstanding_items += len(item_list)
+            self.items_to_test += len(item_list)
+        for item in item_list:
+            self.item_queue.put(item)
+
+    def producer_worker(self) -> None:
+        """
+        Producer thread for stream mode. Feeds items from the item source into the bounded queue,
+        blocking while the queue is full, until total_items have been fed, the duration has passed,
+        the source runs out or the exit event is set. Input is then closed.
+        """
+        deadline = time.monotonic() + self.duration if self.duration else None
+        produced = 0
+        try:
+            while not self.exit_event.is_set() and (self.total_items is None or produced < self.total_items):
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                item = next(self.item_source, None)
+                if item is None:
+                    break
+
+                with self.workers_lock:
+                    self.outstanding_items += 1
+                    self.items_to_test += 1
+                while True:
+                    try:
+                        # The short timeout lets the producer notice the deadline and exit event while the queue is full.
+                        self.item_queue.put(item, timeout=0.1)
+                        produced += 1
+                        break
+                    except queue.Full:
+                        if self.exit_event.is_set() or (deadline is not None and time.monotonic() >= deadline):
+                            # The item was never queued, so it is no longer outstanding.
+                            with self.workers_lock:
+                                self.outstanding_items -= 1
+                                self.items_to_test -= 1
+                            return
+        finally:
+            self.close_input()
+
+    def close_input(self) -> None:
+        """
+        Signal that no more items will be submitted. The workers exit once every item is done.
+        """
+        with self.workers_lock:
+            self.input_closed = True
+            if self.outstanding_items == 0:
+                self.done_event.set()
+
+    def resize(self, num_workers: int) -> None:
+        """
+        Grow or shrink the pool to num_workers workers. New workers start straight away, and
+        workers leaving the pool finish their current item first.
+        """
+        with self.workers_lock:
+            if self.done_event.is_set() or self.exit_event.is_set():
+                return
+            current_workers = self.running_workers - self.retiring_workers
+            if num_workers > current_workers:
+                # Cancel pending retirements before starting new threads.
+                cancelled = min(self.retiring_workers, num_workers - current_workers)
+                self.retiring_workers -= cancelled
+                new_workers = num_workers - current_workers - cancelled
+                self.running_workers += new_workers
+            else:
+                self.retiring_workers += current_workers - num_workers
+                new_workers = 0
+            self.num_workers = num_workers
+
+        if new_workers:
+            self.create_thread_list(self.worker_thread_name, self.queue_name, self.worker, new_workers)
+
+    def autoscale_worker(self) -> None:
+        """
+        Resize the pool every autoscale interval, using the items completed in the last window.
+        """
+        while not self.done_event.wait(self.autoscaler.interval) and not self.exit_event.is_set():
+            with self.workers_lock:
+                completed, total_latency = self.window_completed, self.window_latency
+                self.window_completed = 0
+                self.window_latency = 0.0
+            backlog = self.item_queue.qsize()
+            num_workers = self.autoscaler.next_workers(self.num_workers, completed, total_latency, backlog)
+            if num_workers != self.num_workers:
+                self.message_manager.add_to_queue(f"Autoscale: {self.num_workers} -> {num_workers} workers, "
+                                                  f"Throughput: {completed / self.autoscaler.interval:.1f} items/s, "
+                                                  f"Latency: {total_latency / completed if completed else 0:.3f}s")
+                self.resize(num_workers)
 
     def message_worker(self, queue_instance: queue.Queue) -> None:
         """Message worker thread."""
         self.message_manager.monitor_queue()
 
-    def start(self, item_list: List[Any], queue_name: str, thread_name: str) -> None:
+    def start_stream(self,
+                    item_source: Iterator[Any],
+                    queue_name: str,
+                    thread_name: str,
+                    total_items: Optional[int] = None,
+                    duration: Optional[float] = None,
+                    max_queue_size: int = 1000
+                    ) -> None:
+        """
+        Starts the ThreadManager in stream (soak) mode. Items are drawn from item_source by a producer
+        thread into a queue of at most max_queue_size items, so memory use stays constant however long
+        the run is. Stops after total_items items or duration seconds (whichever comes first), or once
+        item_source runs out. Returns once every item that was queued is done.
+        """
+        if max_queue_size < 1:
+            raise ValueError("Queue size must be at least 1")
+        self.item_source = iter(item_source)
+        self.total_items = total_items
+        self.duration = duration
+        self.max_queue_size = max_queue_size
+        self.start([], queue_name, thread_name, close_input=False)
+
+    def start(self, item_list: List[Any], queue_name: str, thread_name: str, close_input: bool = True) -> None:
         """
         Starts the ThreadManager, creating a queue and threads, adding items from item_list to the queue,
-        and setting up signal handling.
+        and setting up signal handling. Returns once every item is done.
+        If close_input is False, more items can be added from another thread with submit, and the
+        workers keep waiting for work until close_input is called.
         """
         signal.signal(signal.SIGINT, self.exit_signal_handler)
-        self.items_to_test = len(item_list)
         self.worker_thread_name = thread_name
+        self.queue_name = queue_name
 
         # Create a message queue.
         message_queue = self.create_queue('messages')
@@ -123,14 +415,26 @@ class ThreadManager:
         # Create the messages thread list. Given that we're only displaying to one stdout, only one thread is required.
         self.create_thread_list('messages_thread', 'messages', self.message_worker, 1)
 
+        # Creating a queue, adding elements in item_list to it, and starting threads
+        self.item_queue = self.create_queue(queue_name, self.max_queue_size)
+        self.submit(item_list)
+        if close_input:
+            self.close_input()
+
         # Print the variables
         self.print_variables()
 
-        # Creating a queue, adding elements in item_list to it, and starting threads
-        item_queue = self.create_queue(queue_name)
-        self.add_to_queue(queue_name, item_list)
+        self.running_workers = self.num_workers
         self.create_thread_list(thread_name, queue_name, self.worker, self.num_workers)
 
+        if self.autoscaler is not None:
+            self.autoscale_thread = threading.Thread(target=self.autoscale_worker, daemon=True)
+            self.autoscale_thread.start()
+
+        if self.item_source is not None:
+            self.producer_thread = threading.Thread(target=self.producer_worker, daemon=True)
+            self.producer_thread.start()
+
         self.join_threads("messages_thread")
 
     def exit_signal_handler(self, signum: int, frame) -> None:
@@ -143,13 +447,14 @@ class ThreadManager:
         self.exit_event.set()
         self.join_threads(self.worker_thread_name)
 
-        # Set the message_exit_event and join threads.
+        # Set the message_exit_event, flush the remaining messages and join threads.
         self.message_exit_event.set()
-        self.message_manager.message_exit_event = True
+        self.message_manager.shutdown(wait=False)
         self.join_threads('messages_thread')
 
     def join_threads(self, name_of_thread: str) -> None:
         """Join all the threads."""
         # Join all threads to make sure they have finished before exiting the program.
-        for thread in self.thread_lists[name_of_thread]:
+        # The list is copied, as the pool may still be growing.
+        for thread in list(self.thread_lists[name_of_thread]):
             thread.join()
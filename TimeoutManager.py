@@ -0,0 +1,113 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Version:                  0.01
+# Description:              TimeoutManager class used to work out the connect and read timeouts of each request
+
+import threading
+import time
+from typing import Tuple
+
+
+class TimeoutManager:
+    """
+    Works out the connect and read timeouts to use for each request.
+
+    In fixed mode the configured timeouts are always used. In adaptive mode, once `warmup`
+    successful requests have been recorded, the timeouts are set to `multiplier` times the
+    running p99 of the matching request phases: connect and TLS for the connect timeout, and
+    time to first byte for the read timeout. They are kept between `min_timeout` and the
+    configured timeouts, so the configured timeouts are the largest budget a request gets.
+    """
+    def __init__(self,
+                connect_timeout: float = 5.0,
+                read_timeout: float = 5.0,
+                adaptive: bool = False,
+                multiplier: float = 3.0,
+                min_timeout: float = 0.5,
+                warmup: int = 100,
+                refresh_interval: float = 1.0
+                ) -> None:
+        """
+        Initialize the TimeoutManager.
+
+        :param connect_timeout: seconds to wait for a connection (and TLS handshake) to be established
+        :param read_timeout: seconds to wait for the server to send data
+        :param adaptive: set the timeouts from the latency observed so far
+        :param multiplier: the adaptive timeouts are this many times the running p99
+        :param min_timeout: the smallest adaptive timeout
+        :param warmup: the number of successful requests recorded before the adaptive timeouts are used
+        :param refresh_interval: seconds between recalculating the adaptive timeouts
+        """
+        self.CLASS_VERSION = "0.01"
+
+        if connect_timeout <= 0 or read_timeout <= 0:
+            raise ValueError("Connect and read timeouts must be greater than 0 seconds")
+        if multiplier <= 0:
+            raise ValueError("Adaptive timeout multiplier must be greater than 0")
+        if min_timeout <= 0:
+            raise ValueError("Minimum adaptive timeout must be greater than 0 seconds")
+        if warmup < 1:
+            raise ValueError("Adaptive timeout warm up must be at least 1 request")
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.adaptive = adaptive
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.warmup = warmup
+        self.refresh_interval = refresh_interval
+
+        # The adaptive timeouts are recalculated at most once every refresh_interval, not on every request.
+        self._lock = threading.Lock()
+        self._timeouts = (connect_timeout, read_timeout)
+        self._next_refresh = 0.0
+
+    def print_variables(self) -> None:
+        """
+        Print variables.
+        """
+        output = f"Connect Timeout = {self.connect_timeout}s, Read Timeout = {self.read_timeout}s, Adaptive Timeouts = {self.adaptive}"
+        if self.adaptive:
+            output += (f", Adaptive Multiplier = {self.multiplier}, Adaptive Minimum = {self.min_timeout}s, "
+                       f"Adaptive Warm Up = {self.warmup} requests")
+        print(output)
+
+    def clamp(self, seconds: float, max_timeout: float) -> float:
+        """
+        Keep an adaptive timeout between min_timeout and max_timeout.
+        """
+        return min(max_timeout, max(self.min_timeout, seconds))
+
+    def calculate_timeouts(self, statistics_manager) -> Tuple[float, float]:
+        """
+        Calculate the adaptive timeouts from the phase latency collected by statistics_manager.
+        The configured timeouts are returned until the warm up is over.
+        """
+        ttfb_count, ttfb_p99 = statistics_manager.phase_percentile("ttfb", 99)
+        if ttfb_count < self.warmup:
+            return self.connect_timeout, self.read_timeout
+
+        read_timeout = self.clamp(self.multiplier * ttfb_p99 / 1_000_000, self.read_timeout)
+
+        # Only new connections record the connect and TLS phases, so they may not have warmed up yet.
+        connect_count, connect_p99 = statistics_manager.phase_percentile("connect", 99)
+        if connect_count < self.warmup:
+            return self.connect_timeout, read_timeout
+        _, tls_p99 = statistics_manager.phase_percentile("tls", 99)
+        connect_timeout = self.clamp(self.multiplier * (connect_p99 + (tls_p99 or 0)) / 1_000_000, self.connect_timeout)
+        return connect_timeout, read_timeout
+
+    def get_timeouts(self, statistics_manager) -> Tuple[float, float]:
+        """
+        Get the connect and read timeouts (in seconds) to use for the next request.
+        """
+        if not self.adaptive:
+            return self.connect_timeout, self.read_timeout
+
+        now = time.monotonic()
+        if now >= self._next_refresh:
+            with self._lock:
+                if now >= self._next_refresh:
+                    self._timeouts = self.calculate_timeouts(statistics_manager)
+                    self._next_refresh = now + self.refresh_interval
+        return self._timeouts
@@ -0,0 +1,111 @@
+# Author:                   TheScriptGuy
+# Date:                     2026-10-17
+# Description:              Benchmark the request engines offline, against a local mock server.
+# Version:                  0.01
+
+import argparse
+import sys
+
+from ConnectionManager import ConnectionManager
+from AsyncManager import AsyncManager
+from MockServer import MockServer
+from BenchmarkManager import BenchmarkManager
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the request engines against a local mock server, without the internet.')
+    parser.add_argument('--engines', nargs='+', choices=['thread', 'async'], default=['thread'], help='Engines to benchmark. Default thread.')
+    parser.add_argument('--workers', nargs='+', type=int, default=[10, 50], help='Worker counts to benchmark each engine with. Default 10 50.')
+    parser.add_argument('--requests', type=int, default=2000, help='Number of requests in each case. Default 2000.')
+    parser.add_argument('--hostnames', type=int, default=1000, help='Number of unique synthetic hostnames. Default 1000.')
+
+    # Mock server arguments
+    parser.add_argument('--latency', type=float, default=0.01, help='Seconds the mock server waits before every response. Default 0.01.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many extra seconds are added to the latency at random. Default 0.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 503 (0-1). Default 0.')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='Fraction of requests dropped without a response (0-1). Default 0.')
+    parser.add_argument('--body-size', type=int, default=1024, help='Number of bytes in every response body. Default 1024.')
+    parser.add_argument('--tls', action='store_true', help='Serve HTTPS as well as HTTP, and request HTTPS first with HTTP as the fallback. Without it, only HTTP is requested.')
+    parser.add_argument('--proxy', action='store_true', help='Send every request through the mock server acting as a forward proxy.')
+    parser.add_argument('--cert', help='TLS certificate for --tls. A self-signed one is created with openssl if not given.')
+    parser.add_argument('--key', help='TLS private key for --cert.')
+
+    # Client arguments
+    parser.add_argument('--request-mode', choices=ConnectionManager.REQUEST_MODES, default='get', help='How to handle the response body. Default get.')
+    parser.add_argument('--max-bytes', type=int, default=65536, help='With --request-mode capped, the most body bytes to read. Default 65536.')
+    parser.add_argument('--no-keep-alive', action='store_true', help='Close connections after every request instead of reusing them.')
+    parser.add_argument('--race', action='store_true', help='Race HTTPS and HTTP instead of only trying HTTP after HTTPS has failed.')
+
+    # Report arguments
+    parser.add_argument('--output', default='benchmark.json', help='File to write the JSON report to. Default benchmark.json.')
+    parser.add_argument('--baseline', help='A previous JSON report. Exit with status 1 if any case has regressed against it.')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='With --baseline, the fraction throughput may fall or p99 latency may rise before it is a regression. Default 0.1.')
+
+    args = parser.parse_args()
+
+    if args.requests < 1 or args.hostnames < 1:
+        print("Error: Number of requests and number of hostnames must be at least 1")
+        sys.exit(1)
+    if min(args.workers) < 1:
+        print("Error: Number of workers must be at least 1")
+        sys.exit(1)
+    if args.latency < 0 or args.jitter < 0:
+        print("Error: Latency and jitter must be 0 or greater")
+        sys.exit(1)
+    if not 0 <= args.error_rate <= 1 or not 0 <= args.reset_rate <= 1:
+        print("Error: Error rate and reset rate must be between 0 and 1")
+        sys.exit(1)
+    if args.body_size < 0:
+        print("Error: Body size must be 0 or greater")
+        sys.exit(1)
+    if (args.cert is None) != (args.key is None):
+        print("Error: --cert and --key must be given together")
+        sys.exit(1)
+    if args.max_bytes < 1:
+        print("Error: Maximum bytes must be at least 1")
+        sys.exit(1)
+    if args.tolerance < 0:
+        print("Error: Tolerance must be 0 or greater")
+        sys.exit(1)
+    if 'async' in args.engines and not AsyncManager.is_available():
+        print("Error: The async engine requires the aiohttp package. Install it with: pip install aiohttp")
+        sys.exit(1)
+
+    # Load the baseline first, so a bad file is reported before the benchmark runs.
+    baseline = BenchmarkManager.load_report(args.baseline) if args.baseline else None
+
+    # Define a mock_server object and start serving.
+    mock_server = MockServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, reset_rate=args.reset_rate,
+                             body_size=args.body_size, tls=args.tls, proxy=args.proxy, certfile=args.cert, keyfile=args.key)
+    mock_server.start()
+
+    # Define the connection settings used to build the connection_manager of each case.
+    connection_settings = dict(
+            keep_alive=not(args.no_keep_alive),
+            race=args.race,
+            request_mode=args.request_mode,
+            max_bytes=args.max_bytes,
+            # Enough probe threads for --race in the largest case.
+            probe_workers=max(args.workers) * 4
+    )
+
+    # Define a benchmark_manager object and run every case.
+    benchmark_manager = BenchmarkManager(mock_server, args.engines, args.workers, args.requests, args.hostnames, connection_settings)
+    try:
+        report = benchmark_manager.run()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        mock_server.stop()
+
+    benchmark_manager.write_report(report, args.output)
+    print(f"Report written to {args.output}")
+
+    if baseline is not None:
+        regressions = BenchmarkManager.compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
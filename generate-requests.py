@@ -3,58 +3,107 @@
 # Description:              Generate a random number of requests to a random sample of hostnames.
 # Version:                  0.01
 
-import argparse
 import sys
 
 from FileManager import FileManager
+from SamplingManager import SamplingManager
 from ConnectionManager import ConnectionManager
 from ThreadManager import ThreadManager
 from StatisticsManager import StatisticsManager
 from MessageManager import MessageManager
+from AsyncManager import AsyncManager
+from ProcessManager import ProcessManager
+from RateLimiter import RateLimiter
+from AutoscaleManager import AutoscaleManager
+from MetricsManager import MetricsManager
+from ResultManager import ResultManager
+from ProfileManager import ProfileManager
+from CoordinatorManager import CoordinatorManager
+from AgentManager import AgentManager
+from CheckpointManager import CheckpointManager
+from OutcomeCacheManager import OutcomeCacheManager
+from ArgumentManager import ArgumentManager
 
 from datetime import datetime, timedelta
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Connect to random hostnames with multiple threads.')
-    parser.add_argument('--cleanup', action='store_true', help='Clean up downloaded files and exit.')
-    parser.add_argument('num_connections', type=int, nargs='?', default=100, help='Number of connections to establish. Default 100.')
-    parser.add_argument('num_workers', type=int, nargs='?', default=3, help='Number of worker threads. Default 3.')
-    parser.add_argument('--insecure', action='store_true', help='Allow insecure connections.')
-
-    # Add delay argument group (mutually exclusive)
-    delay_group = parser.add_mutually_exclusive_group()
-    delay_group.add_argument('--delay', type=int, help='Constant delay in seconds (0-10) before each request.')
-    delay_group.add_argument('--random-delay', type=int, dest='random_delay_max',
-                           help='Random delay between 0 and specified seconds (max 10) before each request.')
-
-    args = parser.parse_args()
-
-    # Add validation for delay arguments
-    if args.delay is not None and (args.delay < 0 or args.delay > 10):
-        print("Error: Delay must be between 0 and 10 seconds")
-        sys.exit(1)
-    if args.random_delay_max is not None and (args.random_delay_max < 0 or args.random_delay_max > 10):
-        print("Error: Random delay maximum must be between 0 and 10 seconds")
-        sys.exit(1)
+    args = ArgumentManager.parse_arguments()
 
     if args.cleanup:
-        FileManager.cleanup_files(["top-1m.csv", "top-1m.csv.zip"])
+        FileManager.cleanup_cache(args.cache_dir)
         sys.exit(0)
 
+    if args.agent is not None:
+        # Agent mode: the coordinator hands out the hostnames and the connection settings.
+        statistics_manager = StatisticsManager()
+        agent_manager = AgentManager(args.coordinator_host, args.coordinator_port, args.num_workers, statistics_manager, MessageManager(),
+                                     name=args.agent_name)
+        try:
+            agent_manager.run()
+        except (OSError, ConnectionError) as e:
+            print(f"Error: Could not work for the coordinator at {args.agent}: {e}")
+            sys.exit(1)
+
+        print("All worker threads have completed.")
+
+        # Print the statistics of the work done by this agent.
+        statistics_manager.print_statistics()
+        sys.exit(0)
+
+    # Load the checkpoint of the run being resumed (None for a new run).
+    checkpoint = None
+    if args.resume:
+        try:
+            checkpoint = CheckpointManager.load(args.checkpoint)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    # Define the outcome cache settings, these are also used to open the outcome cache in each process.
+    outcome_cache_settings = None
+    if args.outcome_cache:
+        outcome_cache_settings = dict(cache_file=args.outcome_cache, ttls=args.outcome_ttls, max_entries=args.outcome_cache_size)
+
+    # Define an outcome_cache object and find the hostnames known to be dead (None if the outcome cache is not enabled).
+    outcome_cache = None
+    dead_hostnames = None
+    if outcome_cache_settings:
+        outcome_cache = OutcomeCacheManager(**outcome_cache_settings)
+        try:
+            outcome_cache.open()
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        outcome_cache.print_variables()
+        dead_hostnames = outcome_cache.get_dead_hostnames()
+
     # Work out what yesterday's date was.
     yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
 
+    # Define a sampling_manager object used to draw hostnames by rank.
+    sampling_manager = SamplingManager(args.sampling, zipf_exponent=args.zipf_exponent, strata=args.strata, seed=args.seed,
+                                       dead_hostnames=dead_hostnames, dead_weight=args.dead_weight)
+    sampling_manager.print_variables()
+
     # Define a file_manager object based off yesterday's date
-    file_manager = FileManager(yesterday)
+    file_manager = FileManager(yesterday, cache_dir=args.cache_dir, sampling_manager=sampling_manager)
 
-    # Download and extract the csv file from Umbrella
-    file_manager.download_and_extract_file(yesterday)
+    if checkpoint is not None:
+        # Continue with the hostnames left in the checkpoint, so the list does not have to be downloaded or loaded again.
+        file_manager.random_sample = checkpoint["remaining"]
+        print(f"Resuming from checkpoint {args.checkpoint} saved {checkpoint['saved']}: "
+              f"{checkpoint['completed']} hostnames completed, {len(file_manager.random_sample)} remaining.")
+    else:
+        # Download the zip file from Umbrella into the cache, or reuse the cached copy.
+        file_manager.download_to_cache(offline=args.offline)
 
-    # Load the csv into memory
-    file_manager.load_csv()
+        # Load the compact hostname index, it is built once per list.
+        file_manager.load_index()
 
-    # Get a random sample based off the number of connections we need to establish
-    file_manager.get_random_sample(args.num_connections)
+        # Get a random sample based off the number of connections we need to establish.
+        # In soak mode the hostnames are drawn as they are needed instead.
+        if not args.soak_mode:
+            file_manager.get_random_sample(args.num_connections, top=args.top)
 
     # Custom HTTP Headers
     http_headers = {
@@ -62,32 +111,242 @@ if __name__ == '__main__':
         "User-Agent": "MyTestUserAgent/1.0"
     }
 
-    # Define a connection_manager object.
-    connection_manger = ConnectionManager(
+    # Define the connection settings, these are also used to build a connection_manager in each process.
+    connection_settings = dict(
             secure=not(args.insecure), 
             http_headers=http_headers,
             delay=args.delay,
-            random_delay_max=args.random_delay_max
+            random_delay_max=args.random_delay_max,
+            pool_size=args.pool_size,
+            keep_alive=not(args.no_keep_alive),
+            max_retries=args.retries,
+            retry_backoff=args.retry_backoff,
+            phase_timing=args.phase_timing,
+            dns_ttl=args.dns_ttl,
+            dns_negative_ttl=args.dns_negative_ttl,
+            race=args.race,
+            race_stagger=args.race_stagger,
+            race_families=args.race_families,
+            probe_workers=(args.max_workers if args.autoscale else args.num_workers) * 4,
+            connect_timeout=args.connect_timeout,
+            read_timeout=args.read_timeout,
+            adaptive_timeout=args.adaptive_timeout,
+            adaptive_multiplier=args.adaptive_multiplier,
+            adaptive_min_timeout=args.adaptive_min_timeout,
+            adaptive_warmup=args.adaptive_warmup,
+            request_mode=args.request_mode,
+            max_bytes=args.max_bytes,
+            max_per_destination=args.max_per_destination,
+            destination_key=args.destination_key,
+            breaker_threshold=args.breaker_threshold,
+            breaker_cooldown=args.breaker_cooldown
     )
 
-    # Define a statistics_manager object
+    # Define the rate settings shared by every worker (None for no rate limit or delay).
+    # The rate limiter also applies the delay before each request.
+    rate_settings = None
+    if args.rate or args.delay is not None or args.random_delay_max is not None:
+        rate_settings = dict(rate=args.rate, burst=args.burst, arrival=args.arrival, delay=args.delay, random_delay_max=args.random_delay_max)
+
+    # Define the autoscale settings (None for a fixed number of workers).
+    autoscale_settings = None
+    if args.autoscale:
+        autoscale_settings = dict(min_workers=args.min_workers, max_workers=args.max_workers, interval=args.autoscale_interval)
+
+    # Define the live metrics settings (None if live metrics are not enabled).
+    metrics_settings = None
+    if args.report_interval or args.metrics_port is not None or args.rotate_interval:
+        metrics_settings = dict(report_interval=args.report_interval, metrics_port=args.metrics_port, metrics_host=args.metrics_host,
+                                rotate_interval=args.rotate_interval)
+
+    # Define the result file settings (None if the results are not written to a file).
+    result_settings = dict(output_file=args.output_file, output_format=args.output_format) if args.output_file else None
+
+    # Define a statistics_manager object, carrying on from the statistics in the checkpoint when resuming.
     statistics_manager = StatisticsManager()
+    if checkpoint is not None:
+        statistics_manager.merge_state(checkpoint["statistics"])
+
+    if args.processes > 1:
+        # Split the sample into shards and run each one in its own process.
+        process_manager = ProcessManager(args.processes, args.engine, args.num_workers, connection_settings, statistics_manager,
+                                         rate_settings, metrics_settings, args.dns_workers if args.pre_resolve else None,
+                                         autoscale_settings, result_settings, outcome_cache_settings, args.dns_workers)
+        process_manager.start(file_manager.get_sample_shards(args.processes))
+
+        # Remove expired entries from the outcome cache the processes wrote to.
+        if outcome_cache is not None:
+            outcome_cache.close()
+
+        print("All worker processes have completed.")
+
+        # Print the merged statistics from all the processes.
+        statistics_manager.print_statistics()
+        sys.exit(0)
+
+    if args.listen is not None:
+        # Hand the sample out to the agents, or keep drawing hostnames for them in soak mode.
+        if args.soak_mode:
+            items = AsyncManager.limit_items(file_manager.iter_random_hostnames(top=args.top), args.total_requests, args.duration)
+        else:
+            items = file_manager.random_sample
+
+        # Define a coordinator_manager object. The rate limit is held across every agent by pacing the hostnames handed out,
+        # and each agent applies the delay before each request itself.
+        message_manager = MessageManager()
+        coordinator_manager = CoordinatorManager(items, statistics_manager, message_manager, connection_settings,
+                                                 args.listen_host, args.listen, args.agents,
+                                                 rate_limiter=RateLimiter(args.rate, args.burst, args.arrival) if args.rate else None)
+
+        # Define a metrics_manager object and start reporting the merged live metrics.
+        metrics_manager = None
+        if metrics_settings:
+            metrics_manager = MetricsManager(statistics_manager, message_manager, **metrics_settings)
+            metrics_manager.start()
+
+        try:
+            coordinator_manager.start()
+        except OSError as e:
+            print(f"Error: Could not listen on {args.listen_host}:{args.listen}: {e}")
+            sys.exit(1)
+        finally:
+            if metrics_manager is not None:
+                metrics_manager.stop()
+
+        if not coordinator_manager.agents_lost:
+            print("All agents have completed.")
+
+        # Print the merged statistics from all the agents.
+        statistics_manager.print_statistics()
+
+        if coordinator_manager.agents_lost:
+            print(f"Error: Every agent disconnected before the sample was done. {coordinator_manager.unfinished} hostnames "
+                  f"were given back by agents and not tested, and any hostnames not yet handed out were not tested either.")
+            sys.exit(1)
+        sys.exit(0)
+
+    # Define a result_manager object and start writing results in the background.
+    result_manager = None
+    if result_settings:
+        result_manager = ResultManager(**result_settings)
+        result_manager.print_variables()
+        result_manager.start()
+
+    # Define a profile_manager object (None if profiling is not enabled).
+    profile_manager = None
+    if args.profile:
+        profile_manager = ProfileManager(args.profile, sample_interval=args.profile_interval, output_file=args.profile_output)
+        profile_manager.print_variables()
+
+    # Define a checkpoint_manager object (None if checkpoints are not enabled).
+    checkpoint_manager = None
+    if args.checkpoint:
+        checkpoint_manager = CheckpointManager(args.checkpoint, statistics_manager, args.checkpoint_interval)
+        checkpoint_manager.print_variables()
+
+    # Define a connection_manager object.
+    try:
+        connection_manger = ConnectionManager(**connection_settings, result_manager=result_manager, profile_manager=profile_manager,
+                                              outcome_cache=outcome_cache)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
     # Define a message_manager object.
-    message_manager = MessageManager()
+    message_manager = MessageManager(profile_manager=profile_manager)
+
+    # Start writing the outcomes of the requests to the outcome cache.
+    if outcome_cache is not None:
+        outcome_cache.start(message_manager)
+
+    # Define a rate_limiter object shared by every worker.
+    rate_limiter = RateLimiter(**rate_settings) if rate_settings else None
+
+    # Define a metrics_manager object and start reporting live metrics.
+    metrics_manager = None
+    if metrics_settings:
+        metrics_manager = MetricsManager(statistics_manager, message_manager, **metrics_settings)
+        metrics_manager.start()
+
+    # Start profiling.
+    if profile_manager is not None:
+        profile_manager.start()
+
+    # Resolve the sample up front, hostnames that do not resolve are recorded and skipped.
+    if args.pre_resolve:
+        file_manager.random_sample = connection_manger.pre_resolve(file_manager.random_sample, statistics_manager, message_manager, args.dns_workers)
 
-    # Define a thread_manager object.
-    thread_manager = ThreadManager(args.num_workers, connection_manger.make_request, statistics_manager, message_manager)
+    # Start saving the progress of the run.
+    if checkpoint_manager is not None:
+        checkpoint_manager.start(file_manager.random_sample, checkpoint["completed"] if checkpoint else 0)
 
-    # Create the queues and threads to work through.
-    thread_manager.start(file_manager.random_sample, "hostnames_queue", "hostnames_thread_list")
+    if args.engine == 'async':
+        # Define an async_manager object and run the sample through the event loop.
+        async_manager = AsyncManager(args.num_workers, connection_manger, statistics_manager, message_manager, rate_limiter,
+                                     checkpoint_manager, args.dns_workers)
+        if args.soak_mode:
+            async_manager.start_stream(file_manager.iter_random_hostnames(top=args.top), args.total_requests, args.duration)
+        else:
+            async_manager.start(file_manager.random_sample)
 
-    # Wait until all the threads have finished.
-    thread_manager.join_threads("hostnames_thread_list")
+        print("All async workers have completed.")
+    else:
+        # Define an autoscaler object used to resize the pool (None for a fixed number of workers).
+        autoscaler = AutoscaleManager(**autoscale_settings) if autoscale_settings else None
+
+        # Define a thread_manager object.
+        thread_manager = ThreadManager(args.num_workers, connection_manger.make_request, statistics_manager, message_manager,
+                                       rate_limiter, autoscaler, profile_manager, checkpoint_manager,
+                                       connection_manger.destination_manager)
+
+        # Create the queues and threads to work through.
+        if args.soak_mode:
+            # Hostnames are fed through a bounded queue until the duration or total requests is reached.
+            thread_manager.start_stream(file_manager.iter_random_hostnames(top=args.top), "hostnames_queue", "hostnames_thread_list",
+                                        args.total_requests, args.duration, args.queue_size)
+        else:
+            thread_manager.start(file_manager.random_sample, "hostnames_queue", "hostnames_thread_list")
+
+        # Wait until all the threads have finished.
+        thread_manager.join_threads("hostnames_thread_list")
+
+        print("All worker threads have completed.")
+
+    # Save a last checkpoint if the run was interrupted, otherwise the run is complete and the checkpoint is removed.
+    if checkpoint_manager is not None:
+        remaining = checkpoint_manager.stop()
+        if remaining:
+            print(f"Checkpoint saved to {args.checkpoint} with {remaining} hostnames remaining. Continue the run with --resume.")
+
+    # Stop profiling.
+    if profile_manager is not None:
+        profile_manager.stop()
+
+    # Stop reporting live metrics.
+    if metrics_manager is not None:
+        metrics_manager.stop()
+
+    # Wait for any raced attempts still running, and close the pooled sessions used by the workers.
+    connection_manger.close()
+
+    # Write any results still waiting and close the result file.
+    if result_manager is not None:
+        result_manager.close()
+
+    # Write any outcomes still waiting and close the outcome cache.
+    if outcome_cache is not None:
+        outcome_cache.close()
+
+    # Make sure every message has been written.
+    message_manager.shutdown()
 
-    print("All worker threads have completed.")
-    
-    thread_manager.message_manager.message_exit_event = True
-    
     # Print the statistics from all the work that has been done.
     statistics_manager.print_statistics()
+
+    # Print how often destinations were busy or had an open circuit breaker.
+    if connection_manger.destination_manager is not None:
+        print(connection_manger.destination_manager.format_statistics())
+
+    # Print where the time went.
+    if profile_manager is not None:
+        profile_manager.print_report()
@@ -0,0 +1,60 @@
+import asyncio
+import io
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from AsyncManager import AsyncManager
+from ConnectionManager import ConnectionManager
+from MessageManager import MessageManager
+from StatisticsManager import StatisticsManager
+
+pytestmark = pytest.mark.skipif(not AsyncManager.is_available(), reason="aiohttp is not installed")
+
+
+class SlowDnsManager:
+    """
+    Resolves every hostname to 127.0.0.1 after a delay, recording the thread each lookup ran on.
+    """
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.threads = []
+
+    def resolve(self, host: str) -> list:
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        return ["127.0.0.1"]
+
+
+@pytest.fixture
+def async_manager():
+    connection_manager = ConnectionManager()
+    async_manager = AsyncManager(1, connection_manager, StatisticsManager(), MessageManager(output_stream=io.StringIO()), dns_workers=20)
+    yield async_manager
+    connection_manager.close()
+
+
+def test_lookups_run_on_the_dns_executor(async_manager):
+    dns_manager = async_manager.connection_manager.dns_manager = SlowDnsManager(0.2)
+
+    async def resolve_all() -> list:
+        with ThreadPoolExecutor(max_workers=async_manager.dns_workers, thread_name_prefix="dns") as dns_executor:
+            resolver = async_manager.create_resolver(dns_executor)
+            return await asyncio.gather(*(resolver.resolve(f"host{number}.example", 443) for number in range(20)))
+
+    start = time.monotonic()
+    results = asyncio.run(resolve_all())
+
+    # All 20 slow lookups run at once, instead of queueing behind the default executor's few threads.
+    assert time.monotonic() - start < 1.0
+    assert all(thread.startswith("dns") for thread in dns_manager.threads)
+    assert results[0] == [{"hostname": "host0.example", "host": "127.0.0.1", "port": 443, "family": socket.AF_INET,
+                           "proto": socket.IPPROTO_TCP, "flags": socket.AI_NUMERICHOST}]
+
+
+def test_dns_workers_must_be_positive():
+    with pytest.raises(ValueError):
+        AsyncManager(1, ConnectionManager(), StatisticsManager(), MessageManager(output_stream=io.StringIO()), dns_workers=0)
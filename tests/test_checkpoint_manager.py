@@ -0,0 +1,165 @@
+import io
+import json
+import threading
+import time
+from datetime import timedelta
+
+from CheckpointManager import CheckpointManager
+from MessageManager import MessageManager
+from StatisticsManager import StatisticsManager
+from ThreadManager import ThreadManager
+
+
+# A zipf-like sample, with repeats.
+HOSTNAMES = [f"host{number % 150}.example" for number in range(400)]
+
+
+def make_request(hostname, thread_id, statistics_manager, applied_delay=0, destination=None) -> str:
+    """
+    Records the same statistics for a hostname every time, without a request. Every third hostname
+    fails over HTTPS first, so it has two results, with a pause in between for a checkpoint to fall into.
+    """
+    number = int(hostname[4:].split(".", 1)[0])
+    if number % 3 == 0:
+        statistics_manager.add_data(hostname, 0, "Connection refused", 0)
+        time.sleep(0.0005)
+    statistics_manager.add_data(hostname, 200, "OK", timedelta(milliseconds=number % 50 + 1), {"ttfb": number / 10000}, number)
+    return f"TID: {thread_id}, SC: 200, Hostname: {hostname}"
+
+
+def results_per_hostname(hostnames) -> int:
+    return sum(2 if int(hostname[4:].split(".", 1)[0]) % 3 == 0 else 1 for hostname in hostnames)
+
+
+def run(hostnames, statistics_manager, checkpoint_manager=None, num_workers=8) -> None:
+    thread_manager = ThreadManager(num_workers, make_request, statistics_manager, MessageManager(output_stream=io.StringIO()),
+                                   checkpoint_manager=checkpoint_manager)
+    thread_manager.start(hostnames, "hostnames_queue", "hostnames_thread_list")
+    thread_manager.join_threads("hostnames_thread_list")
+
+
+def comparable(state: dict) -> dict:
+    """
+    The statistics state with its lists turned into dicts, so the order things were first seen in does not matter.
+    """
+    def histogram(histogram_state):
+        return dict(histogram_state, buckets=dict(map(tuple, histogram_state["buckets"])))
+    return {
+        "total_requests": state["total_requests"],
+        "failed_requests": state["failed_requests"],
+        "bytes_received": state["bytes_received"],
+        "response_codes": {(code, message): count for code, message, count in state["response_codes"]},
+        "latency": histogram(state["latency"]),
+        "latency_by_code": {code: histogram(histogram_state) for code, histogram_state in state["latency_by_code"]},
+        "phase_latency": {phase: histogram(histogram_state) for phase, histogram_state in state["phase_latency"]}
+    }
+
+
+def test_item_statistics_are_held_back_until_done(tmp_path):
+    statistics_manager = StatisticsManager()
+    checkpoint_manager = CheckpointManager(str(tmp_path / "checkpoint.json"), statistics_manager)
+    checkpoint_manager.remaining.update(["host3.example", "host4.example"])
+
+    item_statistics = checkpoint_manager.item_statistics()
+    item_statistics.add_data("host3.example", 0, "Connection refused", 0)
+    checkpoint = checkpoint_manager.get_checkpoint()
+    assert checkpoint["statistics"]["total_requests"] == 0
+    assert sorted(checkpoint["remaining"]) == ["host3.example", "host4.example"]
+
+    # Reads other than add_data go to the shared statistics.
+    assert item_statistics.total_requests == 0
+
+    item_statistics.add_data("host3.example", 200, "OK", timedelta(milliseconds=5))
+    checkpoint_manager.mark_done("host3.example", item_statistics)
+    checkpoint = checkpoint_manager.get_checkpoint()
+    assert checkpoint["statistics"]["total_requests"] == 2
+    assert checkpoint["remaining"] == ["host4.example"]
+    assert checkpoint["completed"] == 1
+
+    # Data from a raced attempt that finishes after the hostname is done goes straight to the statistics.
+    item_statistics.add_data("host3.example", 0, "Read timeout", 0)
+    assert statistics_manager.total_requests == 3
+
+
+def test_every_checkpoint_is_consistent(tmp_path):
+    statistics_manager = StatisticsManager()
+    checkpoint_manager = CheckpointManager(str(tmp_path / "checkpoint.json"), statistics_manager, interval=0.01)
+    checkpoint_manager.start(HOSTNAMES)
+
+    checkpoints = []
+    stop = threading.Event()
+
+    def take_checkpoints() -> None:
+        while not stop.is_set():
+            checkpoints.append(checkpoint_manager.get_checkpoint())
+
+    checkpoint_thread = threading.Thread(target=take_checkpoints)
+    checkpoint_thread.start()
+    run(HOSTNAMES, statistics_manager, checkpoint_manager)
+    stop.set()
+    checkpoint_thread.join()
+    assert checkpoint_manager.stop() is None
+
+    assert checkpoints
+    for checkpoint in checkpoints:
+        done = list(HOSTNAMES)
+        for hostname in checkpoint["remaining"]:
+            done.remove(hostname)
+        assert checkpoint["completed"] == len(done)
+        assert checkpoint["statistics"]["total_requests"] == results_per_hostname(done)
+
+
+def test_resume_matches_an_uninterrupted_run(tmp_path):
+    uninterrupted = StatisticsManager()
+    run(HOSTNAMES, uninterrupted)
+
+    # Interrupt a run part of the way through: a checkpoint is saved while hostnames are in flight.
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+    statistics_manager = StatisticsManager()
+    checkpoint_manager = CheckpointManager(checkpoint_file, statistics_manager, interval=60)
+    checkpoint_manager.start(HOSTNAMES)
+    saved = threading.Event()
+
+    def save_part_way(hostname, thread_id, statistics_manager, applied_delay=0, destination=None) -> str:
+        output = make_request(hostname, thread_id, statistics_manager, applied_delay, destination)
+        if checkpoint_manager.completed >= len(HOSTNAMES) // 3 and not saved.is_set():
+            saved.set()
+            checkpoint_manager.save()
+        return output
+
+    thread_manager = ThreadManager(8, save_part_way, statistics_manager, MessageManager(output_stream=io.StringIO()),
+                                   checkpoint_manager=checkpoint_manager)
+    thread_manager.start(HOSTNAMES, "hostnames_queue", "hostnames_thread_list")
+    thread_manager.join_threads("hostnames_thread_list")
+    checkpoint_manager._stop_event.set()
+    assert saved.is_set()
+
+    # Resume from the saved checkpoint, as generate-requests.py --resume does.
+    with open(checkpoint_file, "r", encoding="utf-8") as file:
+        assert json.load(file)["version"] == CheckpointManager.CHECKPOINT_VERSION
+    checkpoint = CheckpointManager.load(checkpoint_file)
+    assert 0 < checkpoint["completed"] < len(HOSTNAMES)
+    assert checkpoint["completed"] + len(checkpoint["remaining"]) == len(HOSTNAMES)
+
+    resumed = StatisticsManager()
+    resumed.merge_state(checkpoint["statistics"])
+    resumed_checkpoint_manager = CheckpointManager(checkpoint_file, resumed, interval=60)
+    resumed_checkpoint_manager.start(checkpoint["remaining"], checkpoint["completed"])
+    run(checkpoint["remaining"], resumed, resumed_checkpoint_manager)
+
+    assert resumed_checkpoint_manager.completed == len(HOSTNAMES)
+    assert resumed_checkpoint_manager.stop() is None
+    assert not (tmp_path / "checkpoint.json").exists()
+    assert comparable(resumed.get_state()) == comparable(uninterrupted.get_state())
+    assert resumed.total_requests == results_per_hostname(HOSTNAMES)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text(json.dumps({"version": 99}))
+    try:
+        CheckpointManager.load(str(path))
+    except ValueError as e:
+        assert "not a checkpoint" in str(e)
+    else:
+        raise AssertionError("load accepted a checkpoint of another version")
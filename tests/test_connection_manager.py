@@ -0,0 +1,121 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from ConnectionManager import ConnectionManager
+from StatisticsManager import StatisticsManager
+
+
+def fake_attempts(connection_manager: ConnectionManager, outcomes: dict, events: list) -> None:
+    """
+    Replace attempt_request with attempts that take a set time per protocol and succeed or fail without a request.
+    outcomes is protocol -> (seconds, succeeds).
+    """
+    def attempt_request(protocol, hostname, thread_info, statistics_manager, destination=None):
+        seconds, succeeds = outcomes[protocol]
+        time.sleep(seconds)
+        if succeeds:
+            statistics_manager.add_data(hostname, 200, "OK", timedelta(seconds=seconds))
+            output = f"{thread_info}, SC: 200, Hostname: {protocol}://{hostname}"
+        else:
+            statistics_manager.add_data(hostname, 0, "Connection Timeout", 0)
+            output = ""
+        events.append(protocol)
+        return output, None if succeeds else f"{thread_info}, SC: 000, Hostname: {protocol}://{hostname}"
+    connection_manager.attempt_request = attempt_request
+
+
+@pytest.fixture
+def connection_manager():
+    connection_manager = ConnectionManager(race=True, race_stagger=0.05, max_per_destination=1)
+    yield connection_manager
+    connection_manager.close()
+
+
+def test_losers_still_running_are_not_recorded(connection_manager):
+    events = []
+    fake_attempts(connection_manager, {"https": (0.5, False), "http": (0.0, True)}, events)
+    statistics_manager = StatisticsManager()
+
+    output = connection_manager.race_request("example.com", "TID: 1", statistics_manager, ["https", "http"])
+    assert "http://example.com" in output
+
+    # Wait for the HTTPS attempt, which lost the race, to finish on its probe thread.
+    connection_manager.close()
+    assert events == ["http", "https"]
+    assert statistics_manager.total_requests == 1
+
+
+def test_failures_before_the_winner_are_recorded_once_per_protocol(connection_manager):
+    events = []
+    fake_attempts(connection_manager, {"https": (0.0, False), "http": (0.1, True)}, events)
+    statistics_manager = StatisticsManager()
+
+    connection_manager.race_request("example.com", "TID: 1", statistics_manager, ["https", "http"])
+    connection_manager.close()
+    # Like make_request, the HTTPS failure and the HTTP success.
+    assert statistics_manager.total_requests == 2
+
+
+def test_every_attempt_failing_is_recorded_once_per_protocol(connection_manager, monkeypatch):
+    events = []
+    fake_attempts(connection_manager, {"https": (0.0, False), "http": (0.0, False)}, events)
+    # Race both address families as well, four attempts in all.
+    monkeypatch.setattr(connection_manager, "race_attempts",
+                        lambda hostname, protocols: [(protocol, family) for protocol in protocols for family in (10, 2)])
+    statistics_manager = StatisticsManager()
+
+    output = connection_manager.race_request("example.com", "TID: 1", statistics_manager, ["https", "http"])
+    assert "SC: 000" in output
+    assert len(events) == 4
+    assert statistics_manager.total_requests == 2
+
+
+def test_losers_hold_the_destination_until_they_finish(connection_manager):
+    events = []
+    fake_attempts(connection_manager, {"https": (0.3, False), "http": (0.0, True)}, events)
+    destination_manager = connection_manager.destination_manager
+    destination = destination_manager.get_destination("example.com")
+
+    assert destination_manager.try_acquire(destination)
+    connection_manager.race_request("example.com", "TID: 1", StatisticsManager(), ["https", "http"], destination)
+    destination_manager.release(destination)
+
+    # The HTTPS attempt is still running, so the destination is still at its cap of 1.
+    assert not destination_manager.try_acquire(destination)
+    connection_manager.close()
+    assert destination_manager.in_flight == {}
+    assert destination_manager.try_acquire(destination)
+
+
+def test_probe_executor_is_created_once(connection_manager):
+    barrier = threading.Barrier(8)
+    executors = []
+
+    def get_executor():
+        barrier.wait()
+        executors.append(connection_manager.get_probe_executor())
+
+    threads = [threading.Thread(target=get_executor) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(executor) for executor in executors}) == 1
+
+
+def test_only_the_given_protocols_are_attempted():
+    connection_manager = ConnectionManager(protocols=["http"])
+    events = []
+    fake_attempts(connection_manager, {"https": (0.0, True), "http": (0.0, False)}, events)
+    statistics_manager = StatisticsManager()
+    connection_manager.make_request("host.example", 0, statistics_manager)
+    connection_manager.close()
+
+    assert events == ["http"]
+    assert statistics_manager.total_requests == 1
+
+    with pytest.raises(ValueError):
+        ConnectionManager(protocols=["ftp"])
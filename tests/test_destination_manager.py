@@ -0,0 +1,133 @@
+import pytest
+
+import DestinationManager as destination_manager_module
+from DestinationManager import DestinationManager
+
+
+class FakeClock:
+    """
+    Stands in for the time module, the test moves the clock on.
+    """
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(destination_manager_module, "time", clock)
+    return clock
+
+
+def test_try_acquire_caps_requests_in_flight():
+    destination_manager = DestinationManager(max_in_flight=2)
+    assert destination_manager.try_acquire("example.com")
+    assert destination_manager.try_acquire("example.com")
+    assert not destination_manager.try_acquire("example.com")
+    # Other destinations have their own count.
+    assert destination_manager.try_acquire("example.org")
+    assert destination_manager.in_flight == {"example.com": 2, "example.org": 1}
+    assert destination_manager.deferred == 1
+
+    destination_manager.release("example.com")
+    assert destination_manager.try_acquire("example.com")
+    assert not destination_manager.try_acquire("example.com")
+    assert destination_manager.deferred == 2
+
+
+def test_release_forgets_idle_destinations():
+    destination_manager = DestinationManager(max_in_flight=3)
+    for _ in range(3):
+        destination_manager.try_acquire("example.com")
+    for _ in range(3):
+        destination_manager.release("example.com")
+    assert destination_manager.in_flight == {}
+
+
+def test_hold_counts_past_the_cap():
+    destination_manager = DestinationManager(max_in_flight=1)
+    assert destination_manager.try_acquire("example.com")
+    destination_manager.hold("example.com")
+    destination_manager.release("example.com")
+    # The request held is still in flight.
+    assert not destination_manager.try_acquire("example.com")
+    destination_manager.release("example.com")
+    assert destination_manager.try_acquire("example.com")
+
+
+def test_no_cap():
+    destination_manager = DestinationManager()
+    assert all(destination_manager.try_acquire("example.com") for _ in range(100))
+
+
+def test_circuit_breaker_open_half_open_and_reopen(clock):
+    destination_manager = DestinationManager(breaker_threshold=3, breaker_cooldown=30)
+    destination = "example.com"
+
+    # Closed: timeouts below the threshold, and an answer resets the count.
+    destination_manager.record(destination, "Connection Timeout")
+    destination_manager.record(destination, "Read timeout")
+    destination_manager.record(destination, None)
+    destination_manager.record(destination, "Connection Timeout")
+    destination_manager.record(destination, "Connection Timeout")
+    assert destination_manager.allow(destination)
+
+    # Open: the third timeout in a row opens the breaker, and requests fail at once.
+    destination_manager.record(destination, "Connection Timeout")
+    assert destination_manager.breakers_opened == 1
+    assert not destination_manager.allow(destination)
+    clock.now += 29
+    assert not destination_manager.allow(destination)
+
+    # Half-open: after the cooldown one probe is let through, the rest still fail at once.
+    clock.now += 1
+    assert destination_manager.allow(destination)
+    assert not destination_manager.allow(destination)
+    assert destination_manager.rejected == 3
+
+    # The probe times out, so the breaker opens for another cooldown.
+    destination_manager.record(destination, "Read timeout")
+    clock.now += 29
+    assert not destination_manager.allow(destination)
+    clock.now += 1
+    assert destination_manager.allow(destination)
+
+    # This probe is answered (even with an error), which closes the breaker.
+    destination_manager.record(destination, "Connection refused")
+    assert destination_manager.breakers == {}
+    assert destination_manager.allow(destination)
+    assert destination_manager.allow(destination)
+    assert destination_manager.breakers_opened == 1
+
+
+def test_probe_that_never_reports_is_replaced(clock):
+    destination_manager = DestinationManager(breaker_threshold=1, breaker_cooldown=10)
+    destination_manager.record("example.com", "Connection Timeout")
+    clock.now += 10
+    assert destination_manager.allow("example.com")
+    clock.now += 5
+    assert not destination_manager.allow("example.com")
+    clock.now += 5
+    assert destination_manager.allow("example.com")
+
+
+def test_breakers_are_per_destination(clock):
+    destination_manager = DestinationManager(breaker_threshold=1)
+    destination_manager.record("example.com", "Connection Timeout")
+    assert not destination_manager.allow("example.com")
+    assert destination_manager.allow("example.org")
+
+
+@pytest.mark.parametrize("hostname, destination", [
+    ("www.example.com", "example.com"),
+    ("api.example.co.uk", "example.co.uk"),
+    ("www.example.com:8443", "example.com"),
+    ("192.0.2.1:8080", "192.0.2.1"),
+    ("[2001:db8::1]:443", "2001:db8::1"),
+    ("example", "example")
+])
+def test_domain_destination(hostname, destination):
+    assert DestinationManager().get_destination(hostname) == destination
@@ -0,0 +1,124 @@
+import random
+import statistics
+
+import pytest
+
+from LatencyHistogram import LatencyHistogram
+
+
+# Every bucket of a value of 2 ** SIGNIFICANT_BITS or more is at most 1/64 of its lowest value wide.
+MAX_BUCKET_WIDTH = 1 / (1 << (LatencyHistogram.SIGNIFICANT_BITS - 1))
+
+
+def random_latencies(seed: int, count: int) -> list:
+    rng = random.Random(seed)
+    # Log normal latencies around 50ms, in microseconds, with a long tail.
+    return [int(rng.lognormvariate(10.8, 0.8)) for _ in range(count)]
+
+
+def test_small_values_are_exact():
+    for value in range(1 << LatencyHistogram.SIGNIFICANT_BITS):
+        index = LatencyHistogram.bucket_index(value)
+        assert LatencyHistogram.bucket_range(index) == (value, value)
+
+
+@pytest.mark.parametrize("value", [128, 129, 255, 256, 1000, 65535, 65536, 123456789, (1 << 40) + 12345])
+def test_bucket_index_round_trip(value):
+    index = LatencyHistogram.bucket_index(value)
+    low, high = LatencyHistogram.bucket_range(index)
+    assert low <= value <= high
+    assert LatencyHistogram.bucket_index(low) == index
+    assert LatencyHistogram.bucket_index(high) == index
+    assert LatencyHistogram.bucket_index(high + 1) == index + 1
+
+
+def test_buckets_are_contiguous():
+    # The buckets cover every value once, in order, up to 2 ** 24.
+    expected_low = 0
+    for index in range(LatencyHistogram.bucket_index(1 << 24)):
+        low, high = LatencyHistogram.bucket_range(index)
+        assert low == expected_low
+        assert high >= low
+        expected_low = high + 1
+
+
+def test_relative_error_at_significant_bits():
+    rng = random.Random(7)
+    for _ in range(10000):
+        value = rng.randrange(1 << LatencyHistogram.SIGNIFICANT_BITS, 1 << 40)
+        low, high = LatencyHistogram.bucket_range(LatencyHistogram.bucket_index(value))
+        assert (high + 1 - low) / low <= MAX_BUCKET_WIDTH
+        # The middle of the bucket, which percentile reports, is within half a bucket of the value.
+        assert abs((low + high) // 2 - value) / value <= MAX_BUCKET_WIDTH / 2
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_percentiles_match_statistics_quantiles(seed):
+    values = random_latencies(seed, 20000)
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    quantiles = statistics.quantiles(values, n=1000, method="inclusive")
+    for percentile in (1, 10, 25, 50, 75, 90, 99, 99.9):
+        expected = quantiles[round(percentile * 10) - 1]
+        assert histogram.percentile(percentile) == pytest.approx(expected, rel=MAX_BUCKET_WIDTH)
+
+    assert histogram.count == len(values)
+    assert histogram.mean() == pytest.approx(statistics.fmean(values))
+    assert min(values) <= histogram.percentile(0) == pytest.approx(min(values), rel=MAX_BUCKET_WIDTH)
+    assert max(values) >= histogram.percentile(100) == pytest.approx(max(values), rel=MAX_BUCKET_WIDTH)
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.mean() is None
+
+
+def test_merge_and_subtract_are_inverses():
+    first = LatencyHistogram()
+    for value in random_latencies(11, 5000):
+        first.record(value)
+    second = LatencyHistogram()
+    for value in random_latencies(12, 3000):
+        second.record(value)
+    original = first.get_state()
+
+    first.merge(second)
+    assert first.count == 8000
+    first.subtract(second)
+
+    state = first.get_state()
+    assert dict(map(tuple, state["buckets"])) == dict(map(tuple, original["buckets"]))
+    assert state["count"] == original["count"]
+    assert state["total"] == original["total"]
+    # The exact min and max are only known to within their buckets after subtracting.
+    for key in ("min", "max"):
+        index = LatencyHistogram.bucket_index(original[key])
+        low, high = LatencyHistogram.bucket_range(index)
+        assert low <= state[key] <= high
+
+
+def test_subtract_snapshot_leaves_the_interval():
+    # The statistics of an interval are the histogram now less a snapshot taken at its start.
+    histogram = LatencyHistogram()
+    for value in random_latencies(21, 4000):
+        histogram.record(value)
+    snapshot = LatencyHistogram.from_state(histogram.get_state())
+
+    interval_values = random_latencies(22, 1000)
+    interval = LatencyHistogram()
+    for value in interval_values:
+        histogram.record(value)
+        interval.record(value)
+
+    histogram.subtract(snapshot)
+    assert histogram.buckets == interval.buckets
+    assert histogram.count == interval.count
+    assert histogram.total == interval.total
+
+    histogram.subtract(interval)
+    assert histogram.count == 0
+    assert histogram.buckets == {}
+    assert histogram.percentile(50) is None
@@ -0,0 +1,57 @@
+import io
+import threading
+
+from MessageManager import MessageManager
+
+
+def test_messages_are_written_in_order():
+    output = io.StringIO()
+    message_manager = MessageManager(output_stream=output)
+    monitor = threading.Thread(target=message_manager.monitor_queue)
+    monitor.start()
+
+    message_manager.add_to_queue("first")
+    message_manager.add_to_queue(["second", "third"])
+    message_manager.add_to_queue([])
+    assert message_manager.shutdown(timeout=5)
+    monitor.join()
+    assert output.getvalue() == "first\nsecond\nthird\n"
+
+
+def test_messages_added_after_shutdown_are_written():
+    output = io.StringIO()
+    message_manager = MessageManager(output_stream=output)
+    monitor = threading.Thread(target=message_manager.monitor_queue)
+    monitor.start()
+
+    message_manager.add_to_queue("before")
+    message_manager.shutdown(wait=True, timeout=5)
+    monitor.join()
+
+    # Such as a last live metrics report, printed after the last worker has shut the messages thread down.
+    message_manager.add_to_queue("after")
+    message_manager.add_to_queue(["and", "more"])
+    assert output.getvalue() == "before\nafter\nand\nmore\n"
+
+
+def test_no_message_is_dropped_while_shutting_down():
+    output = io.StringIO()
+    message_manager = MessageManager(output_stream=output, batch_size=7)
+    monitor = threading.Thread(target=message_manager.monitor_queue)
+    monitor.start()
+
+    def add_messages(thread_number: int) -> None:
+        for number in range(2000):
+            message_manager.add_to_queue(f"{thread_number}-{number}")
+
+    threads = [threading.Thread(target=add_messages, args=(thread_number,)) for thread_number in range(4)]
+    for thread in threads:
+        thread.start()
+    message_manager.shutdown(wait=False)
+    for thread in threads:
+        thread.join()
+    monitor.join()
+
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 8000
+    assert set(lines) == {f"{thread_number}-{number}" for thread_number in range(4) for number in range(2000)}
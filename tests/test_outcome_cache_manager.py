@@ -0,0 +1,70 @@
+import io
+import threading
+
+import pytest
+
+from MessageManager import MessageManager
+from OutcomeCacheManager import OutcomeCacheManager
+
+
+@pytest.fixture
+def outcome_cache(tmp_path):
+    outcome_cache = OutcomeCacheManager(str(tmp_path / "outcomes.db"), flush_interval=0.05)
+    outcome_cache.open()
+    yield outcome_cache
+    outcome_cache.close()
+
+
+def test_close_writes_every_outcome(outcome_cache):
+    outcome_cache.start()
+    for number in range(2500):
+        outcome_cache.record(f"host{number}.example", "https", "DNS resolution issue")
+        outcome_cache.record(f"host{number}.example", "http", "DNS resolution issue" if number % 2 else None)
+    outcome_cache.close()
+
+    outcome_cache.open()
+    assert outcome_cache.count_entries() == 5000
+    assert outcome_cache.get_dead_hostnames() == {f"host{number}.example" for number in range(1, 2500, 2)}
+    assert ("host0.example", "https") in outcome_cache.load_skip_protocols()
+
+
+def test_outcomes_recorded_without_the_writer_thread_are_written_on_close(outcome_cache):
+    outcome_cache.record("host0.example", "https", "Connection refused")
+    outcome_cache.close()
+    outcome_cache.open()
+    assert outcome_cache.count_entries() == 1
+
+
+def test_record_does_not_wait_for_the_database(outcome_cache):
+    outcome_cache.start()
+    recorded = threading.Event()
+
+    def record() -> None:
+        for number in range(outcome_cache.batch_size * 3):
+            outcome_cache.record(f"host{number}.example", "https", None)
+            outcome_cache.should_skip(f"host{number}.example", "https")
+        recorded.set()
+
+    # While the database is busy, recording still goes straight through.
+    with outcome_cache._lock:
+        threading.Thread(target=record).start()
+        assert recorded.wait(5)
+
+
+def test_write_errors_go_to_the_message_manager(outcome_cache):
+    output = io.StringIO()
+    message_manager = MessageManager(output_stream=output)
+    outcome_cache.start(message_manager)
+    with outcome_cache._lock:
+        outcome_cache._connection.execute("DROP TABLE outcomes")
+        outcome_cache._connection.commit()
+    outcome_cache.record("host0.example", "https", None)
+
+    outcome_cache.close()
+
+    messages = []
+    while not message_manager.queue.empty():
+        messages.append(message_manager.queue.get())
+    assert any("Error while writing to outcome cache" in message for message in messages)
+    assert any("Error while evicting from outcome cache" in message for message in messages)
+    assert output.getvalue() == ""
@@ -0,0 +1,153 @@
+import asyncio
+import random
+
+import pytest
+
+import RateLimiter as rate_limiter_module
+from RateLimiter import RateLimiter
+
+
+class FakeClock:
+    """
+    Stands in for the time module, sleeping moves the clock on instead of waiting.
+    """
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds: float) -> None:
+        self.sleep(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter_module, "time", clock)
+    return clock
+
+
+def departures(rate_limiter: RateLimiter, clock: FakeClock, count: int) -> list:
+    times = []
+    for _ in range(count):
+        rate_limiter.acquire()
+        times.append(clock.now)
+    return times
+
+
+def test_uniform_spacing_holds_the_rate(clock):
+    rate_limiter = RateLimiter(rate=20)
+    times = departures(rate_limiter, clock, 200)
+
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert gaps == pytest.approx([1 / 20] * 199)
+    assert (len(times) - 1) / (times[-1] - times[0]) == pytest.approx(20)
+
+
+def test_burst_allowance(clock):
+    rate_limiter = RateLimiter(rate=10, burst=5)
+    start = clock.now
+    times = departures(rate_limiter, clock, 8)
+
+    # The first burst requests leave at once, the rest are spaced at the rate.
+    assert times[:5] == pytest.approx([start] * 5)
+    assert times[5:] == pytest.approx([start + 0.1, start + 0.2, start + 0.3])
+
+
+def test_idle_capacity_is_capped_at_burst(clock):
+    rate_limiter = RateLimiter(rate=10, burst=3)
+    departures(rate_limiter, clock, 10)
+
+    # However long the limiter was idle, only burst requests leave at once.
+    clock.now += 60
+    start = clock.now
+    times = departures(rate_limiter, clock, 5)
+    assert times[:3] == pytest.approx([start] * 3)
+    assert times[3:] == pytest.approx([start + 0.1, start + 0.2])
+
+
+def test_callers_that_arrive_late_do_not_wait(clock):
+    rate_limiter = RateLimiter(rate=10)
+    rate_limiter.acquire()
+    clock.now += 1
+    clock.sleeps.clear()
+    rate_limiter.acquire()
+    assert clock.sleeps == []
+
+
+def test_poisson_arrivals_hold_the_mean_rate(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter_module, "random", random.Random(5))
+    rate_limiter = RateLimiter(rate=50, arrival="poisson")
+    times = departures(rate_limiter, clock, 5000)
+
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert (len(times) - 1) / (times[-1] - times[0]) == pytest.approx(50, rel=0.05)
+    # Unlike uniform arrivals, the gaps vary.
+    assert min(gaps) < 0.5 / 50 < 2 / 50 < max(gaps)
+
+
+def test_no_rate_does_not_wait(clock):
+    rate_limiter = RateLimiter()
+    assert departures(rate_limiter, clock, 100) == [1000.0] * 100
+    assert clock.sleeps == []
+
+
+def test_delay_is_returned_and_waited_for(clock):
+    rate_limiter = RateLimiter(delay=2)
+    assert rate_limiter.acquire() == 2
+    assert rate_limiter.acquire() == 2
+    assert clock.sleeps == [2, 2]
+
+
+def test_delay_overlaps_the_departure_slot(clock):
+    # A worker waits for its delay and its departure slot at the same time, not one after the other.
+    rate_limiter = RateLimiter(rate=1, delay=3)
+    start = clock.now
+    assert [rate_limiter.acquire() for _ in range(3)] == [3, 3, 3]
+    assert clock.now == pytest.approx(start + 9)
+
+    rate_limiter = RateLimiter(rate=1, burst=1, delay=0)
+    clock.sleeps.clear()
+    assert rate_limiter.acquire() == 0
+    assert rate_limiter.acquire() == 0
+    assert clock.sleeps == pytest.approx([1.0])
+
+
+def test_random_delay_is_returned_and_waited_for(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter_module, "random", random.Random(3))
+    rate_limiter = RateLimiter(random_delay_max=4)
+    applied = [rate_limiter.acquire() for _ in range(200)]
+
+    assert set(applied) == {0, 1, 2, 3, 4}
+    assert clock.sleeps == [delay for delay in applied if delay > 0]
+
+
+def test_acquire_async(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter_module.asyncio, "sleep", clock.async_sleep)
+    rate_limiter = RateLimiter(rate=4, delay=1)
+
+    async def run() -> list:
+        return [await rate_limiter.acquire_async() for _ in range(4)]
+
+    start = clock.now
+    assert asyncio.run(run()) == [1, 1, 1, 1]
+    assert clock.now == pytest.approx(start + 4)
+
+
+@pytest.mark.parametrize("arguments", [
+    dict(rate=0),
+    dict(rate=-1),
+    dict(rate=10, burst=0),
+    dict(rate=10, arrival="bursty"),
+    dict(delay=-1),
+    dict(random_delay_max=-1)
+])
+def test_invalid_settings(arguments):
+    with pytest.raises(ValueError):
+        RateLimiter(**arguments)
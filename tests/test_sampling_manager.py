@@ -0,0 +1,144 @@
+from collections import Counter
+
+import pytest
+
+from SamplingManager import SamplingManager
+
+
+HOSTNAMES = [f"host{position}.example" for position in range(20000)]
+STRATA = (100, 1000, 5000)
+
+
+def position_of(hostname: str) -> int:
+    return int(hostname[4:].split(".", 1)[0])
+
+
+def band_counts(sample: list) -> list:
+    bands = [0] * (len(STRATA) + 1)
+    for hostname in sample:
+        position = position_of(hostname)
+        bands[sum(position >= rank for rank in STRATA)] += 1
+    return bands
+
+
+class FixedRandom:
+    """
+    Stands in for random.Random, returning the given values from random().
+    """
+    def __init__(self, values) -> None:
+        self.values = iter(values)
+
+    def random(self) -> float:
+        return next(self.values)
+
+
+def test_zipf_bisect_maps_each_draw_to_its_rank():
+    sampling_manager = SamplingManager("zipf", zipf_exponent=1.0)
+    # Weights 1, 1/2, 1/3, 1/4 add up to 25/12.
+    total = 25 / 12
+    # Rank r is drawn for the values between the cumulative weights of ranks r - 1 and r (1, 1.5, 1.83 and 2.08).
+    draws = [value / total for value in (0.0, 0.5, 0.99, 1.01, 1.49, 1.51, 1.82, 1.84, 2.08)]
+    sampling_manager.random = FixedRandom(draws)
+    assert sampling_manager.zipf_positions(4, len(draws)) == [0, 0, 0, 1, 1, 2, 2, 3, 3]
+
+
+@pytest.mark.parametrize("exponent", [0.8, 1.0, 1.5])
+def test_zipf_frequencies_follow_the_weights(exponent):
+    sampling_manager = SamplingManager("zipf", zipf_exponent=exponent, seed=1)
+    population = 1000
+    positions = sampling_manager.zipf_positions(population, 200000)
+    assert min(positions) >= 0 and max(positions) < population
+
+    counts = Counter(positions)
+    total = sum((rank + 1) ** -exponent for rank in range(population))
+    for position in (0, 1, 4, 9):
+        expected = (position + 1) ** -exponent / total
+        assert counts[position] / len(positions) == pytest.approx(expected, rel=0.05)
+
+
+def test_zipf_with_a_smaller_population_after_a_larger_one():
+    # The cumulative weights built for a larger population are reused, only the first ranks are drawn from.
+    sampling_manager = SamplingManager("zipf", seed=2)
+    sampling_manager.zipf_positions(10000, 10)
+    assert max(sampling_manager.zipf_positions(50, 10000)) < 50
+
+
+def test_stratified_shares_are_even():
+    sampling_manager = SamplingManager("stratified", strata=STRATA)
+    shares = sampling_manager.stratified_shares(len(HOSTNAMES), 400)
+    assert [(band.start, band.stop) for band in shares] == [(0, 100), (100, 1000), (1000, 5000), (5000, 20000)]
+    assert list(shares.values()) == [100, 100, 100, 100]
+
+
+def test_stratified_shares_give_the_leftover_of_small_bands_to_the_others():
+    sampling_manager = SamplingManager("stratified", strata=STRATA)
+    shares = sampling_manager.stratified_shares(len(HOSTNAMES), 1000)
+    # The top 100 can only give 100, the other 900 is shared evenly by the other bands.
+    assert list(shares.values()) == [100, 300, 300, 300]
+
+    shares = sampling_manager.stratified_shares(len(HOSTNAMES), 30000)
+    assert list(shares.values()) == [100, 900, 4000, 15000]
+
+
+def test_stratified_shares_leave_out_bands_past_the_population():
+    sampling_manager = SamplingManager("stratified", strata=STRATA)
+    shares = sampling_manager.stratified_shares(500, 90)
+    assert [(band.start, band.stop) for band in shares] == [(0, 100), (100, 500)]
+    assert list(shares.values()) == [45, 45]
+
+
+@pytest.mark.parametrize("strategy", SamplingManager.STRATEGIES)
+def test_seeded_samples_are_reproducible(strategy):
+    first = SamplingManager(strategy, strata=STRATA, seed=42).sample(HOSTNAMES, 500)
+    second = SamplingManager(strategy, strata=STRATA, seed=42).sample(HOSTNAMES, 500)
+    other = SamplingManager(strategy, strata=STRATA, seed=43).sample(HOSTNAMES, 500)
+    assert first == second
+    assert first != other
+    assert len(first) == 500
+
+
+@pytest.mark.parametrize("strategy", ["uniform", "stratified"])
+def test_samples_without_repeats(strategy):
+    sample = SamplingManager(strategy, strata=STRATA, seed=3).sample(HOSTNAMES, 2000)
+    assert len(set(sample)) == len(sample) == 2000
+
+
+def test_top_limits_the_population():
+    for strategy in SamplingManager.STRATEGIES:
+        sample = SamplingManager(strategy, strata=STRATA, seed=4).sample(HOSTNAMES, 50, top=300)
+        assert max(position_of(hostname) for hostname in sample) < 300
+
+
+def test_stratified_sample_keeps_its_shares():
+    sample = SamplingManager("stratified", strata=STRATA, seed=5).sample(HOSTNAMES, 400)
+    assert band_counts(sample) == [100, 100, 100, 100]
+
+
+@pytest.mark.parametrize("seed", [6, 7, 8])
+def test_dead_hostnames_are_redrawn_within_their_stratum(seed):
+    # Most of the top band and half of every other band are dead.
+    dead_hostnames = {hostname for hostname in HOSTNAMES if position_of(hostname) < 80 or position_of(hostname) % 2}
+    sampling_manager = SamplingManager("stratified", strata=STRATA, seed=seed, dead_hostnames=dead_hostnames)
+    sample = sampling_manager.sample(HOSTNAMES, 400)
+
+    assert not dead_hostnames.intersection(sample)
+    assert len(set(sample)) == len(sample)
+    # The top band only has 10 hostnames left alive (0-79 and the odd positions are dead), which it gives
+    # in full. Its dead places are not made up from other bands, so the rest keep their shares exactly.
+    assert band_counts(sample) == [10, 100, 100, 100]
+
+
+def test_dead_hostnames_are_redrawn_with_the_same_strategy():
+    dead_hostnames = {hostname for hostname in HOSTNAMES if position_of(hostname) % 3 == 0}
+    for strategy in ("uniform", "zipf"):
+        sample = SamplingManager(strategy, seed=9, dead_hostnames=dead_hostnames).sample(HOSTNAMES, 1000)
+        assert len(sample) == 1000
+        assert not dead_hostnames.intersection(sample)
+
+
+def test_dead_weight_keeps_some_dead_hostnames():
+    dead_hostnames = set(HOSTNAMES[::2])
+    sample = SamplingManager("uniform", seed=10, dead_hostnames=dead_hostnames, dead_weight=0.5).sample(HOSTNAMES, 4000)
+    dead_share = len(dead_hostnames.intersection(sample)) / len(sample)
+    # Dead hostnames are drawn half the time and half of those are kept, so they are a third of the sample.
+    assert dead_share == pytest.approx(1 / 3, abs=0.03)